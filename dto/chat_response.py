@@ -6,3 +6,4 @@ class ChatResponse(BaseModel):
     message: str
     thread_id: str
     evaluator_scorecard: Optional[dict] = None
+    evaluation_job_id: Optional[str] = None
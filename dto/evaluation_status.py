@@ -0,0 +1,12 @@
+from typing import Literal, Optional
+
+from pydantic import BaseModel, Field
+
+class EvaluationStatus(BaseModel):
+    thread_id: str
+    status: Literal["pending", "running", "completed", "failed", "not_found"] = Field(
+        description="State of the latest evaluation of the thread",
+    )
+    job_id: Optional[str] = Field(None, description="Background job evaluating the thread, while it is known to this server")
+    evaluator_scorecard: Optional[dict] = Field(None, description="The scorecard, once the evaluation has completed")
+    error: Optional[str] = Field(None, description="Why the evaluation failed")
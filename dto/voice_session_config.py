@@ -0,0 +1,8 @@
+from typing import Literal
+
+from pydantic import BaseModel, Field
+
+class VoiceSessionConfig(BaseModel):
+    stream_audio: bool = Field(False, description="Send the reply as one audio_response_chunk per sentence, synthesized while the LLM is still streaming, instead of a single audio_response")
+    binary: bool = Field(False, description="Send synthesized audio as raw binary frames instead of base64 inside JSON")
+    codec: Literal["wav", "flac", "opus"] = Field("wav", description="Codec of synthesized audio: PCM WAV, FLAC or OGG/Opus")
@@ -1,9 +1,13 @@
 import logging
+from typing import AsyncIterator, Dict, Optional, Tuple
 
-from langchain_core.messages import HumanMessage
-from langgraph.graph import StateGraph, START
+from langchain_core.messages import AIMessageChunk, HumanMessage
+from langchain_core.utils.json import parse_partial_json
+from langchain_core.runnables import RunnableLambda
+from langgraph.graph import StateGraph, START, END
 from langgraph.checkpoint.memory import InMemorySaver
 
+from llm_agents.evaluation_jobs import FAILED, EvaluationJobs
 from llm_agents.interview_agents.evaluator_agent import EvaluatorAgent
 from llm_agents.interview_agents.interview_agent import InterviewAgent
 from llm_agents.interview_agents.triage_agent import TriageAgent
@@ -13,26 +17,102 @@ from .interview_models import (
     InterviewInputState,
 )
 from dto.chat_response import ChatResponse
+from dto.evaluation_status import EvaluationStatus
 
 logger = logging.getLogger(__name__)
 
+class ReplyStream:
+    """
+    Turns the JSON streamed by the structured-output agents into deltas of the reply shown to the user.
+
+    The triage agent replies with its clarifying question or, once everything is collected, its
+    verification message; the interview agent replies with its question.
+    """
+
+    def __init__(self):
+        self._json: Dict[str, str] = {}
+        self._sent: Dict[str, str] = {}
+
+    @staticmethod
+    def reply(node: str, output: dict) -> Optional[str]:
+        """Reply text in the (partial) structured output of a node, if known yet."""
+        if node == "interview_agent":
+            return output.get("question")
+        if node == "triage_agent" and "need_clarification" in output:
+            return output.get("question" if output["need_clarification"] else "verification")
+        return None
+
+    def push(self, node: str, message_id: str, text: str) -> str:
+        """Add a chunk of the JSON written by `node` and return the new text of its reply."""
+        self._json[message_id] = self._json.get(message_id, "") + text
+        try:
+            output = parse_partial_json(self._json[message_id])
+        except ValueError:
+            return ""
+        reply = self.reply(node, output) if isinstance(output, dict) else None
+        sent = self._sent.get(message_id, "")
+        if not isinstance(reply, str) or not reply.startswith(sent):
+            return ""
+        self._sent[message_id] = reply
+        return reply[len(sent):]
+
+# Reply of the turn ending the interview while the evaluation runs in the background
+EVALUATION_PENDING_MESSAGE = "Thank you, the interview is over. Your evaluation is being prepared."
+
+class EvaluationPendingError(RuntimeError):
+    """A turn was sent to a thread whose deferred evaluation has not finished yet."""
+
+    def __init__(self, thread_id: str):
+        super().__init__(f"The evaluation of {thread_id} is still in progress")
+        self.thread_id = thread_id
+
 class ChatBotGraph:
-    def __init__(self, llm, checkpointer=None):
+    def __init__(self, llm, checkpointer=None, defer_evaluation: bool = False):
+        """
+        Args:
+            llm: Chat model used by every agent
+            checkpointer: Storage of the interview threads (in memory by default)
+            defer_evaluation: Stop before the evaluator and run it as a background job (see
+                evaluation()) instead of inside the request ending the interview
+        """
         graph_builder = StateGraph(InterviewState, input_schema=InterviewInputState)
 
         triage_agent = TriageAgent(llm)
         interview_agent = InterviewAgent(llm)
         evaluator_agent = EvaluatorAgent(llm)
 
-        graph_builder.add_node("interview_agent", interview_agent)
-        graph_builder.add_node("triage_agent", triage_agent)
-        graph_builder.add_node("evaluator_agent", evaluator_agent)
+        # Each node has a sync and an async implementation: graph.ainvoke/astream await the
+        # model calls on the event loop, graph.invoke keeps calling them synchronously
+        graph_builder.add_node("interview_agent", RunnableLambda(interview_agent, afunc=interview_agent.acall),
+                               destinations=("evaluator_agent", END))
+        graph_builder.add_node("triage_agent", RunnableLambda(triage_agent, afunc=triage_agent.acall),
+                               destinations=("interview_agent", END))
+        graph_builder.add_node("evaluator_agent", RunnableLambda(evaluator_agent, afunc=evaluator_agent.acall))
 
         graph_builder.add_edge(START, "triage_agent")
         memory = checkpointer or InMemorySaver()
-        self.graph = graph_builder.compile(checkpointer=memory)
+        self.defer_evaluation = defer_evaluation
+        self.graph = graph_builder.compile(
+            checkpointer=memory,
+            interrupt_before=["evaluator_agent"] if defer_evaluation else None,
+        )
+        self.evaluations = EvaluationJobs.from_env(self.graph)
+
+    async def check_accepts_turns(self, thread_id: str):
+        """
+        Raise EvaluationPendingError while the thread waits for its deferred evaluation.
+
+        The evaluation resumes the thread from its checkpoint: a turn written meanwhile would be
+        overwritten by it, so turns are refused until the scorecard is saved.
+        """
+        if not self.defer_evaluation:
+            return
+        state = await self.graph.aget_state({"configurable": {"thread_id": thread_id}})
+        if "evaluator_agent" in state.next:
+            raise EvaluationPendingError(thread_id)
 
     async def invoke(self, message: str, terminate: bool, thread_id: str) -> ChatResponse:
+        await self.check_accepts_turns(thread_id)
         result = await self.graph.ainvoke(
             {
                 "messages": [HumanMessage(content=message)],
@@ -40,9 +120,86 @@ class ChatBotGraph:
             },
             {"configurable": {"thread_id": thread_id}},
         )
-        response = ChatResponse(
+        return await self._response(result, thread_id)
+
+    async def astream(self, message: str, terminate: bool, thread_id: str) -> AsyncIterator[Tuple[str, dict]]:
+        """
+        Run a turn of the interview and yield (event, data) pairs as it progresses:
+
+        - ("token", {"node", "text"}): next piece of the reply being written
+        - ("node", {"node"}): a node finished
+        - ("response", ChatResponse): the final response, always last (with the evaluation job
+          instead of the scorecard when the evaluation is deferred)
+
+        Raises EvaluationPendingError before running anything while an evaluation is pending.
+        """
+        await self.check_accepts_turns(thread_id)
+        replies = ReplyStream()
+        result = None
+        async for mode, payload in self.graph.astream(
+            {
+                "messages": [HumanMessage(content=message)],
+                "end_interview": terminate,
+            },
+            {"configurable": {"thread_id": thread_id}},
+            stream_mode=["messages", "updates", "values"],
+        ):
+            if mode == "messages":
+                chunk, metadata = payload
+                if isinstance(chunk, AIMessageChunk) and chunk.text:
+                    node = metadata.get("langgraph_node", "")
+                    delta = replies.push(node, chunk.id or node, chunk.text)
+                    if delta:
+                        yield "token", {"node": node, "text": delta}
+            elif mode == "updates":
+                for node in payload:
+                    if not node.startswith("__"):
+                        yield "node", {"node": node}
+            else:
+                result = payload
+        response = await self._response(result, thread_id)
+        yield "response", response.model_dump()
+
+    async def evaluation(self, thread_id: str) -> EvaluationStatus:
+        """
+        State of the latest evaluation of a thread, read from the checkpointer so that any server
+        can answer it.
+
+        An evaluation pending for longer than the job timeout is considered lost (e.g. its server
+        restarted) and is started again, as is a failed evaluation of this server once its retry
+        delay has passed: the thread accepts no turn until it is evaluated.
+        """
+        state = await self.graph.aget_state({"configurable": {"thread_id": thread_id}})
+        job = self.evaluations.get(thread_id)
+        if "evaluator_agent" in state.next:
+            job_id = state.config["configurable"]["checkpoint_id"]
+            if job is not None and job.job_id == job_id:
+                if job.status == FAILED:
+                    job = self.evaluations.submit(thread_id, job_id)
+            elif self.evaluations.is_abandoned(state.created_at):
+                job = self.evaluations.submit(thread_id, job_id)
+            else:
+                job = None
+            if job is None:
+                return EvaluationStatus(thread_id=thread_id, status="pending", job_id=job_id)
+            return EvaluationStatus(thread_id=thread_id, status=job.status, job_id=job.job_id, error=job.error)
+
+        scorecard = state.values.get("evaluator_scorecard")
+        if scorecard is None:
+            return EvaluationStatus(thread_id=thread_id, status="not_found")
+        return EvaluationStatus(thread_id=thread_id, status="completed", evaluator_scorecard=scorecard,
+                                job_id=job.job_id if job else None)
+
+    async def _response(self, result: dict, thread_id: str) -> ChatResponse:
+        if self.defer_evaluation:
+            state = await self.graph.aget_state({"configurable": {"thread_id": thread_id}})
+            if "evaluator_agent" in state.next:
+                job = self.evaluations.submit(thread_id, state.config["configurable"]["checkpoint_id"])
+                return ChatResponse(message=EVALUATION_PENDING_MESSAGE, thread_id=thread_id,
+                                    evaluation_job_id=job.job_id)
+
+        return ChatResponse(
             message=result['messages'][-1].content,
             evaluator_scorecard=result.get("evaluator_scorecard"),
             thread_id=thread_id,
         )
-        return response
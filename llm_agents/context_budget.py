@@ -0,0 +1,177 @@
+import logging
+import math
+import os
+from functools import lru_cache
+from typing import Callable, List, NamedTuple, Optional, Sequence
+
+from langchain.agents.middleware import AgentMiddleware, ModelRequest
+from langchain_core.messages import AIMessage, BaseMessage, ToolMessage
+
+from services.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Tokens OpenAI adds around every message of a chat prompt (role and separators)
+MESSAGE_OVERHEAD_TOKENS = 4
+
+CONTEXT_TOKENS = metrics.histogram(
+    "llm_context_tokens", "Tokens of the messages sent to the model after trimming", labelnames=("caller",),
+    buckets=(250, 500, 1000, 2000, 4000, 8000, 16000, 32000, 64000),
+)
+CONTEXT_TOKENS_DROPPED = metrics.counter(
+    "llm_context_tokens_dropped_total", "Tokens of conversation history left out to fit the context budget",
+    labelnames=("caller",),
+)
+
+
+@lru_cache(maxsize=8)
+def _encoding(model: str):
+    """tiktoken encoding of a model, or None when tiktoken cannot load it (e.g. offline)."""
+    try:
+        import tiktoken
+        try:
+            return tiktoken.encoding_for_model(model)
+        except KeyError:
+            return tiktoken.get_encoding("o200k_base")
+    except Exception as e:
+        logger.warning("No tiktoken encoding for %s, estimating 4 characters per token: %s", model, e)
+        return None
+
+
+def approximate_tokens(text: str) -> int:
+    """Rough token count of English text when no tokenizer is available."""
+    return (len(text) + 3) // 4
+
+
+class BudgetedContext(NamedTuple):
+    """Messages to send, with the number of tokens they use and the tokens left out."""
+    messages: List[BaseMessage]
+    tokens: int
+    dropped_tokens: int
+    dropped_messages: int
+
+
+class ContextBudget:
+    def __init__(self, max_tokens: int = 6000, model: str = "gpt-4o", trim_step_tokens: int = 0,
+                 count_tokens: Optional[Callable[[str], int]] = None):
+        """
+        Keeps prompts under a token budget by dropping the oldest conversation turns.
+
+        Pinned messages (system prompt, job and company descriptions) are always sent; the
+        conversation history fills the rest of the budget, most recent turns first.
+
+        Args:
+            max_tokens: Token budget of a prompt
+            model: Model whose tiktoken encoding counts the tokens
+            trim_step_tokens: When over budget, drop the oldest history in steps of this many
+                tokens rather than just enough to fit, so that the prompt prefix stays the same
+                for several turns and OpenAI prompt caching keeps hitting (0 drops just enough)
+            count_tokens: Token counter replacing tiktoken (optional)
+        """
+        self.max_tokens = max_tokens
+        self.trim_step_tokens = trim_step_tokens
+        self.model = model
+        self.encoding = _encoding(model) if count_tokens is None else None
+        self.count_tokens = count_tokens or self._count_encoded_tokens
+
+    @classmethod
+    def from_env(cls, model: str = "gpt-4o") -> "ContextBudget":
+        """Build a budget configured by LLM_CONTEXT_BUDGET_TOKENS and LLM_CONTEXT_TRIM_STEP_TOKENS."""
+        return cls(
+            max_tokens=int(os.getenv("LLM_CONTEXT_BUDGET_TOKENS", "6000")),
+            model=model,
+            trim_step_tokens=int(os.getenv("LLM_CONTEXT_TRIM_STEP_TOKENS", "1500")),
+        )
+
+    def _count_encoded_tokens(self, text: str) -> int:
+        if self.encoding is None:
+            return approximate_tokens(text)
+        return len(self.encoding.encode(text, disallowed_special=()))
+
+    def message_tokens(self, message: BaseMessage) -> int:
+        """Tokens used by one message of a chat prompt, tool calls included."""
+        tokens = MESSAGE_OVERHEAD_TOKENS + self.count_tokens(message.text)
+        if isinstance(message, AIMessage):
+            for tool_call in message.tool_calls:
+                tokens += self.count_tokens(tool_call["name"]) + self.count_tokens(str(tool_call["args"]))
+        return tokens
+
+    def fit(self, history: Sequence[BaseMessage], pinned: Sequence[BaseMessage] = (),
+            caller: str = "default") -> BudgetedContext:
+        """
+        Select the messages to send: every pinned message, then the most recent history
+        messages that fit the budget. The last history message is always kept.
+
+        Args:
+            history: Conversation so far, oldest first
+            pinned: Messages sent whatever their size, placed before the history
+            caller: Label of the metrics (e.g. "interview")
+
+        Returns:
+            The pinned and kept messages, in order, with their token count and what was dropped
+        """
+        pinned = list(pinned)
+        history = list(history)
+        pinned_tokens = sum(self.message_tokens(message) for message in pinned)
+        history_tokens = [self.message_tokens(message) for message in history]
+
+        available = self.max_tokens - pinned_tokens
+        excess = sum(history_tokens) - available
+        if excess <= 0:
+            start = 0
+        elif self.trim_step_tokens:
+            # Drop the oldest messages a whole step at a time: the first message sent then stays
+            # the same until the history grows by another step, and so does the prompt prefix
+            target = math.ceil(excess / self.trim_step_tokens) * self.trim_step_tokens
+            start = dropped = 0
+            while start < len(history) - 1 and dropped < target:
+                dropped += history_tokens[start]
+                start += 1
+        else:
+            start = len(history)
+            used = 0
+            while start > 0 and (start == len(history) or used + history_tokens[start - 1] <= available):
+                start -= 1
+                used += history_tokens[start]
+        # A tool result cannot be sent without the model message that called the tool: drop the
+        # orphaned results, or keep that model message if only tool results fit
+        cut = start
+        while cut < len(history) and isinstance(history[cut], ToolMessage):
+            cut += 1
+        if cut < len(history):
+            start = cut
+        else:
+            while start > 0 and isinstance(history[start], ToolMessage):
+                start -= 1
+
+        dropped_tokens = sum(history_tokens[:start])
+        tokens = pinned_tokens + sum(history_tokens[start:])
+        CONTEXT_TOKENS.observe(tokens, caller=caller)
+        if dropped_tokens:
+            CONTEXT_TOKENS_DROPPED.inc(dropped_tokens, caller=caller)
+            logger.info("Context budget (%s): dropped %d tokens in %d messages, sending %d tokens",
+                        caller, dropped_tokens, start, tokens)
+        return BudgetedContext(pinned + history[start:], tokens, dropped_tokens, start)
+
+
+class ContextBudgetMiddleware(AgentMiddleware):
+    """Agent middleware fitting every model call of a create_agent() agent into a ContextBudget."""
+
+    def __init__(self, budget: ContextBudget, caller: str = "agent"):
+        super().__init__()
+        self.budget = budget
+        self.caller = caller
+
+    def _fit(self, request: ModelRequest) -> ModelRequest:
+        # The stored thread is left untouched, only this call's prompt is trimmed
+        pinned = [request.system_message] if request.system_message is not None else []
+        context = self.budget.fit(request.messages, caller=self.caller, pinned=pinned)
+        if not context.dropped_messages:
+            return request
+        return request.override(messages=context.messages[len(pinned):])
+
+    def wrap_model_call(self, request, handler):
+        return handler(self._fit(request))
+
+    async def awrap_model_call(self, request, handler):
+        return await handler(self._fit(request))
@@ -0,0 +1,163 @@
+import asyncio
+import logging
+import os
+import time
+from datetime import datetime, timezone
+from typing import Dict, Optional
+
+from services.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+PENDING = "pending"
+RUNNING = "running"
+COMPLETED = "completed"
+FAILED = "failed"
+
+EVALUATION_JOBS = metrics.counter("evaluation_jobs_total", "Background interview evaluations finished",
+                                  labelnames=("outcome",))
+EVALUATION_JOBS_RUNNING = metrics.gauge("evaluation_jobs_running", "Background interview evaluations in progress")
+EVALUATION_JOBS_QUEUED = metrics.gauge("evaluation_jobs_queued", "Background interview evaluations waiting for a slot")
+
+
+class EvaluationJob:
+    def __init__(self, thread_id: str, job_id: str, attempt: int = 1):
+        """
+        Evaluation of the interview of one thread, run in the background.
+
+        The job id is the id of the checkpoint taken before evaluator_agent, so every server
+        sharing the checkpointer names the same evaluation the same way. A failed evaluation is
+        retried under the same id, `attempt` counting the tries.
+        """
+        self.job_id = job_id
+        self.thread_id = thread_id
+        self.attempt = attempt
+        self.status = PENDING
+        self.error: Optional[str] = None
+        self.failed_at: Optional[float] = None
+        self.task: Optional[asyncio.Task] = None
+
+
+class EvaluationJobs:
+    def __init__(self, graph, max_concurrency: int = 2, abandoned_after: float = 600, retry_after: float = 5):
+        """
+        Runs the evaluator of interview threads in the background.
+
+        The graph stops before "evaluator_agent" (interrupt_before); a job resumes the thread from
+        that checkpoint, so the scorecard is persisted by the graph's checkpointer like any other
+        state. At most `max_concurrency` evaluations run at once, whatever the interactive load.
+
+        The checkpointer, not this registry, says whether a thread still waits for its evaluation:
+        the registry only knows the jobs started by this process. As the thread accepts no turn
+        until it is evaluated, a failed evaluation is retried, waiting twice as long after each
+        failure (never more than `abandoned_after`).
+
+        Args:
+            graph: Compiled interview graph, with a checkpointer
+            max_concurrency: Evaluations running at the same time; the others wait their turn
+            abandoned_after: Seconds after which an evaluation still pending in the checkpointer is
+                considered lost (e.g. its server restarted) and may be started again
+            retry_after: Seconds before the first retry of a failed evaluation
+        """
+        self.graph = graph
+        self.max_concurrency = max_concurrency
+        self.abandoned_after = abandoned_after
+        self.retry_after = retry_after
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._jobs: Dict[str, EvaluationJob] = {}
+
+    @classmethod
+    def from_env(cls, graph) -> "EvaluationJobs":
+        """
+        Build a job manager configured by LANGGRAPH_EVALUATION_CONCURRENCY,
+        LANGGRAPH_EVALUATION_TIMEOUT_SECONDS and LANGGRAPH_EVALUATION_RETRY_SECONDS.
+        """
+        return cls(
+            graph,
+            max_concurrency=int(os.getenv("LANGGRAPH_EVALUATION_CONCURRENCY", "2")),
+            abandoned_after=float(os.getenv("LANGGRAPH_EVALUATION_TIMEOUT_SECONDS", "600")),
+            retry_after=float(os.getenv("LANGGRAPH_EVALUATION_RETRY_SECONDS", "5")),
+        )
+
+    def submit(self, thread_id: str, job_id: str) -> EvaluationJob:
+        """
+        Start evaluating a thread, unless this process already runs or ran that evaluation.
+
+        A failed evaluation is started again once its retry delay has passed; until then the
+        failed job is returned.
+        """
+        job = self._jobs.get(thread_id)
+        attempt = 1
+        if job is not None and job.job_id == job_id:
+            if job.status != FAILED or not self._retry_due(job):
+                return job
+            attempt = job.attempt + 1
+        job = EvaluationJob(thread_id, job_id, attempt=attempt)
+        job.task = asyncio.create_task(self._run(job))
+        self._jobs[thread_id] = job
+        logger.info("Evaluation job %s submitted for %s (attempt %d)", job.job_id, thread_id, attempt)
+        return job
+
+    def get(self, thread_id: str) -> Optional[EvaluationJob]:
+        """Latest job of a thread started by this process, if any."""
+        return self._jobs.get(thread_id)
+
+    def is_abandoned(self, created_at: Optional[str]) -> bool:
+        """Whether an evaluation pending since `created_at` (ISO timestamp of its checkpoint) is lost."""
+        if not created_at:
+            return True
+        age = datetime.now(timezone.utc) - datetime.fromisoformat(created_at)
+        return age.total_seconds() >= self.abandoned_after
+
+    def retry_delay(self, attempt: int) -> float:
+        """Seconds to wait before retrying an evaluation that failed at its `attempt`-th try."""
+        return min(self.retry_after * 2 ** (attempt - 1), self.abandoned_after)
+
+    def _retry_due(self, job: EvaluationJob) -> bool:
+        return job.failed_at is not None and time.monotonic() - job.failed_at >= self.retry_delay(job.attempt)
+
+    async def wait(self, thread_id: str):
+        """Wait until the current job of a thread (if any) has finished."""
+        job = self._jobs.get(thread_id)
+        if job is not None and job.task is not None:
+            await asyncio.gather(job.task, return_exceptions=True)
+
+    async def _run(self, job: EvaluationJob):
+        config = {"configurable": {"thread_id": job.thread_id}}
+        EVALUATION_JOBS_QUEUED.inc()
+        try:
+            async with self._semaphore:
+                EVALUATION_JOBS_QUEUED.dec()
+                EVALUATION_JOBS_RUNNING.inc()
+                job.status = RUNNING
+                try:
+                    # Another server may have evaluated the thread while this job was queued
+                    state = await self.graph.aget_state(config)
+                    if "evaluator_agent" not in state.next:
+                        job.status = COMPLETED
+                        EVALUATION_JOBS.inc(outcome="skipped")
+                        logger.info("Evaluation job %s skipped, %s is already evaluated", job.job_id,
+                                    job.thread_id)
+                        return
+                    # Resume the thread from the checkpoint taken before evaluator_agent
+                    await self.graph.ainvoke(None, config)
+                finally:
+                    EVALUATION_JOBS_RUNNING.dec()
+        except asyncio.CancelledError:
+            if job.status == PENDING:
+                EVALUATION_JOBS_QUEUED.dec()
+            job.status = FAILED
+            job.error = "Evaluation cancelled"
+            job.failed_at = time.monotonic()
+            EVALUATION_JOBS.inc(outcome="cancelled")
+            raise
+        except Exception as e:
+            job.status = FAILED
+            job.error = str(e)
+            job.failed_at = time.monotonic()
+            EVALUATION_JOBS.inc(outcome="failed")
+            logger.exception("Evaluation job %s failed for %s", job.job_id, job.thread_id)
+            return
+        job.status = COMPLETED
+        EVALUATION_JOBS.inc(outcome="completed")
+        logger.info("Evaluation job %s completed for %s", job.job_id, job.thread_id)
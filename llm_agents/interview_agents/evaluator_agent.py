@@ -1,44 +1,75 @@
 import logging
+from typing import Optional
 from langchain_core.messages import SystemMessage, HumanMessage, get_buffer_string
+from ..context_budget import ContextBudget
 from ..interview_models import InterviewState, EvaluatorScoreCard
+from ..token_usage import TokenUsageCallback
 
 logger = logging.getLogger(__name__)
 
-class EvaluatorAgent:
-    def __init__(self, llm):
-        self.llm = llm
+# Sent first and identical for every interview, so that OpenAI can cache the prompt prefix
+EVALUATOR_SYSTEM_PROMPT = """
+    You are a career coach specializing in helping people prepare for job interviews.
+    Your task is to evaluate the mock interview the user just completed and provide a helpful feedback to the user based on the scorecard.
 
-    def __call__(self, state: InterviewState) -> InterviewState:
-        logger.info("---EVALUATOR AGENT---")
+    REMEMBER:
+    - You're an objective evaluator of the interview, be direct and burtally honest. 
+    - If the interview transcript is too short and lacking content, call it out as a poor interview, don't sugar code it.
+"""
 
-        EVALUATOR_SYSTEM_PROMPT = f"""
-            You are a career coach specializing in helping people prepare for job interviews.
-            Your task is to evaluate the mock interview the user just completed and provide a helpful feedback to the user based on the scorecard.
+# Sent second: the interview the transcript belongs to
+EVALUATION_CONTEXT = """
+    As a reminder:
+    The job description was:
+    {job_description}
 
-            As a reminder:
-            The job description was:
-            {state["job_description"]}
+    The company description was:
+    {company_description}
 
-            The company description was:
-            {state["company_description"]}
+    And the type of interview was:
+    {interview_type}
 
-            And the type of interview was:
-            {state["interview_type"]}
+    The interview transcript follows (the user is the interviewee and the assistant is the interviewer).
+"""
 
-            REMEMBER:
-            - You're an objective evaluator of the interview, be direct and burtally honest. 
-            - If the interview transcript is too short and lacking content, call it out as a poor interview, don't sugar code it.
+EVALUATION_REQUEST = "The interview is over. Evaluate it and fill in the scorecard."
 
-            Here's the interview transcript (Human is the interviewee and AI is the interviewer):
-        """
+class EvaluatorAgent:
+    def __init__(self, llm, budget: Optional[ContextBudget] = None):
+        self.llm = llm
+        self.budget = budget or ContextBudget.from_env()
+        self.evaluator_model = llm.with_structured_output(EvaluatorScoreCard)
+        self.usage = TokenUsageCallback("evaluator")
+
+    def __call__(self, state: InterviewState) -> InterviewState:
+        logger.info("---EVALUATOR AGENT---")
+        response = self.evaluator_model.invoke(self._messages(state), config=self.usage.config())
+        return self._update(response)
+
+    async def acall(self, state: InterviewState) -> InterviewState:
+        """Async version of __call__, awaiting the model without blocking the event loop."""
+        logger.info("---EVALUATOR AGENT---")
+        response = await self.evaluator_model.ainvoke(self._messages(state), config=self.usage.config())
+        return self._update(response)
 
-        evaluator_model = self.llm.with_structured_output(EvaluatorScoreCard)
+    def _messages(self, state: InterviewState) -> list:
+        evaluation_context = EVALUATION_CONTEXT.format(
+            job_description=state["job_description"],
+            company_description=state["company_description"],
+            interview_type=state["interview_type"],
+        )
 
-        messages = [SystemMessage(content=EVALUATOR_SYSTEM_PROMPT)] + state["messages"]
-        messages_str = get_buffer_string(messages)
-        logger.debug("Messages: %s", messages_str)
-        response = evaluator_model.invoke([HumanMessage(content=messages_str)])
+        # Stable system prompt, then the interview context, then the transcript as role-tagged messages
+        context = self.budget.fit(
+            state["messages"],
+            pinned=[SystemMessage(content=EVALUATOR_SYSTEM_PROMPT), SystemMessage(content=evaluation_context)],
+            caller="evaluator",
+        )
+        messages = context.messages + [HumanMessage(content=EVALUATION_REQUEST)]
+        logger.debug("Messages: %s", get_buffer_string(messages))
+        return messages
 
+    def _update(self, response: EvaluatorScoreCard) -> InterviewState:
         logger.info("Evaluator response: %s", response)
 
         return {"evaluator_scorecard": response.model_dump(),
@@ -1,49 +1,69 @@
 import logging
-from typing import Literal
-from langchain_core.messages import SystemMessage, HumanMessage, AIMessage, get_buffer_string
+from typing import Literal, Optional
+from langchain_core.messages import SystemMessage, AIMessage
 from langgraph.types import Command
+from ..context_budget import ContextBudget
 from ..interview_models import InterviewState, InterviewProcess
+from ..token_usage import TokenUsageCallback
 
 logger = logging.getLogger(__name__)
 
-class InterviewAgent:
-    def __init__(self, llm):
-        self.llm = llm
+# Sent first and identical for every interview, so that OpenAI can cache the prompt prefix
+INTERVIEWER_SYSTEM_PROMPT = """
+    You are a career coach specializing in helping people prepare for job interviews.
+    Your task is to simulate a mock interview with the candidate based on the job description and company description and the type of interview.
+    - Simulate the interview in character — respond as if you were the Interviewer, before asking the next question.
+    - Don't list all questions in advance — just ask one at a time to mimic a real-life interview.
 
-    def __call__(self, state: InterviewState) -> Command[Literal['evaluator_agent', '__end__']]:
-        logger.info("---INTERVIEW AGENT---")
+    Remember to be friendly and engaging but direct with the candidate. Be human-like so don't just jump in the first question.
+"""
 
-        INTERVIEWER_SYSTEM_PROMPT = """
-            You are a career coach specializing in helping people prepare for job interviews.
-            Your task is to simulate a mock interview with the candidate based on the job description and company description and the type of interview.
-            - Simulate the interview in character — respond as if you were the Interviewer, before asking the next question.
-            - Don't list all questions in advance — just ask one at a time to mimic a real-life interview.
+# Sent second, identical for every turn of an interview
+INTERVIEW_CONTEXT = """
+    Here is the job description:
+    {job_description}
 
-            Here is the job description:
-            {job_description}
+    Here is the company description:
+    {company_description}
 
-            Here is the company description:
-            {company_description}
+    Here is the type of interview:
+    {interview_type}
+"""
 
-            Here is the type of interview:
-            {interview_type}
+class InterviewAgent:
+    def __init__(self, llm, budget: Optional[ContextBudget] = None):
+        self.llm = llm
+        self.budget = budget or ContextBudget.from_env()
+        self.interviewer_model = llm.with_structured_output(InterviewProcess)
+        self.usage = TokenUsageCallback("interview")
 
-            Remember to be friendly and engaging but direct with the candidate. Be human-like so don't just jump in the first question.
-        """
+    def __call__(self, state: InterviewState) -> Command[Literal['evaluator_agent', '__end__']]:
+        logger.info("---INTERVIEW AGENT---")
+        response = self.interviewer_model.invoke(self._messages(state), config=self.usage.config())
+        return self._route(state, response)
+
+    async def acall(self, state: InterviewState) -> Command[Literal['evaluator_agent', '__end__']]:
+        """Async version of __call__, awaiting the model without blocking the event loop."""
+        logger.info("---INTERVIEW AGENT---")
+        response = await self.interviewer_model.ainvoke(self._messages(state), config=self.usage.config())
+        return self._route(state, response)
 
-        interviewer_system_prompt = INTERVIEWER_SYSTEM_PROMPT.format(
+    def _messages(self, state: InterviewState) -> list:
+        interview_context = INTERVIEW_CONTEXT.format(
             job_description=state["job_description"],
             company_description=state["company_description"],
             interview_type=state["interview_type"],
         )
 
-        interviewer_model = self.llm.with_structured_output(InterviewProcess)
-
-        messages = [SystemMessage(content=interviewer_system_prompt)] + state["messages"]
-        messages_str = get_buffer_string(messages)
-
-        response = interviewer_model.invoke([HumanMessage(content=messages_str)])
+        # Stable system prompt, then the interview context, then the conversation appended turn by turn
+        context = self.budget.fit(
+            state["messages"],
+            pinned=[SystemMessage(content=INTERVIEWER_SYSTEM_PROMPT), SystemMessage(content=interview_context)],
+            caller="interview",
+        )
+        return context.messages
 
+    def _route(self, state: InterviewState, response: InterviewProcess) -> Command[Literal['evaluator_agent', '__end__']]:
         if response.end_interview:
             # Proceed to evaluator stage
             logger.info("INTERVIEW ENDED, PROCEEDING TO EVALUATOR AGENT")
@@ -1,42 +1,57 @@
 import logging
 from typing import Literal
-from langchain_core.messages import HumanMessage, AIMessage, get_buffer_string
+from langchain_core.messages import SystemMessage, AIMessage
 from langgraph.types import Command
 from ..interview_models import InterviewState, infoGathering
+from ..token_usage import TokenUsageCallback
 
 logger = logging.getLogger(__name__)
 
+# Sent first and identical for every conversation, so that OpenAI can cache the prompt prefix
+TRIAGE_SYSTEM_PROMPT = """
+You are a career coach specializing in helping people prepare for job interviews.
+Your task is to collect the interview type, company description, and job description from the user before handing it off to the interview_agent to start the interview simulation.
+The messages that follow have been exchanged so far with the user asking for the interview preparation.
+
+REMEMBER:
+- Remember to be friendly and engaging but direct with the candidate. Be human-like so don't just jump in the first question.
+"""
+
 class TriageAgent:
     def __init__(self, llm):
         self.llm = llm
+        self.triage_model = llm.with_structured_output(infoGathering)
+        self.usage = TokenUsageCallback("triage")
 
     def __call__(self, state: InterviewState) -> Command[Literal["interview_agent", "__end__"]]:
         logger.info("---TRIAGE AGENT---")
 
-        if 'triage_response' in state:
-            if not state['triage_response']['need_clarification']:
-                return Command(goto="interview_agent")
+        if self._triage_done(state):
+            return Command(goto="interview_agent")
 
-        TRIAGE_SYSTEM_PROMPT = """
-        You are a career coach specializing in helping people prepare for job interviews.
-        Your task is to collect the interview type, company description, and job description from the user before handing it off to the interview_agent to start the interview simulation.
-        These are the messages that have been exchanged so far from the user asking for the interview preparation:
-            <Messages>
-            {messages}
-            </Messages>
+        response = self.triage_model.invoke(self._messages(state), config=self.usage.config())
+        return self._route(response)
+
+    async def acall(self, state: InterviewState) -> Command[Literal["interview_agent", "__end__"]]:
+        """Async version of __call__, awaiting the model without blocking the event loop."""
+        logger.info("---TRIAGE AGENT---")
 
-        REMEMBER:
-        - Remember to be friendly and engaging but direct with the candidate. Be human-like so don't just jump in the first question.
-        """
+        if self._triage_done(state):
+            return Command(goto="interview_agent")
 
-        prompt_content = TRIAGE_SYSTEM_PROMPT.format(
-            messages=get_buffer_string(state["messages"]),
-        )
+        response = await self.triage_model.ainvoke(self._messages(state), config=self.usage.config())
+        return self._route(response)
 
-        triage_model = self.llm.with_structured_output(infoGathering)
+    @staticmethod
+    def _triage_done(state: InterviewState) -> bool:
+        return 'triage_response' in state and not state['triage_response']['need_clarification']
 
-        response = triage_model.invoke([HumanMessage(content=prompt_content)])
+    @staticmethod
+    def _messages(state: InterviewState) -> list:
+        # Stable system prompt, then the conversation as role-tagged messages
+        return [SystemMessage(content=TRIAGE_SYSTEM_PROMPT)] + state["messages"]
 
+    def _route(self, response: infoGathering) -> Command[Literal["interview_agent", "__end__"]]:
         if response.need_clarification:
             # End with clarifying question for user
             logger.info("ENDING WITH CLARIFYING QUESTION")
@@ -1,13 +1,18 @@
+from functools import lru_cache
+
 from agents import Agent, FileSearchTool
-from vector_store import vector_store
+from vector_store import get_knowledge_base
 
-knowledge_agent = Agent(
-    name="KnowledgeAgent",
-    instructions=(
-        "You answer user questions on my CV with concise, helpful responses using the FileSearchTool."
-    ),
-    tools=[FileSearchTool(
-            max_num_results=3,
-            vector_store_ids=[vector_store["id"]],
-        ),],
-)
+@lru_cache(maxsize=1)
+def get_knowledge_agent() -> Agent:
+    """Knowledge agent, built on first use: it needs the vector store id from OpenAI."""
+    return Agent(
+        name="KnowledgeAgent",
+        instructions=(
+            "You answer user questions on my CV with concise, helpful responses using the FileSearchTool."
+        ),
+        tools=[FileSearchTool(
+                max_num_results=3,
+                vector_store_ids=[get_knowledge_base()["id"]],
+            ),],
+    )
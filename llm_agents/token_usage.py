@@ -0,0 +1,52 @@
+import logging
+from typing import Any
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import LLMResult
+from langchain_core.runnables import RunnableConfig
+from langchain_core.runnables.config import ensure_config, merge_configs
+
+from services.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+PROMPT_TOKENS = metrics.counter("llm_prompt_tokens_total", "Prompt tokens sent to the model",
+                                labelnames=("caller",))
+PROMPT_CACHED_TOKENS = metrics.counter("llm_prompt_cached_tokens_total",
+                                       "Prompt tokens served from the OpenAI prompt cache", labelnames=("caller",))
+PROMPT_CACHE_RATIO = metrics.histogram(
+    "llm_prompt_cache_ratio", "Share of the prompt served from the OpenAI prompt cache, per call",
+    labelnames=("caller",), buckets=(0.0, 0.1, 0.25, 0.5, 0.75, 0.9, 1.0),
+)
+
+
+class TokenUsageCallback(BaseCallbackHandler):
+    """Records the prompt and cached tokens reported by every model call it is attached to (see config())."""
+
+    def __init__(self, caller: str):
+        self.caller = caller
+
+    def config(self) -> RunnableConfig:
+        """
+        Config of the current run with this callback added to its callbacks.
+
+        Passing {"callbacks": [...]} alone would replace the callbacks inherited from the graph
+        (token streaming, tracing) instead of adding to them.
+        """
+        return merge_configs(ensure_config(), {"callbacks": [self]})
+
+    def on_llm_end(self, response: LLMResult, **kwargs: Any) -> None:
+        for generations in response.generations:
+            for generation in generations:
+                usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+                if usage:
+                    self.record(usage)
+
+    def record(self, usage: dict):
+        prompt_tokens = usage.get("input_tokens", 0)
+        cached_tokens = (usage.get("input_token_details") or {}).get("cache_read", 0)
+        PROMPT_TOKENS.inc(prompt_tokens, caller=self.caller)
+        PROMPT_CACHED_TOKENS.inc(cached_tokens, caller=self.caller)
+        if prompt_tokens:
+            PROMPT_CACHE_RATIO.observe(cached_tokens / prompt_tokens, caller=self.caller)
+        logger.info("Prompt tokens (%s): %d, cached: %d", self.caller, prompt_tokens, cached_tokens)
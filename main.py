@@ -1,18 +1,44 @@
+import asyncio
 import os
+import time
+from contextlib import asynccontextmanager, suppress
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.requests import Request
-from fastapi.responses import RedirectResponse
+from fastapi.responses import JSONResponse, RedirectResponse
 from logging_config import logging
 from akv import AzureKeyVault
+from services.components import components
+from services.metrics import metrics
 
 # Import routers
-from routers import speech, upload, langgraph, voice_agent
+from routers import speech, upload, langgraph, voice_agent, metrics as metrics_router
 
-akv = AzureKeyVault()
-os.environ["OPENAI_API_KEY"] = akv.get_secret("openai-apikey")
 
-app = FastAPI()
+def load_openai_key() -> str:
+    api_key = AzureKeyVault().get_secret("openai-apikey")
+    os.environ["OPENAI_API_KEY"] = api_key
+    return api_key
+
+
+# The routers register their own components, most of them depending on this one
+components.register("openai_key", load_openai_key)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Models and clients load in the background: the app answers (503 where needed) meanwhile
+    components.start()
+    # Idle voice conversations are freed even when no new session comes to evict them
+    sweeper = asyncio.create_task(voice_agent.sweep_llm_sessions())
+    yield
+    sweeper.cancel()
+    with suppress(asyncio.CancelledError):
+        await sweeper
+    await components.stop()
+
+
+app = FastAPI(lifespan=lifespan)
 
 origins = [
     "http://localhost:5173",  # Vite dev server
@@ -27,10 +53,20 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+HTTP_REQUEST_SECONDS = metrics.histogram(
+    "http_request_duration_seconds", "HTTP request latency by route template",
+    labelnames=("method", "route", "status"),
+)
+
 @app.middleware("http")
 async def log_requests(request: Request, call_next):
     logging.info(f"Incoming request: {request.method} {request.url}")
+    start = time.perf_counter()
     response = await call_next(request)
+    # Route templates (e.g. /items/{id}) keep the number of series bounded
+    route = getattr(request.scope.get("route"), "path", "unmatched")
+    HTTP_REQUEST_SECONDS.observe(time.perf_counter() - start, method=request.method, route=route,
+                                 status=str(response.status_code))
     logging.info(f"Response status: {response.status_code} for {request.method} {request.url}")
     return response
 
@@ -38,11 +74,20 @@ app.include_router(speech.router)
 app.include_router(upload.router)
 app.include_router(langgraph.router)
 app.include_router(voice_agent.router)
+app.include_router(metrics_router.router)
 
 @app.get("/")
 async def root():
     return RedirectResponse(url="/docs")
 
+@app.get("/ready")
+async def ready():
+    """Readiness probe: 200 once every required component is loaded, 503 with their states until then."""
+    return JSONResponse(
+        status_code=200 if components.is_ready() else 503,
+        content={"ready": components.is_ready(), "components": components.status()},
+    )
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -1,33 +1,94 @@
-from fastapi import APIRouter, Depends
+import json
+import logging
+
+from fastapi import APIRouter, Depends, HTTPException
+from sse_starlette.sse import EventSourceResponse
 from dto.chat_response import ChatResponse
 from dto.completion_request import CompletionRequest
+from dto.evaluation_status import EvaluationStatus
 from auth_utils import check_role
-from llm_agents.chatbot_graph import ChatBotGraph
+from llm_agents.chatbot_graph import ChatBotGraph, EvaluationPendingError
 from langchain.chat_models import init_chat_model
 from azure.identity.aio import DefaultAzureCredential
 from azure.cosmos.aio import CosmosClient
+from services.components import components
 from services.cosmos_checkpointer import CosmosDBSaver
 import uuid
 
 router = APIRouter()
+logger = logging.getLogger(__name__)
 
-llm = init_chat_model("openai:gpt-4o")
-
-# Initialize Cosmos DB Client and Checkpointer
+# Cosmos DB holding the interview checkpoints
 COSMOS_URL = "https://tranllmcosmos.documents.azure.com:443/"
 DATABASE_NAME = "tranllm"
 CONTAINER_NAME = "memory"
 
-credential = DefaultAzureCredential()
-client = CosmosClient(COSMOS_URL, credential=credential)
-database = client.get_database_client(DATABASE_NAME)
-container = database.get_container_client(CONTAINER_NAME)
 
-checkpointer = CosmosDBSaver(container)
-graph = ChatBotGraph(llm, checkpointer=checkpointer)
+def load_graph() -> ChatBotGraph:
+    llm = init_chat_model("openai:gpt-4o")
+
+    # Initialize Cosmos DB Client and Checkpointer
+    credential = DefaultAzureCredential()
+    client = CosmosClient(COSMOS_URL, credential=credential)
+    database = client.get_database_client(DATABASE_NAME)
+    container = database.get_container_client(CONTAINER_NAME)
+
+    checkpointer = CosmosDBSaver(container)
+    return ChatBotGraph(llm, checkpointer=checkpointer, defer_evaluation=True)
+
+
+components.register("graph", load_graph, depends_on=["openai_key"])
+
+def user_thread_id(user: dict) -> str:
+    user_email = user.get("preferred_username", "")
+    return f"thread_{user_email}" if user_email else f"thread_{uuid.uuid4()}"
+
+def evaluation_pending() -> HTTPException:
+    return HTTPException(status_code=409, detail="The interview is being evaluated, poll /langgraph/evaluation first")
 
-@router.post("/langgraph/question")
+@router.post("/langgraph/question", dependencies=[Depends(components.require("graph"))])
 async def ask_question(request: CompletionRequest, user = Depends(check_role("APIUser"))) -> ChatResponse:
+    thread_id = user_thread_id(user)
+    graph = components.get("graph")
+    try:
+        return await graph.invoke(request.message, request.endInterview,thread_id)
+    except EvaluationPendingError as e:
+        raise evaluation_pending() from e
+
+@router.post("/langgraph/question/stream", dependencies=[Depends(components.require("graph"))])
+async def ask_question_stream(request: CompletionRequest, user = Depends(check_role("APIUser"))) -> EventSourceResponse:
+    """
+    Same as /langgraph/question, as Server-Sent Events: "token" events carry the reply as it is
+    written, "node" events the graph steps, and the last event is "response" (the ChatResponse)
+    or "error".
+    """
+    thread_id = user_thread_id(user)
+    graph = components.get("graph")
+    # Refused before the stream starts, so that the client gets a 409 rather than an "error" event
+    try:
+        await graph.check_accepts_turns(thread_id)
+    except EvaluationPendingError as e:
+        raise evaluation_pending() from e
+
+    async def events():
+        try:
+            async for event, data in graph.astream(request.message, request.endInterview, thread_id):
+                yield {"event": event, "data": json.dumps(data)}
+        except Exception as e:
+            logger.exception("Streaming question failed for %s", thread_id)
+            yield {"event": "error", "data": json.dumps({"message": str(e)})}
+
+    return EventSourceResponse(events())
+
+
+@router.get("/langgraph/evaluation/{thread_id}", dependencies=[Depends(components.require("graph"))])
+async def get_evaluation(thread_id: str, user = Depends(check_role("APIUser"))) -> EvaluationStatus:
+    """
+    Poll the evaluation started when an interview ends (see evaluation_job_id in ChatResponse).
+    The scorecard is returned once the status is "completed".
+    """
     user_email = user.get("preferred_username", "")
-    thread_id = f"thread_{user_email}" if user_email else f"thread_{uuid.uuid4()}"
-    return await graph.invoke(request.message, request.endInterview,thread_id)
+    if not user_email or thread_id != f"thread_{user_email}":
+        raise HTTPException(status_code=403, detail="Not your interview")
+    graph = components.get("graph")
+    return await graph.evaluation(thread_id)
@@ -3,22 +3,31 @@ from fastapi.responses import JSONResponse
 import httpx
 from akv import AzureKeyVault
 from auth_utils import check_role
+from services.components import components
 
 router = APIRouter()
 
-akv = AzureKeyVault()
-AZURE_SPEECH_KEY = akv.get_secret("azure-speech-key")
-if not AZURE_SPEECH_KEY:
-    raise ValueError("AZURE_SPEECH_KEY is not set in AKV")
 AZURE_SPEECH_REGION = "eastasia"
 
-@router.get("/speech/token")
+
+def load_speech_key() -> str:
+    speech_key = AzureKeyVault().get_secret("azure-speech-key")
+    if not speech_key:
+        raise ValueError("AZURE_SPEECH_KEY is not set in AKV")
+    return speech_key
+
+
+# Not required for readiness: only this router answers 503 while it is missing
+components.register("speech_key", load_speech_key, required=False)
+
+@router.get("/speech/token", dependencies=[Depends(components.require("speech_key"))])
 async def get_speech_token(user = Depends(check_role("APIUser"))):
-    if not AZURE_SPEECH_KEY or not AZURE_SPEECH_REGION:
+    speech_key = components.get("speech_key")
+    if not speech_key or not AZURE_SPEECH_REGION:
         raise HTTPException(status_code=500, detail="Speech key/region not configured")
     token_url = f"https://{AZURE_SPEECH_REGION}.api.cognitive.microsoft.com/sts/v1.0/issueToken"
     headers = {
-        "Ocp-Apim-Subscription-Key": AZURE_SPEECH_KEY,
+        "Ocp-Apim-Subscription-Key": speech_key,
         "Content-Type": "application/x-www-form-urlencoded",
     }
     async with httpx.AsyncClient() as client:
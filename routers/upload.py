@@ -1,11 +1,15 @@
 from fastapi import APIRouter, UploadFile, File, Depends, HTTPException
 from storage_account import AzureStorageAccount
 from auth_utils import check_role
-from vector_store import upload_files
+from services.components import components
+from vector_store import get_knowledge_base, upload_files
 
 router = APIRouter()
 
-@router.post("/upload/vector_store")
+# Not required for readiness: only this router answers 503 while it is missing
+components.register("vector_store", get_knowledge_base, required=False)
+
+@router.post("/upload/vector_store", dependencies=[Depends(components.require("vector_store"))])
 async def upload_vector_store(user = Depends(check_role("APIUser"))):
     result = upload_files()
     return result
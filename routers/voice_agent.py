@@ -2,22 +2,82 @@
 Voice Agent Router - WebSocket endpoint for voice interaction.
 """
 
+import asyncio
 import json
 import base64
 import os
+import time
 import uuid
+from contextlib import aclosing
+from typing import Optional
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect
+from pydantic import ValidationError
+from dto.voice_session_config import VoiceSessionConfig
+from services.audio_buffer import AudioBufferFullError, SessionAudioBuffer, is_stale_recorder_chunk
+from services.components import components
+from services.executor import StageBusyError
 from services.stt_service import STTService
+from services.stt_stream import STTStream
 from services.llm_service import LLMService
+from services.metrics import metrics
 from services.tts_service import TTSService
 
 router = APIRouter()
 
-# Initialize services
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-stt_service = STTService(model_size='large-v3', device='cpu')
-llm_service = LLMService(api_key=OPENAI_API_KEY, model="gpt-5-mini", cv_path="./cv.pdf")
-tts_service = TTSService(voice="af_heart")
+# Services are loaded in the background by the application lifespan
+VOICE_COMPONENTS = ("stt", "voice_llm", "tts")
+components.register("stt", lambda: STTService(model_size='large-v3', device='cpu'))
+components.register(
+    "voice_llm",
+    lambda: LLMService(api_key=os.getenv("OPENAI_API_KEY"), model="gpt-5-mini", cv_path="./cv.pdf"),
+    depends_on=["openai_key"],
+)
+components.register(
+    "tts",
+    lambda: TTSService(voice="af_heart", lang_code="b", pool_size=int(os.getenv("VOICE_TTS_POOL_SIZE", "2"))),
+)
+
+
+async def sweep_llm_sessions():
+    """
+    Delete the expired conversation threads of the voice LLM every VOICE_LLM_SESSION_SWEEP_S
+    seconds, once it is loaded. Run by the application lifespan until shutdown.
+    """
+    await components.wait("voice_llm")
+    if not components.is_ready("voice_llm"):
+        return
+    await components.get("voice_llm").sessions.sweep_periodically(
+        float(os.getenv("VOICE_LLM_SESSION_SWEEP_S", "60"))
+    )
+
+# Transcribe speech segments while the user is still talking
+STREAMING_STT = os.getenv("VOICE_STREAMING_STT", "true").lower() == "true"
+
+WS_SESSIONS_ACTIVE = metrics.gauge("voice_ws_sessions_active", "Open /ws voice sessions")
+VOICE_TURN_SECONDS = metrics.histogram(
+    "voice_turn_seconds", "Time from audio_end to each step of the answer (transcript, first_audio, complete)",
+    labelnames=("milestone",), buckets=(0.25, 0.5, 0.75, 1.0, 1.5, 2.0, 3.0, 5.0, 7.5, 10.0, 20.0, 30.0),
+)
+VOICE_TURNS = metrics.counter("voice_turns_total", "Voice turns by outcome", labelnames=("outcome",))
+
+
+async def send_audio(websocket: WebSocket, config: VoiceSessionConfig, audio: bytes, seq: Optional[int] = None):
+    """Send synthesized audio as a raw binary frame or as base64 JSON, as negotiated."""
+    if config.binary:
+        await websocket.send_bytes(audio)
+    elif seq is None:
+        await websocket.send_json({
+            "type": "audio_response",
+            "codec": config.codec,
+            "data": base64.b64encode(audio).decode('utf-8')
+        })
+    else:
+        await websocket.send_json({
+            "type": "audio_response_chunk",
+            "seq": seq,
+            "codec": config.codec,
+            "data": base64.b64encode(audio).decode('utf-8')
+        })
 
 
 @router.websocket("/ws")
@@ -26,79 +86,286 @@ async def voice_agent_websocket(websocket: WebSocket):
     WebSocket endpoint for voice interaction.
     
     Protocol:
+    - Client sends: {"type": "config", ...VoiceSessionConfig fields} (optional, any time)
+    - Server sends: {"type": "config", "config": {...}} with the session configuration in effect
     - Client sends: {"type": "audio_chunk", "data": "base64_audio"}
     - Client sends: {"type": "audio_end"} when done recording
-    - Server sends: {"type": "audio_response", "data": "base64_audio"}
+    - Server sends: {"type": "partial_transcript", "data": "text"} for each speech segment
+      transcribed while recording (streaming STT only)
+    - Server sends: {"type": "transcript", "data": "text"} with the full transcript
+    - Server sends: {"type": "audio_response", "codec": "wav", "data": "base64_audio"}
+    - With stream_audio, instead of audio_response the server sends one
+      {"type": "audio_response_chunk", "seq": n, "codec": "wav", "data": "base64_audio"} per sentence
+      (a complete audio file each, seq starting at 0) followed by {"type": "audio_response_end", "chunks": count}.
+      Sentences are synthesized as the LLM streams them, before the full answer is written
+    - Audio is PCM WAV unless the client negotiates {"type": "config", "codec": "flac" | "opus"};
+      opus replies are OGG/Opus files, about ten times smaller than WAV
+
+    Binary framing (for clients that negotiate it, the JSON protocol above stays the default):
+    - Client may send raw audio as binary frames instead of audio_chunk messages
+    - With {"type": "config", "binary": true}, audio_response and audio_response_chunk messages
+      are replaced by binary frames holding the raw audio, in order. Control messages
+      (transcripts, audio_response_end, errors) stay JSON
+
+    Barge-in: an answer is produced in the background. A new audio_chunk or a reset while it is
+    in progress stops it (LLM stream and pending synthesis included) and the server sends
+    {"type": "status", "code": "interrupted", ...}: the client should drop any audio it still has queued.
+
+    A recording larger than VOICE_AUDIO_MAX_BYTES is discarded with
+    {"type": "error", "code": "audio_buffer_full", ...}; its remaining chunks are ignored until audio_end or reset.
+
+    Until the speech models are loaded, the connection is closed with code 1013 (try again later).
     """
     await websocket.accept()
+    if not components.is_ready(*VOICE_COMPONENTS):
+        print("[WS] Rejected client: voice services are still loading")
+        await websocket.close(code=1013, reason="Voice services are warming up, try again later")
+        return
+    stt_service = components.get("stt")
+    llm_service = components.get("voice_llm")
+    tts_service = components.get("tts")
     print("[WS] Client connected")
     
     # Session ID and audio buffer
     # Generate a unique session ID for this WebSocket connection for LLM memory
     session_id = f"voice_session_{uuid.uuid4()}"
     print(f"[WS] Session ID: {session_id}")
-    audio_chunks = []
+    audio = SessionAudioBuffer.from_env()
+    # Set once a recording outgrows the buffer: its remaining chunks are dropped
+    audio_overflow = False
+    config = VoiceSessionConfig()
+    stt_stream = STTStream(stt_service, audio) if STREAMING_STT else None
+
+    def clear_audio():
+        nonlocal audio_overflow
+        audio_overflow = False
+        audio.clear()
+        if stt_stream is not None:
+            stt_stream.reset()
+
+    async def run_turn(complete_audio: memoryview, config: VoiceSessionConfig):
+        """Answer one recording: STT → LLM → TTS."""
+        start = time.perf_counter()
+        try:
+            # Step 1: Speech-to-Text (streaming mode only has the last segment left)
+            if stt_stream is not None:
+                transcript = await stt_stream.afinish()
+            else:
+                transcript = await stt_service.atranscribe(complete_audio)
+            if not transcript:
+                await websocket.send_json({
+                    "type": "error",
+                    "message": "Could not transcribe audio"
+                })
+                VOICE_TURNS.inc(outcome="no_speech")
+                return
+            await websocket.send_json({
+                "type": "transcript",
+                "data": transcript
+            })
+            VOICE_TURN_SECONDS.observe(time.perf_counter() - start, milestone="transcript")
+            
+            if config.stream_audio:
+                # Steps 2+3 pipelined: each sentence streamed by the LLM is synthesized
+                # and sent while the LLM is still writing the next ones
+                sentences = llm_service.astream_sentences(transcript, thread_id=session_id)
+                seq = 0
+                # Closed explicitly on cancellation, which stops the LLM stream and drops pending synthesis
+                async with aclosing(tts_service.astream_synthesize_sentences(sentences, codec=config.codec)) as audio_stream:
+                    async for audio_chunk in audio_stream:
+                        if seq == 0:
+                            VOICE_TURN_SECONDS.observe(time.perf_counter() - start, milestone="first_audio")
+                        await send_audio(websocket, config, audio_chunk, seq=seq)
+                        seq += 1
+                await websocket.send_json({
+                    "type": "audio_response_end",
+                    "chunks": seq
+                })
+            else:
+                # Step 2: LLM Response (with session_id for memory)
+                response_text = await llm_service.agenerate_response(transcript, thread_id=session_id)
+            
+                # Step 3: Text-to-Speech
+                audio_response = await tts_service.asynthesize(response_text, codec=config.codec)
+            
+                # Send audio response
+                VOICE_TURN_SECONDS.observe(time.perf_counter() - start, milestone="first_audio")
+                await send_audio(websocket, config, audio_response)
+            VOICE_TURN_SECONDS.observe(time.perf_counter() - start, milestone="complete")
+            VOICE_TURNS.inc(outcome="completed")
+            print("[WS] Response sent")
+
+        except asyncio.CancelledError:
+            VOICE_TURNS.inc(outcome="interrupted")
+            raise
+
+        except WebSocketDisconnect:
+            # Nobody is left to send the answer (or an error) to
+            print(f"[WS] Client left during the turn [{session_id}]")
+            VOICE_TURNS.inc(outcome="disconnected")
+
+        except StageBusyError as e:
+            print(f"[WS] Busy [{session_id}]: {e}")
+            VOICE_TURNS.inc(outcome="busy")
+            clear_audio()
+            await websocket.send_json({
+                "type": "error",
+                "code": "busy",
+                "message": str(e)
+            })
+
+        except Exception as e:
+            print(f"[WS] Error: {e}")
+            VOICE_TURNS.inc(outcome="error")
+            clear_audio()
+            await websocket.send_json({
+                "type": "error",
+                "message": str(e)
+            })
+
+    turn: Optional[asyncio.Task] = None
+    # Set when audio_end starts a turn, until the next recording: a repeated audio_end is ignored
+    recording_submitted = False
+
+    async def cancel_turn() -> bool:
+        """Stop the turn in progress, if any, and tell whether one was interrupted."""
+        nonlocal turn
+        if turn is None:
+            return False
+        task, turn = turn, None
+        interrupted = not task.done()
+        task.cancel()
+        # Always collect the outcome, so that a turn that failed on its own (e.g. sending to a
+        # closed socket) is not reported by asyncio as "Task exception was never retrieved"
+        try:
+            await task
+        except (asyncio.CancelledError, WebSocketDisconnect):
+            pass
+        except Exception as e:
+            print(f"[WS] Turn failed [{session_id}]: {e}")
+        if not interrupted:
+            return False
+        # The interrupted recording is dropped with its partial transcripts
+        clear_audio()
+        print(f"[WS] Turn interrupted [{session_id}]")
+        return True
+
+    async def interrupt_turn():
+        """Cancel the turn in progress and let the client drop the audio it still has queued."""
+        if await cancel_turn():
+            await websocket.send_json({
+                "type": "status",
+                "code": "interrupted",
+                "message": "Response interrupted"
+            })
     
+    # Counted only once the session is set up: the finally below is what takes it back off
+    WS_SESSIONS_ACTIVE.inc()
     try:
         while True:
-            # Receive message
-            message = json.loads(await websocket.receive_text())
+            # Receive message: binary frames carry raw audio, text frames carry JSON
+            raw_message = await websocket.receive()
+            if raw_message["type"] == "websocket.disconnect":
+                raise WebSocketDisconnect(raw_message.get("code", 1000))
+            binary_audio = raw_message.get("bytes")
+            if binary_audio is not None:
+                message = {"type": "audio_chunk"}
+            else:
+                message = json.loads(raw_message["text"])
             msg_type = message.get("type")
             
-            if msg_type == "audio_chunk":
+            if msg_type == "config":
+                try:
+                    updates = {key: value for key, value in message.items() if key != "type"}
+                    config = VoiceSessionConfig(**{**config.model_dump(), **updates})
+                except ValidationError as e:
+                    await websocket.send_json({
+                        "type": "error",
+                        "message": f"Invalid config: {e}"
+                    })
+                    continue
+                print(f"[WS] Session config [{session_id}]: {config}")
+                await websocket.send_json({
+                    "type": "config",
+                    "config": config.model_dump()
+                })
+
+            elif msg_type == "audio_chunk":
                 # Receive and buffer audio chunk
                 base64_audio = message.get("data")
-                if not base64_audio:
+                if binary_audio is None and not base64_audio:
                     print("[WS] Warning: Received audio_chunk with no data")
                     continue
+                # Barge-in: the user speaks again while the previous answer is being produced
+                await interrupt_turn()
+                recording_submitted = False
+                if audio_overflow:
+                    continue
                 
                 try:
-                    audio_bytes = base64.b64decode(base64_audio)
+                    audio_bytes = binary_audio if binary_audio is not None else base64.b64decode(base64_audio)
                     if len(audio_bytes) == 0:
                         print("[WS] Warning: Decoded audio chunk is empty")
                         continue
                     
-                    # Validate it looks like audio data (check for common audio headers)
-                    # Only check first chunk to avoid performance issues
-                    if len(audio_chunks) == 0 and len(audio_bytes) >= 4:
-                        first_bytes = audio_bytes[:4]
-                        # Check if it looks like valid audio (WebM, WAV, MP3, etc.)
-                        is_valid = (
-                            first_bytes[:4] == b'\x1a\x45\xdf\xa3' or  # WebM
-                            first_bytes[:4] == b'RIFF' or  # WAV
-                            (first_bytes[0] == 0xFF and (first_bytes[1] & 0xE0) == 0xE0) or  # MP3
-                            first_bytes[:3] == b'ID3' or  # MP3 ID3
-                            first_bytes[:4] == b'OggS' or  # OGG
-                            first_bytes[:4] == b'fLaC'  # FLAC
-                        )
-                        if not is_valid:
-                            # Check for known corrupted patterns (MediaRecorder not reset)
-                            # This often happens on the first chunk but subsequent chunks are valid
-                            if first_bytes[:4] == b'C\xc3\x81\x07' or first_bytes[:2] == b'C\xc3':
-                                print(f"[WS] Warning [{session_id}]: Corrupted first chunk detected (hex: {first_bytes.hex()}). "
-                                      f"This usually means MediaRecorder wasn't reset. Skipping this chunk and continuing...")
-                                # Skip this corrupted chunk but don't send error to client yet
-                                # If subsequent chunks are valid, the recording will still work
-                                continue
-                            else:
-                                print(f"[WS] Warning [{session_id}]: First chunk doesn't look like valid audio. First 4 bytes (hex): {first_bytes.hex()}")
-                                # Still add it - might be valid audio we don't recognize
+                    # Only the first chunk carries the container header
+                    if len(audio) == 0 and is_stale_recorder_chunk(audio_bytes):
+                        # This often happens on the first chunk but subsequent chunks are valid
+                        print(f"[WS] Warning [{session_id}]: Corrupted first chunk detected (hex: {audio_bytes[:4].hex()}). "
+                              f"This usually means MediaRecorder wasn't reset. Skipping this chunk and continuing...")
+                        continue
                     
-                    audio_chunks.append(audio_bytes)
-                    print(f"[WS] Buffered chunk: {len(audio_bytes)} bytes (total chunks: {len(audio_chunks)})")
+                    audio.append(audio_bytes)
+                    if audio.chunks == 1 and audio.format is None:
+                        # Still keep it - might be valid audio we don't recognize
+                        print(f"[WS] Warning [{session_id}]: First chunk doesn't look like valid audio. First 4 bytes (hex): {audio_bytes[:4].hex()}")
+                    print(f"[WS] Buffered chunk: {len(audio_bytes)} bytes (total: {len(audio)} bytes, {audio.chunks} chunks)")
+                except AudioBufferFullError as e:
+                    # Refuse the rest of this recording instead of letting it grow without bound
+                    print(f"[WS] Audio buffer full [{session_id}]: {e}")
+                    clear_audio()
+                    audio_overflow = True
+                    await websocket.send_json({
+                        "type": "error",
+                        "code": "audio_buffer_full",
+                        "message": f"{e}. The recording was discarded, send a shorter one"
+                    })
+                    continue
                 except Exception as e:
                     print(f"[WS] Error decoding base64 audio chunk: {e}")
-                    audio_chunks.clear()  # Clear on error
+                    clear_audio()  # Clear on error
                     await websocket.send_json({
                         "type": "error",
                         "message": f"Invalid audio data: {str(e)}"
                     })
+                    continue
+
+                if stt_stream is not None:
+                    try:
+                        for text in await stt_stream.afeed():
+                            await websocket.send_json({
+                                "type": "partial_transcript",
+                                "data": text
+                            })
+                    except Exception as e:
+                        # Not fatal: the remaining audio is transcribed on audio_end
+                        print(f"[WS] Error during streaming transcription [{session_id}]: {e}")
             
             elif msg_type == "audio_end":
+                if recording_submitted:
+                    # Duplicate audio_end: this recording is already being (or was) answered
+                    print(f"[WS] Ignored repeated audio_end [{session_id}]")
+                    continue
+
                 # Process complete audio: STT → LLM → TTS
-                print(f"[WS] Processing {len(audio_chunks)} chunks for session {session_id}...")
+                print(f"[WS] Processing {audio.chunks} chunks for session {session_id}...")
+                
+                if audio_overflow:
+                    # The error was sent when the buffer filled up; get ready for the next recording
+                    clear_audio()
+                    continue
                 
-                if not audio_chunks:
+                if len(audio) == 0:
                     await websocket.send_json({
                         "type": "error",
                         "message": "No audio data received"
@@ -106,89 +373,49 @@ async def voice_agent_websocket(websocket: WebSocket):
                     continue
                 
                 try:
-                    # Combine all chunks
-                    complete_audio = b''.join(audio_chunks)
-                    
                     # Validate audio data
-                    if len(complete_audio) < 100:  # Minimum reasonable audio size
-                        await websocket.send_json({
-                            "type": "error",
-                            "message": f"Audio too short: {len(complete_audio)} bytes"
-                        })
-                        audio_chunks.clear()
-                        continue
-                    
-                    # Validate the combined audio has a valid header
-                    if len(complete_audio) >= 4:
-                        first_bytes = complete_audio[:4]
-                        is_valid = (
-                            first_bytes[:4] == b'\x1a\x45\xdf\xa3' or  # WebM
-                            first_bytes[:4] == b'RIFF' or  # WAV
-                            (first_bytes[0] == 0xFF and (first_bytes[1] & 0xE0) == 0xE0) or  # MP3
-                            first_bytes[:3] == b'ID3' or  # MP3 ID3
-                            first_bytes[:4] == b'OggS' or  # OGG
-                            first_bytes[:4] == b'fLaC'  # FLAC
-                        )
-                        if not is_valid:
-                            # Check for known corrupted pattern
-                            if first_bytes[:4] == b'C\xc3\x81\x07' or first_bytes[:2] == b'C\xc3':
-                                error_msg = (
-                                    "Corrupted audio data detected. The MediaRecorder may not have been "
-                                    "properly reset. Please stop and recreate the MediaRecorder before "
-                                    "starting a new recording."
-                                )
-                                print(f"[WS] ERROR [{session_id}]: {error_msg}")
-                                print(f"[WS] First 4 bytes (hex): {first_bytes.hex()}")
-                                print(f"[WS] Total audio size: {len(complete_audio)} bytes, chunks: {len(audio_chunks)}")
-                                audio_chunks.clear()
-                                await websocket.send_json({
-                                    "type": "error",
-                                    "message": error_msg
-                                })
-                                continue
-                            else:
-                                print(f"[WS] Warning [{session_id}]: Combined audio doesn't have valid header. First 4 bytes (hex): {first_bytes.hex()}")
-                                # Try to proceed anyway - STT service might handle it
-                    
-                    # Clear chunks immediately after combining (before processing)
-                    # This prevents issues if processing fails
-                    audio_chunks.clear()
-                    
-                    print(f"[WS] Combined audio: {len(complete_audio)} bytes (session: {session_id})")
-                    
-                    # Step 1: Speech-to-Text
-                    transcript = stt_service.transcribe(complete_audio)
-                    if not transcript:
+                    if len(audio) < 100:  # Minimum reasonable audio size
                         await websocket.send_json({
                             "type": "error",
-                            "message": "Could not transcribe audio"
+                            "message": f"Audio too short: {len(audio)} bytes"
                         })
+                        clear_audio()
                         continue
                     
-                    # Step 2: LLM Response (with session_id for memory)
-                    response_text = llm_service.generate_response(transcript, thread_id=session_id)
+                    if audio.format is None:
+                        print(f"[WS] Warning [{session_id}]: Recording doesn't have a valid header. First 4 bytes (hex): {audio.view()[:4].hex()}")
+                        # Try to proceed anyway - STT service might handle it
                     
-                    # Step 3: Text-to-Speech
-                    audio_response = tts_service.synthesize(response_text)
+                    print(f"[WS] Combined audio: {len(audio)} bytes, format: {audio.format} (session: {session_id})")
                     
-                    # Send audio response
-                    audio_base64 = base64.b64encode(audio_response).decode('utf-8')
-                    await websocket.send_json({
-                        "type": "audio_response",
-                        "data": audio_base64
-                    })
-                    print("[WS] Response sent")
-                
+                    # Detach the recording before processing (the view stays valid after clear())
+                    # This prevents issues if processing fails
+                    complete_audio = audio.view()
+                    if stt_stream is None:
+                        audio.clear()
                 except Exception as e:
                     print(f"[WS] Error: {e}")
+                    clear_audio()
                     await websocket.send_json({
                         "type": "error",
                         "message": str(e)
                     })
+                    continue
+
+                # The turn runs in the background so that new speech, a reset or a disconnect can interrupt it
+                await cancel_turn()
+                turn = asyncio.create_task(run_turn(complete_audio, config))
+                recording_submitted = True
             
             elif msg_type == "reset":
                 # Reset conversation
-                audio_chunks.clear()
+                await interrupt_turn()
+                clear_audio()
+                recording_submitted = False
+                # A fresh thread: an interrupted call finishing late cannot write into the new conversation
+                llm_service.release_session(session_id)
+                session_id = f"voice_session_{uuid.uuid4()}"
+                print(f"[WS] Session ID: {session_id}")
                 await websocket.send_json({
                     "type": "status",
                     "message": "Conversation reset"
@@ -197,11 +424,17 @@ async def voice_agent_websocket(websocket: WebSocket):
     except WebSocketDisconnect:
         print("[WS] Client disconnected")
     finally:
-        # Cleanup
-        audio_chunks.clear()
+        # Cleanup: nobody is listening to the answer anymore
+        await cancel_turn()
+        clear_audio()
+        llm_service.release_session(session_id)
+        WS_SESSIONS_ACTIVE.dec()
 
 
 @router.get("/health")
 async def health_check():
     """Health check endpoint."""
-    return {"status": "healthy", "service": "voice_agent"}
\ No newline at end of file
+    health = {"status": "healthy", "service": "voice_agent", "ready": components.is_ready(*VOICE_COMPONENTS)}
+    if components.is_ready("tts"):
+        health["tts_cache"] = components.get("tts").cache.stats()
+    return health
\ No newline at end of file
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Benchmark the STT input paths: temp file on disk vs in-memory decoding.
+
+Usage:
+    python sandbox/benchmark_stt_decode.py                      # synthetic 10s WAV, decode only
+    python sandbox/benchmark_stt_decode.py --audio rec.webm     # recorded audio
+    python sandbox/benchmark_stt_decode.py --model tiny         # also time full transcription
+"""
+
+import argparse
+import io
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+import numpy as np
+import soundfile as sf
+from faster_whisper.audio import decode_audio
+
+# Add the parent directory to the path so we can import the services
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.stt_service import SAMPLE_RATE, decode_audio_bytes
+
+
+def synthetic_wav(seconds: float) -> bytes:
+    """A WAV recording of a tone with a few pauses, the shape of a spoken answer."""
+    t = np.arange(int(seconds * 48000)) / 48000
+    audio = 0.2 * np.sin(2 * np.pi * 220 * t) * (np.sin(2 * np.pi * 0.5 * t) > -0.5)
+    buf = io.BytesIO()
+    sf.write(buf, audio.astype(np.float32), 48000, format="WAV")
+    return buf.getvalue()
+
+
+def decode_via_temp_file(audio_bytes: bytes) -> np.ndarray:
+    """The previous STTService path: write a temp file, decode it from disk, unlink it."""
+    temp_file = tempfile.NamedTemporaryFile(delete=False, suffix=".audio")
+    try:
+        temp_file.write(audio_bytes)
+        temp_file.flush()
+        temp_file.close()
+        with open(temp_file.name, "rb"):
+            return decode_audio(temp_file.name, sampling_rate=SAMPLE_RATE)
+    finally:
+        os.unlink(temp_file.name)
+
+
+def timeit(fn, runs: int) -> list:
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def report(name: str, timings: list):
+    print(f"{name:<28} median {statistics.median(timings):8.2f} ms | "
+          f"min {min(timings):8.2f} ms | max {max(timings):8.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--audio", help="Recorded audio file (default: synthetic WAV)")
+    parser.add_argument("--seconds", type=float, default=10.0, help="Length of the synthetic recording")
+    parser.add_argument("--runs", type=int, default=20, help="Runs per path")
+    parser.add_argument("--model", help="Whisper model size to also time full transcription (e.g. tiny)")
+    args = parser.parse_args()
+
+    if args.audio:
+        with open(args.audio, "rb") as f:
+            audio_bytes = f.read()
+    else:
+        audio_bytes = synthetic_wav(args.seconds)
+
+    samples = decode_audio_bytes(audio_bytes)
+    print(f"Input: {len(audio_bytes)} bytes, {len(samples) / SAMPLE_RATE:.1f}s of audio, {args.runs} runs")
+    np.testing.assert_array_equal(samples, decode_via_temp_file(audio_bytes))
+
+    report("decode: temp file", timeit(lambda: decode_via_temp_file(audio_bytes), args.runs))
+    report("decode: in memory", timeit(lambda: decode_audio_bytes(audio_bytes), args.runs))
+
+    if args.model:
+        from faster_whisper import WhisperModel
+        model = WhisperModel(args.model, device="cpu", compute_type="int8")
+
+        def transcribe(audio):
+            segments, _ = model.transcribe(audio)
+            return "".join(segment.text for segment in segments)
+
+        runs = max(1, args.runs // 5)
+        report("transcribe: temp file", timeit(lambda: transcribe(decode_via_temp_file(audio_bytes)), runs))
+        report("transcribe: in memory", timeit(lambda: transcribe(decode_audio_bytes(audio_bytes)), runs))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,372 @@
+#!/usr/bin/env python3
+"""
+Load test for the /ws voice endpoint: N concurrent sessions, latency percentiles per stage.
+
+Every session sends a recording in chunks, then audio_end, and times the answer:
+    stt          audio_end -> transcript
+    llm          transcript -> first audio frame (the LLM up to its first sentence, and its synthesis)
+    tts          between two audio frames (the next sentence ready, with --stream-audio only)
+    first_audio  audio_end -> first audio frame (what the user waits for)
+    end_to_end   audio_end -> last audio frame
+
+The server sends no timings: llm and tts are derived from the arrival of its messages, so
+with --stream-audio a frame can wait on either the LLM or the synthesis of its sentence.
+
+Usage:
+    python sandbox/voice_load_test.py --stub                          # local server with fake services
+    python sandbox/voice_load_test.py --stub --sessions 50 --stream-audio --binary
+    python sandbox/voice_load_test.py --stub --stt-ms 800 --llm-ttft-ms 600 --tts-ms 150
+    python sandbox/voice_load_test.py --url ws://localhost:8000/ws --audio rec.webm --sessions 5
+
+Stub mode starts the real router and protocol in a separate process, with STTService,
+LLMService and TTSService replaced by deterministic fakes that only wait (on the same
+worker pools as the real services). It needs no network and no models, so it measures
+the router, executors and protocol overhead.
+"""
+
+import argparse
+import asyncio
+import base64
+import io
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+import soundfile as sf
+import websockets
+
+# Add the parent directory to the path so we can import the services
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+STAGES = ("stt", "llm", "tts", "first_audio", "end_to_end")
+
+
+def synthetic_wav(seconds: float, sample_rate: int = 16000) -> bytes:
+    """A WAV recording of tone bursts separated by pauses, the shape of a spoken answer."""
+    t = np.arange(int(seconds * sample_rate)) / sample_rate
+    audio = 0.2 * np.sin(2 * np.pi * 220 * t) * (np.sin(2 * np.pi * 0.5 * t) > -0.5)
+    buf = io.BytesIO()
+    sf.write(buf, audio.astype(np.float32), sample_rate, format="WAV", subtype="PCM_16")
+    return buf.getvalue()
+
+
+def read_file(path: str) -> bytes:
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def split_chunks(audio_bytes: bytes, chunk_bytes: int) -> List[bytes]:
+    return [audio_bytes[i:i + chunk_bytes] for i in range(0, len(audio_bytes), chunk_bytes)]
+
+
+class Results:
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = {stage: [] for stage in STAGES}
+        self.errors: Dict[str, int] = {}
+        self.turns = 0
+
+    def error(self, code: str):
+        self.errors[code] = self.errors.get(code, 0) + 1
+
+    def summary(self, elapsed: float) -> dict:
+        stages = {}
+        for stage, values in self.latencies.items():
+            if not values:
+                continue
+            ms = np.array(values) * 1000
+            stages[stage] = {
+                "count": len(values),
+                "mean_ms": float(ms.mean()),
+                "p50_ms": float(np.percentile(ms, 50)),
+                "p95_ms": float(np.percentile(ms, 95)),
+                "p99_ms": float(np.percentile(ms, 99)),
+                "max_ms": float(ms.max()),
+            }
+        return {
+            "turns": self.turns,
+            "elapsed_s": elapsed,
+            "turns_per_s": self.turns / elapsed if elapsed else 0.0,
+            "errors": self.errors,
+            "stages": stages,
+        }
+
+
+async def run_turn(ws, chunks: List[bytes], args, results: Results):
+    for chunk in chunks:
+        if args.binary:
+            await ws.send(chunk)
+        else:
+            await ws.send(json.dumps({"type": "audio_chunk", "data": base64.b64encode(chunk).decode()}))
+        if args.chunk_ms and args.realtime:
+            await asyncio.sleep(args.chunk_ms / 1000)
+
+    start = time.perf_counter()
+    await ws.send(json.dumps({"type": "audio_end"}))
+    transcript = first_audio = last_audio = None
+
+    def audio_frame(now: float):
+        nonlocal first_audio, last_audio
+        if first_audio is None:
+            first_audio = now
+            if transcript is not None:
+                results.latencies["llm"].append(now - transcript)
+        else:
+            results.latencies["tts"].append(now - last_audio)
+        last_audio = now
+
+    while True:
+        message = await asyncio.wait_for(ws.recv(), timeout=args.timeout)
+        now = time.perf_counter() - start
+        if isinstance(message, bytes):
+            # Binary framing: every frame is audio, the end is signalled by audio_response_end
+            audio_frame(now)
+            if not args.stream_audio:
+                break
+            continue
+
+        message = json.loads(message)
+        msg_type = message.get("type")
+        if msg_type == "transcript":
+            transcript = now
+            results.latencies["stt"].append(now)
+        elif msg_type in ("audio_response", "audio_response_chunk"):
+            audio_frame(now)
+            if msg_type == "audio_response":
+                break
+        elif msg_type == "audio_response_end":
+            break
+        elif msg_type == "error":
+            results.error(message.get("code", "error"))
+            return
+        # partial_transcript and status messages are ignored
+
+    results.latencies["first_audio"].append(first_audio if first_audio is not None else now)
+    results.latencies["end_to_end"].append(now)
+    results.turns += 1
+
+
+async def run_session(index: int, chunks: List[bytes], args, results: Results):
+    await asyncio.sleep(args.ramp_s * index / max(1, args.sessions))
+    try:
+        async with websockets.connect(args.url, max_size=None) as ws:
+            await ws.send(json.dumps({
+                "type": "config",
+                "stream_audio": args.stream_audio,
+                "binary": args.binary,
+                "codec": args.codec,
+            }))
+            ack = json.loads(await asyncio.wait_for(ws.recv(), timeout=args.timeout))
+            if ack.get("type") != "config":
+                results.error(ack.get("code", "config"))
+                return
+            for _ in range(args.turns):
+                await run_turn(ws, chunks, args, results)
+    except websockets.ConnectionClosed as e:
+        results.error(f"closed_{e.rcvd.code if e.rcvd else 'unknown'}")
+    except asyncio.TimeoutError:
+        results.error("timeout")
+    except OSError as e:
+        results.error(type(e).__name__)
+
+
+async def run_load(args) -> dict:
+    if args.audio:
+        audio_bytes = await asyncio.to_thread(read_file, args.audio)
+    else:
+        audio_bytes = synthetic_wav(args.seconds)
+    chunk_bytes = args.chunk_bytes or max(1, len(audio_bytes) // 10)
+    chunks = split_chunks(audio_bytes, chunk_bytes)
+    print(f"[LOAD] {args.sessions} sessions x {args.turns} turns, {len(audio_bytes)} bytes in {len(chunks)} chunks "
+          f"(stream_audio={args.stream_audio}, binary={args.binary}, codec={args.codec})")
+
+    results = Results()
+    start = time.perf_counter()
+    await asyncio.gather(*(run_session(i, chunks, args, results) for i in range(args.sessions)))
+    return results.summary(time.perf_counter() - start)
+
+
+def report(summary: dict):
+    print(f"\n{summary['turns']} turns in {summary['elapsed_s']:.2f}s ({summary['turns_per_s']:.2f} turns/s)")
+    if summary["errors"]:
+        print(f"Errors: {summary['errors']}")
+    print(f"{'stage':<12} {'count':>6} {'mean':>9} {'p50':>9} {'p95':>9} {'p99':>9} {'max':>9}  (ms)")
+    for stage, s in summary["stages"].items():
+        print(f"{stage:<12} {s['count']:>6} {s['mean_ms']:>9.1f} {s['p50_ms']:>9.1f} "
+              f"{s['p95_ms']:>9.1f} {s['p99_ms']:>9.1f} {s['max_ms']:>9.1f}")
+
+
+# --- Stub server ---------------------------------------------------------------------------
+
+def run_stub_server(args):
+    """Serve the voice router with fake STT/LLM/TTS services (runs in its own process)."""
+    import uvicorn
+    from contextlib import asynccontextmanager
+    from fastapi import FastAPI
+    from fastapi.responses import JSONResponse
+
+    from routers import metrics as metrics_router, voice_agent
+    from services.components import components
+    from services.executor import StageExecutor
+    from services.llm_service import LLMEvent, LLMService
+    from services.stt_service import STTService
+    from services.tts_cache import TTSCache
+    from services.tts_service import SAMPLE_RATE as TTS_SAMPLE_RATE, TTSService, encode_audio
+
+    class StubSTTService(STTService):
+        """Real decoding, Whisper replaced by a fixed delay."""
+
+        def __init__(self):
+            self.model_size, self.device = "stub", "cpu"
+            self.executor = StageExecutor.from_env("stt", max_workers=1, max_queue=64)
+            self.scheduler = None
+            self.trimmer = None
+
+        def transcribe_array(self, audio, initial_prompt=None):
+            time.sleep(args.stt_ms / 1000)
+            return "Tell me about a project you are proud of."
+
+    class StubLLMService(LLMService):
+        """Streams a fixed answer with a time to first token and a delay per sentence."""
+
+        def __init__(self):
+            self.sentences = [f"This is sentence number {i + 1} of the answer." for i in range(args.llm_sentences)]
+
+        def release_session(self, thread_id):
+            pass
+
+        async def agenerate_response(self, question, thread_id=None):
+            await asyncio.sleep((args.llm_ttft_ms + args.llm_sentence_ms * len(self.sentences)) / 1000)
+            return " ".join(self.sentences)
+
+        async def astream_response(self, question, thread_id=None):
+            await asyncio.sleep(args.llm_ttft_ms / 1000)
+            for sentence in self.sentences:
+                await asyncio.sleep(args.llm_sentence_ms / 1000)
+                yield LLMEvent("token", text=sentence + " ")
+
+    class StubTTSService(TTSService):
+        """Returns silence of a realistic length after a delay per sentence."""
+
+        def __init__(self):
+            self.voice, self.lang_code = "stub", "b"
+            self.cache = TTSCache(max_bytes=0)
+            self.executor = StageExecutor.from_env("tts", max_workers=2, max_queue=64)
+            self._audio = {}
+
+        def synthesize(self, text, voice=None, lang_code=None, codec="wav"):
+            sentences = max(1, text.count("."))
+            time.sleep(args.tts_ms * sentences / 1000)
+            if codec not in self._audio:
+                self._audio[codec] = encode_audio(np.zeros(int(2.0 * TTS_SAMPLE_RATE), dtype=np.float32), codec)
+            return self._audio[codec]
+
+    components.register("openai_key", lambda: "stub")
+    components.override("stt", StubSTTService)
+    components.override("voice_llm", StubLLMService)
+    components.override("tts", StubTTSService)
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        components.start()
+        yield
+        await components.stop()
+
+    app = FastAPI(lifespan=lifespan)
+    app.include_router(voice_agent.router)
+    app.include_router(metrics_router.router)
+
+    @app.get("/ready")
+    async def ready():
+        return JSONResponse(status_code=200 if components.is_ready() else 503, content=components.status())
+
+    uvicorn.run(app, host="127.0.0.1", port=args.port, log_level="warning", ws_max_size=64 * 1024 * 1024)
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_stub_server(args) -> subprocess.Popen:
+    port = free_port()
+    command = [sys.executable, os.path.abspath(__file__), "--serve-stub", "--port", str(port),
+               "--stt-ms", str(args.stt_ms), "--llm-ttft-ms", str(args.llm_ttft_ms),
+               "--llm-sentence-ms", str(args.llm_sentence_ms), "--llm-sentences", str(args.llm_sentences),
+               "--tts-ms", str(args.tts_ms)]
+    env = {**os.environ, "VOICE_STREAMING_STT": "true" if args.streaming_stt else "false"}
+    output = None if args.verbose else subprocess.DEVNULL
+    server = subprocess.Popen(command, env=env, stdout=output, stderr=output if args.verbose else None)
+
+    import httpx
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(f"http://127.0.0.1:{port}/ready", timeout=1).status_code == 200:
+                args.url = f"ws://127.0.0.1:{port}/ws"
+                print(f"[LOAD] Stub server ready on port {port}")
+                return server
+        except httpx.HTTPError:
+            pass
+        if server.poll() is not None:
+            raise RuntimeError("Stub server exited during startup (run with --verbose)")
+        time.sleep(0.2)
+    server.terminate()
+    raise RuntimeError("Stub server did not become ready")
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="ws://localhost:8000/ws", help="Voice WebSocket endpoint")
+    parser.add_argument("--stub", action="store_true", help="Start a local server with fake services")
+    parser.add_argument("--sessions", type=int, default=10, help="Concurrent sessions")
+    parser.add_argument("--turns", type=int, default=3, help="Turns per session")
+    parser.add_argument("--ramp-s", type=float, default=1.0, help="Spread session starts over this time")
+    parser.add_argument("--audio", help="Recorded audio file to send (default: synthetic WAV)")
+    parser.add_argument("--seconds", type=float, default=5.0, help="Length of the synthetic recording")
+    parser.add_argument("--chunk-bytes", type=int, help="Chunk size (default: a tenth of the recording)")
+    parser.add_argument("--chunk-ms", type=float, default=250, help="Audio duration of a chunk, with --realtime")
+    parser.add_argument("--realtime", action="store_true", help="Pace chunks like a live microphone")
+    parser.add_argument("--stream-audio", action="store_true", help="Ask for sentence-by-sentence audio")
+    parser.add_argument("--binary", action="store_true", help="Use binary audio frames")
+    parser.add_argument("--codec", default="wav", choices=("wav", "flac", "opus"), help="Reply codec")
+    parser.add_argument("--timeout", type=float, default=60.0, help="Timeout for each server message")
+    parser.add_argument("--json", help="Also write the results to this JSON file")
+    stub = parser.add_argument_group("stub services")
+    stub.add_argument("--stt-ms", type=float, default=300, help="Transcription delay per call")
+    stub.add_argument("--llm-ttft-ms", type=float, default=400, help="LLM time to first token")
+    stub.add_argument("--llm-sentence-ms", type=float, default=150, help="LLM delay per sentence")
+    stub.add_argument("--llm-sentences", type=int, default=3, help="Sentences per answer")
+    stub.add_argument("--tts-ms", type=float, default=120, help="Synthesis delay per sentence")
+    stub.add_argument("--no-streaming-stt", dest="streaming_stt", action="store_false",
+                      help="Transcribe on audio_end only")
+    stub.add_argument("--verbose", action="store_true", help="Show the stub server output")
+    parser.add_argument("--serve-stub", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--port", type=int, default=0, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.serve_stub:
+        run_stub_server(args)
+        return
+
+    server = start_stub_server(args) if args.stub else None
+    try:
+        summary = asyncio.run(run_load(args))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    report(summary)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(summary, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+"""
+Session audio buffer - bounded, growable in-memory storage for a recording received in chunks.
+"""
+
+import io
+import os
+from typing import Optional, Union
+
+BytesLike = Union[bytes, bytearray, memoryview]
+
+
+class AudioBufferFullError(RuntimeError):
+    """Raised when a chunk would take a session buffer over its byte cap."""
+
+
+def detect_audio_format(header: BytesLike) -> str:
+    """
+    Detect the container of a recording from its first bytes (magic bytes).
+
+    Returns:
+        Format string: 'webm', 'wav', 'mp3', 'm4a', 'ogg' or 'flac'
+
+    Raises:
+        ValueError: If the header is too short or matches no known container
+    """
+    header = bytes(header[:12])
+    if len(header) < 4:
+        raise ValueError(f"Audio data too short: {len(header)} bytes")
+
+    # WebM: starts with 1A 45 DF A3 (EBML header)
+    if header[:4] == b'\x1a\x45\xdf\xa3':
+        return "webm"
+    # WAV: starts with "RIFF" (52 49 46 46)
+    if header[:4] == b'RIFF':
+        return "wav"
+    # MP3: starts with FF FB, FF F3, FF F2, or ID3 tag
+    if (header[0] == 0xFF and (header[1] & 0xE0) == 0xE0) or header[:3] == b'ID3':
+        return "mp3"
+    # M4A/MP4: ftyp box at offset 4
+    if header[4:8] == b'ftyp':
+        return "m4a"
+    # OGG: starts with "OggS"
+    if header[:4] == b'OggS':
+        return "ogg"
+    # FLAC: starts with "fLaC"
+    if header[:4] == b'fLaC':
+        return "flac"
+
+    # Valid audio formats should have recognizable headers: this might be corrupted data
+    raise ValueError(
+        f"Invalid audio data: Could not detect format. "
+        f"Header (hex): {header[:8].hex()}, "
+        f"Header (first 12 bytes): {header}. "
+        f"This might be corrupted data or an unsupported format."
+    )
+
+
+def is_stale_recorder_chunk(header: BytesLike) -> bool:
+    """Known pattern of a browser MediaRecorder that was not reset between recordings."""
+    return bytes(header[:2]) == b'C\xc3'
+
+
+class AudioBufferReader(io.RawIOBase):
+    """Read-only file object over a bytes-like object, without copying it (e.g. for PyAV)."""
+
+    def __init__(self, data: BytesLike):
+        self._view = memoryview(data).cast("B")
+        self._position = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        size = min(len(buffer), len(self._view) - self._position)
+        if size <= 0:
+            return 0
+        buffer[:size] = self._view[self._position:self._position + size]
+        self._position += size
+        return size
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_SET:
+            position = offset
+        elif whence == io.SEEK_CUR:
+            position = self._position + offset
+        elif whence == io.SEEK_END:
+            position = len(self._view) + offset
+        else:
+            raise ValueError(f"Invalid whence: {whence}")
+        if position < 0:
+            raise ValueError(f"Negative seek position: {position}")
+        self._position = position
+        return position
+
+    def tell(self) -> int:
+        return self._position
+
+
+class SessionAudioBuffer:
+    def __init__(self, max_bytes: int = 16 * 1024 * 1024, initial_capacity: int = 256 * 1024):
+        """
+        Buffer for the recording of one voice session.
+
+        Chunks are written into a preallocated bytearray that doubles when full, so appending
+        does not keep one bytes object per chunk and reading needs no join. The container
+        format is sniffed once, from the first chunk.
+
+        Views returned by view() stay valid and unchanged after more appends or clear():
+        growing and clearing switch to a new bytearray instead of modifying the old one.
+
+        Args:
+            max_bytes: Maximum size of a recording; appends beyond it raise AudioBufferFullError
+            initial_capacity: Bytes allocated up front
+        """
+        self.max_bytes = max_bytes
+        self.initial_capacity = min(initial_capacity, max_bytes)
+        self._data = bytearray(self.initial_capacity)
+        self._size = 0
+        self.format: Optional[str] = None
+        self.chunks = 0
+
+    @classmethod
+    def from_env(cls) -> "SessionAudioBuffer":
+        """Build a buffer capped by VOICE_AUDIO_MAX_BYTES."""
+        return cls(max_bytes=int(os.getenv("VOICE_AUDIO_MAX_BYTES", str(16 * 1024 * 1024))))
+
+    def __len__(self) -> int:
+        return self._size
+
+    def append(self, chunk: BytesLike):
+        """
+        Add a chunk at the end of the recording.
+
+        Raises:
+            AudioBufferFullError: If the recording would exceed max_bytes; the buffer is left unchanged
+        """
+        end = self._size + len(chunk)
+        if end > self.max_bytes:
+            raise AudioBufferFullError(
+                f"Recording exceeds the {self.max_bytes} bytes limit ({end} bytes)"
+            )
+        if self._size == 0:
+            try:
+                self.format = detect_audio_format(chunk)
+            except ValueError:
+                self.format = None
+        if end > len(self._data):
+            self._grow(end)
+        self._data[self._size:end] = chunk
+        self._size = end
+        self.chunks += 1
+
+    def view(self) -> memoryview:
+        """Read-only view of the recording so far, without copying it."""
+        return memoryview(self._data).toreadonly()[:self._size]
+
+    def getvalue(self) -> bytes:
+        """Copy of the recording so far."""
+        return bytes(self.view())
+
+    def clear(self):
+        """Drop the recording and release the memory it used beyond the initial capacity."""
+        self._data = bytearray(self.initial_capacity)
+        self._size = 0
+        self.format = None
+        self.chunks = 0
+
+    def _grow(self, needed: int):
+        capacity = max(len(self._data), 1)
+        while capacity < needed:
+            capacity *= 2
+        data = bytearray(min(capacity, self.max_bytes))
+        data[:self._size] = self._data[:self._size]
+        self._data = data
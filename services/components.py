@@ -0,0 +1,208 @@
+"""
+Component registry - heavy resources (models, clients, secrets) loaded in the background at startup.
+"""
+
+import asyncio
+import os
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from fastapi import HTTPException
+
+PENDING = "pending"
+LOADING = "loading"
+READY = "ready"
+FAILED = "failed"
+
+
+class ComponentNotReadyError(RuntimeError):
+    """Raised when a component is used before it has finished loading."""
+
+
+class Component:
+    def __init__(self, name: str, loader: Callable[[], Any], depends_on: Iterable[str] = (),
+                 required: bool = True):
+        """
+        A lazily loaded resource.
+
+        Args:
+            name: Component name, reported by the readiness probe (e.g. "stt")
+            loader: Blocking function building the resource; it runs on a worker thread
+            depends_on: Components that must be ready before this one starts loading
+            required: Whether the replica is ready only once this component is
+        """
+        self.name = name
+        self.loader = loader
+        self.depends_on = list(depends_on)
+        self.required = required
+        self.state = PENDING
+        self.value: Any = None
+        self.error: Optional[str] = None
+        self.load_seconds: Optional[float] = None
+        self.attempts = 0
+        # Set after the first attempt, successful or not
+        self.settled = asyncio.Event()
+
+    def status(self) -> dict:
+        status = {"state": self.state}
+        if not self.required:
+            status["required"] = False
+        if self.load_seconds is not None:
+            status["load_seconds"] = round(self.load_seconds, 2)
+        if self.error is not None:
+            status["error"] = self.error
+        return status
+
+
+class ComponentRegistry:
+    def __init__(self, retry_after: float = 5, max_retry_after: float = 300):
+        """
+        Registry of the components loaded by the application lifespan.
+
+        A component failing to load (e.g. a transient Key Vault or OpenAI error) is loaded again,
+        waiting twice as long after each failure, so that the replica recovers on its own.
+
+        Args:
+            retry_after: Seconds before the first retry of a failed component
+            max_retry_after: Longest wait between two retries
+        """
+        self.retry_after = retry_after
+        self.max_retry_after = max_retry_after
+        self._components: Dict[str, Component] = {}
+        self._tasks: Dict[str, asyncio.Task] = {}
+
+    @classmethod
+    def from_env(cls) -> "ComponentRegistry":
+        """Build a registry configured by COMPONENT_RETRY_SECONDS and COMPONENT_MAX_RETRY_SECONDS."""
+        return cls(
+            retry_after=float(os.getenv("COMPONENT_RETRY_SECONDS", "5")),
+            max_retry_after=float(os.getenv("COMPONENT_MAX_RETRY_SECONDS", "300")),
+        )
+
+    def register(self, name: str, loader: Callable[[], Any], depends_on: Iterable[str] = (),
+                 required: bool = True):
+        """
+        Declare a component. Nothing is loaded until start() is called.
+
+        Components registered with required=False do not hold back readiness: only the routes
+        depending on them (see require()) answer 503 until they are loaded.
+        """
+        if name in self._components:
+            raise ValueError(f"Component already registered: {name}")
+        self._components[name] = Component(name, loader, depends_on, required=required)
+
+    def override(self, name: str, loader: Callable[[], Any]):
+        """Replace the loader of a registered component before start() (e.g. stubs for benchmarks)."""
+        if name not in self._components:
+            raise KeyError(f"Unknown component: {name}")
+        if name in self._tasks:
+            raise RuntimeError(f"Component '{name}' is already loading")
+        self._components[name].loader = loader
+
+    def start(self) -> List[asyncio.Task]:
+        """Start loading every pending component in the background, dependencies first."""
+        for name in self._components:
+            self._schedule(name)
+        return list(self._tasks.values())
+
+    async def wait(self, *names: str):
+        """
+        Wait until the given components (all of them if none given) have loaded or failed their
+        first attempt; failed ones keep retrying in the background.
+        """
+        events = [self._components[name].settled.wait() for name in (names or self._tasks) if name in self._tasks]
+        await asyncio.gather(*events)
+
+    async def stop(self):
+        """Cancel loads and retries still in progress (their worker threads finish on their own)."""
+        for task in self._tasks.values():
+            task.cancel()
+        await asyncio.gather(*self._tasks.values(), return_exceptions=True)
+        self._tasks.clear()
+
+    def is_ready(self, *names: str) -> bool:
+        """Whether the given components (the required ones if none given) are ready."""
+        if not names:
+            names = [name for name, component in self._components.items() if component.required]
+        return all(self._components[name].state == READY for name in names)
+
+    def get(self, name: str) -> Any:
+        """
+        Return a loaded component.
+
+        Raises:
+            ComponentNotReadyError: If the component is still loading or failed to load
+        """
+        component = self._components[name]
+        if component.state != READY:
+            raise ComponentNotReadyError(f"Component '{name}' is not ready ({component.state})")
+        return component.value
+
+    def status(self) -> Dict[str, dict]:
+        """State of every component, for the readiness probe."""
+        return {name: component.status() for name, component in self._components.items()}
+
+    def require(self, *names: str) -> Callable[[], None]:
+        """FastAPI dependency answering 503 until the given components are ready."""
+        def dependency():
+            if not self.is_ready(*names):
+                not_ready = {name: self._components[name].state for name in names
+                             if self._components[name].state != READY}
+                raise HTTPException(
+                    status_code=503,
+                    detail={"message": "Service is warming up, try again later", "components": not_ready},
+                    headers={"Retry-After": "5"},
+                )
+        return dependency
+
+    def _schedule(self, name: str) -> asyncio.Task:
+        if name not in self._tasks:
+            component = self._components[name]
+            for dependency in component.depends_on:
+                self._schedule(dependency)
+            self._tasks[name] = asyncio.create_task(self._load(component))
+        return self._tasks[name]
+
+    def retry_delay(self, attempts: int) -> float:
+        """Seconds to wait before loading again a component that failed `attempts` times."""
+        return min(self.retry_after * 2 ** (attempts - 1), self.max_retry_after)
+
+    async def _load(self, component: Component):
+        dependencies = [self._components[name] for name in component.depends_on]
+        await asyncio.gather(*(dependency.settled.wait() for dependency in dependencies))
+        while True:
+            await self._attempt(component)
+            component.settled.set()
+            if component.state == READY:
+                return
+            delay = self.retry_delay(component.attempts)
+            print(f"[INIT] Retrying {component.name} in {delay:.0f}s")
+            await asyncio.sleep(delay)
+
+    async def _attempt(self, component: Component):
+        component.attempts += 1
+        failed = [name for name in component.depends_on if self._components[name].state != READY]
+        if failed:
+            component.state = FAILED
+            component.error = f"Dependencies not ready: {', '.join(failed)}"
+            print(f"[INIT] Skipped {component.name}: {component.error}")
+            return
+
+        component.state = LOADING
+        print(f"[INIT] Loading {component.name}...")
+        start = time.perf_counter()
+        try:
+            component.value = await asyncio.to_thread(component.loader)
+        except Exception as e:
+            component.state = FAILED
+            component.error = str(e)
+            print(f"[INIT] Failed to load {component.name}: {e}")
+            return
+        component.load_seconds = time.perf_counter() - start
+        component.error = None
+        component.state = READY
+        print(f"[INIT] {component.name} ready in {component.load_seconds:.2f}s")
+
+
+# Shared by main.py and the routers
+components = ComponentRegistry.from_env()
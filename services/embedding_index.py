@@ -0,0 +1,168 @@
+"""
+Embedding index - chunked documents and their embeddings, persisted on disk and reused across restarts.
+"""
+
+import json
+import os
+import tempfile
+from typing import Callable, List, Optional
+
+import numpy as np
+import xxhash
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+from services.metrics import metrics
+
+# Bump when the files written by save() change layout (2: rows are normalized)
+INDEX_FORMAT_VERSION = 2
+
+EMBEDDING_INDEX_LOADS = metrics.counter("embedding_index_loads_total", "Document indexes loaded from disk or embedded",
+                                        labelnames=("result",))
+
+
+def normalize_rows(vectors) -> np.ndarray:
+    """Contiguous float32 copy of `vectors` with every row scaled to unit length (zero rows stay zero)."""
+    matrix = np.array(vectors, dtype=np.float32, ndmin=2)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    np.divide(matrix, norms, out=matrix, where=norms > 0)
+    return matrix
+
+
+def _load_pdf(path: str) -> List[Document]:
+    from langchain_community.document_loaders import PyPDFLoader
+    return PyPDFLoader(path).load()
+
+
+class EmbeddingIndex:
+    def __init__(self, documents: List[Document], vectors: np.ndarray, key: str):
+        """
+        Chunks of a document with one embedding row per chunk.
+
+        Args:
+            documents: The chunks, in the order of the rows of `vectors`
+            vectors: float32 matrix of shape (len(documents), dimensions) with unit-length rows;
+                memory-mapped when loaded from disk
+            key: Cache key of the index (see EmbeddingIndex.key)
+        """
+        if len(documents) != len(vectors):
+            raise ValueError(f"{len(documents)} documents for {len(vectors)} embeddings")
+        self.documents = documents
+        self.vectors = vectors
+        self.key = key
+
+    def __len__(self) -> int:
+        return len(self.documents)
+
+    @staticmethod
+    def key(data: bytes, chunk_size: int, chunk_overlap: int, model: str) -> str:
+        """Cache key of an index: hash of the file content, chunking parameters and embedding model."""
+        parts = (str(INDEX_FORMAT_VERSION), xxhash.xxh3_128_hexdigest(data), str(chunk_size), str(chunk_overlap), model)
+        return xxhash.xxh3_128_hexdigest("\x1f".join(parts).encode("utf-8"))
+
+    @classmethod
+    def build(cls, documents: List[Document], embeddings: Embeddings, key: str,
+              chunk_size: int = 1000, chunk_overlap: int = 200) -> "EmbeddingIndex":
+        """Split documents into chunks and embed every chunk (one call to the embedding API), rows normalized."""
+        text_splitter = RecursiveCharacterTextSplitter(
+            chunk_size=chunk_size,  # chunk size (characters)
+            chunk_overlap=chunk_overlap,  # chunk overlap (characters)
+            add_start_index=True,  # track index in original document
+        )
+        chunks = text_splitter.split_documents(documents)
+        if not chunks:
+            return cls([], np.zeros((0, 0), dtype=np.float32), key)
+        vectors = normalize_rows(embeddings.embed_documents([chunk.page_content for chunk in chunks]))
+        return cls(chunks, vectors, key)
+
+    @classmethod
+    def load(cls, cache_dir: str, key: str) -> Optional["EmbeddingIndex"]:
+        """Load a saved index, or return None if there is none (or it is unreadable)."""
+        json_path, npy_path = cls._paths(cache_dir, key)
+        try:
+            with open(json_path, "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+            if manifest.get("version") != INDEX_FORMAT_VERSION or manifest.get("key") != key:
+                return None
+            vectors = np.load(npy_path, mmap_mode="r")
+            documents = [Document(page_content=chunk["text"], metadata=chunk["metadata"])
+                         for chunk in manifest["chunks"]]
+            return cls(documents, vectors, key)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            print(f"[LLM] Warning: Could not load embedding index {key}: {e}")
+            return None
+
+    def save(self, cache_dir: str, **info):
+        """
+        Write the index to `cache_dir` as <key>.npy (embeddings) and <key>.json (chunks).
+
+        Files are written atomically, the JSON last, so several processes can share the directory.
+        Extra keyword arguments are stored in the JSON for reference (e.g. source, model).
+        """
+        os.makedirs(cache_dir, exist_ok=True)
+        json_path, npy_path = self._paths(cache_dir, self.key)
+        manifest = {
+            "version": INDEX_FORMAT_VERSION,
+            "key": self.key,
+            **info,
+            "dimensions": int(self.vectors.shape[1]),
+            "chunks": [{"text": doc.page_content, "metadata": doc.metadata} for doc in self.documents],
+        }
+        self._write_atomic(npy_path, lambda f: np.save(f, np.ascontiguousarray(self.vectors, dtype=np.float32)))
+        self._write_atomic(json_path, lambda f: f.write(json.dumps(manifest, default=str).encode("utf-8")))
+
+    @staticmethod
+    def _paths(cache_dir: str, key: str):
+        return os.path.join(cache_dir, f"{key}.json"), os.path.join(cache_dir, f"{key}.npy")
+
+    @staticmethod
+    def _write_atomic(path: str, write: Callable):
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+        try:
+            with os.fdopen(fd, "wb") as f:
+                write(f)
+            os.replace(temp_path, path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+
+
+def load_document_index(path: str, embeddings: Embeddings, model: str, chunk_size: int = 1000,
+                        chunk_overlap: int = 200, cache_dir: Optional[str] = None,
+                        loader: Callable[[str], List[Document]] = _load_pdf) -> EmbeddingIndex:
+    """
+    Return the embedding index of a document, reusing the one saved in `cache_dir` when the file,
+    the chunking parameters and the embedding model are unchanged.
+
+    Args:
+        path: Document to index (e.g. the CV)
+        embeddings: Embedding model, only called when no saved index matches
+        model: Name of the embedding model, part of the cache key
+        chunk_size: Chunk size (characters)
+        chunk_overlap: Chunk overlap (characters)
+        cache_dir: Directory of saved indexes (optional); None always embeds
+        loader: Reads the document into pages (PDF by default)
+    """
+    with open(path, "rb") as f:
+        key = EmbeddingIndex.key(f.read(), chunk_size, chunk_overlap, model)
+
+    if cache_dir:
+        index = EmbeddingIndex.load(cache_dir, key)
+        if index is not None:
+            EMBEDDING_INDEX_LOADS.inc(result="hit")
+            print(f"[LLM] Loaded embedding index of {path} ({len(index)} chunks) from {cache_dir}")
+            return index
+
+    EMBEDDING_INDEX_LOADS.inc(result="miss")
+    index = EmbeddingIndex.build(loader(path), embeddings, key, chunk_size, chunk_overlap)
+    print(f"[LLM] Embedded {len(index)} chunks of {path} with {model}")
+    if cache_dir:
+        try:
+            index.save(cache_dir, source=os.path.basename(path), model=model,
+                       chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+        except OSError as e:
+            print(f"[LLM] Warning: Could not save embedding index {key}: {e}")
+    return index
@@ -0,0 +1,166 @@
+"""
+Stage executors - run blocking STT/LLM/TTS work outside the asyncio event loop.
+"""
+
+import asyncio
+import functools
+import os
+import threading
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, AsyncIterator, Callable, Iterator, Optional
+
+from services.metrics import metrics
+
+STAGE_IN_FLIGHT = metrics.gauge("stage_jobs_in_flight", "Jobs submitted to a stage and not finished yet", labelnames=("stage",))
+STAGE_QUEUE_DEPTH = metrics.gauge("stage_queue_depth", "Jobs waiting for a free worker of a stage", labelnames=("stage",))
+STAGE_REJECTED = metrics.counter("stage_jobs_rejected_total", "Jobs refused because the stage queue was full", labelnames=("stage",))
+
+
+class StageBusyError(RuntimeError):
+    """Raised when a stage already holds as many jobs as its queue allows."""
+
+
+class StageExecutor:
+    def __init__(self, name: str, kind: str = "thread", max_workers: int = 1, max_queue: int = 8):
+        """
+        Bounded worker pool for one pipeline stage.
+
+        Args:
+            name: Stage name, used in logs and errors (e.g. "stt")
+            kind: "thread" or "process". Process pools pickle the callable and its arguments,
+                so services used there must be picklable (see STTService.__reduce__)
+            max_workers: Number of jobs running at the same time
+            max_queue: Number of jobs allowed to wait for a free worker; further submissions
+                raise StageBusyError instead of piling up
+        """
+        if kind not in ("thread", "process"):
+            raise ValueError(f"Unknown executor kind for stage {name}: {kind}")
+        self.name = name
+        self.kind = kind
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self._pool: Optional[Executor] = None
+        self._in_flight = 0
+        self._lock = threading.Lock()
+        STAGE_IN_FLIGHT.set_function(lambda: self.in_flight, stage=name)
+        STAGE_QUEUE_DEPTH.set_function(lambda: self.queue_depth, stage=name)
+
+    @classmethod
+    def from_env(cls, name: str, kind: str = "thread", max_workers: int = 1, max_queue: int = 8) -> "StageExecutor":
+        """
+        Build an executor configured by VOICE_<NAME>_POOL, VOICE_<NAME>_WORKERS and
+        VOICE_<NAME>_MAX_QUEUE, falling back to the given defaults.
+        """
+        prefix = f"VOICE_{name.upper()}_"
+        return cls(
+            name,
+            kind=os.getenv(prefix + "POOL", kind),
+            max_workers=int(os.getenv(prefix + "WORKERS", max_workers)),
+            max_queue=int(os.getenv(prefix + "MAX_QUEUE", max_queue)),
+        )
+
+    @property
+    def in_flight(self) -> int:
+        """Jobs submitted and not finished yet (running or waiting)."""
+        return self._in_flight
+
+    @property
+    def queue_depth(self) -> int:
+        """Jobs waiting for a free worker."""
+        return max(0, self._in_flight - self.max_workers)
+
+    async def run(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """
+        Run fn(*args, **kwargs) on the stage pool and wait for its result.
+
+        Raises:
+            StageBusyError: If the stage queue is full
+        """
+        return await asyncio.wrap_future(self._submit(functools.partial(fn, *args, **kwargs)))
+
+    async def iterate(self, fn: Callable[..., Iterator[Any]], *args, **kwargs) -> AsyncIterator[Any]:
+        """
+        Run the generator fn(*args, **kwargs) on a worker thread and yield its items.
+
+        The generator occupies one worker until it is exhausted. Closing the async iterator
+        early stops the generator at its next item.
+
+        Raises:
+            StageBusyError: If the stage queue is full
+        """
+        if self.kind != "thread":
+            raise ValueError(f"The {self.name} stage cannot stream from a process pool")
+
+        loop = asyncio.get_running_loop()
+        items: asyncio.Queue = asyncio.Queue()
+        stop = threading.Event()
+        end = object()
+
+        def post(item, error=None):
+            try:
+                loop.call_soon_threadsafe(items.put_nowait, (item, error))
+            except RuntimeError:
+                stop.set()  # Event loop closed, nobody is listening anymore
+
+        def produce():
+            generator = None
+            try:
+                generator = fn(*args, **kwargs)
+                for item in generator:
+                    if stop.is_set():
+                        break
+                    post(item)
+                post(end)
+            except BaseException as e:
+                post(end, e)
+            finally:
+                if generator is not None:
+                    generator.close()
+
+        self._submit(produce)
+        try:
+            while True:
+                item, error = await items.get()
+                if item is end:
+                    if error is not None:
+                        raise error
+                    return
+                yield item
+        finally:
+            stop.set()
+
+    def shutdown(self, wait: bool = True):
+        """Stop the worker pool. It is recreated on the next submission."""
+        if self._pool is not None:
+            self._pool.shutdown(wait=wait, cancel_futures=True)
+            self._pool = None
+
+    def _submit(self, fn: Callable[[], Any]) -> Future:
+        with self._lock:
+            if self._in_flight >= self.max_workers + self.max_queue:
+                STAGE_REJECTED.inc(stage=self.name)
+                raise StageBusyError(f"The {self.name} stage is busy ({self._in_flight} jobs in flight), try again later")
+            self._in_flight += 1
+
+        try:
+            future = self._get_pool().submit(fn)
+        except Exception:
+            self._release()
+            raise
+        # Released when the job really finishes, even if the awaiting task is cancelled
+        future.add_done_callback(lambda _: self._release())
+        return future
+
+    def _get_pool(self) -> Executor:
+        if self._pool is None:
+            if self.kind == "process":
+                self._pool = ProcessPoolExecutor(max_workers=self.max_workers)
+            else:
+                self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix=f"{self.name}-worker")
+            print(f"[EXEC] Started {self.kind} pool for {self.name} "
+                  f"(workers: {self.max_workers}, queue: {self.max_queue})")
+        return self._pool
+
+    def _release(self):
+        with self._lock:
+            self._in_flight -= 1
@@ -3,15 +3,44 @@ LLM Service using LangChain agents.
 """
 
 import os
+import time
 from langchain.agents import create_agent
 from langgraph.checkpoint.memory import InMemorySaver  
 from langchain.chat_models import init_chat_model
-from typing import Optional
+from typing import AsyncIterator, NamedTuple, Optional
 from langchain.tools import tool
-from langchain_core.vectorstores import InMemoryVectorStore
 from langchain_openai import OpenAIEmbeddings
-from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_community.document_loaders import PyPDFLoader
+from langchain_core.messages import AIMessage, ToolMessage
+
+from llm_agents.context_budget import ContextBudget, ContextBudgetMiddleware
+from services.embedding_index import load_document_index
+from services.metrics import metrics
+from services.retriever import NumpyRetriever
+from services.sentences import SentenceChunker
+from services.session_memory import SessionMemoryManager
+
+EMBEDDING_MODEL = "text-embedding-3-small"
+
+LLM_TIME_TO_FIRST_TOKEN = metrics.histogram(
+    "llm_time_to_first_token_seconds", "Time until the model streams the first text of an answer",
+    buckets=(0.1, 0.25, 0.5, 0.75, 1.0, 1.5, 2.0, 3.0, 5.0, 10.0, 20.0),
+)
+LLM_RESPONSE_SECONDS = metrics.histogram(
+    "llm_response_seconds", "Time to produce a complete answer, tool calls included",
+    labelnames=("mode",), buckets=(0.25, 0.5, 1.0, 2.0, 3.0, 5.0, 7.5, 10.0, 20.0, 30.0, 60.0),
+)
+
+class LLMEvent(NamedTuple):
+    """
+    One step of a streamed answer.
+
+    type is "token" (text: the delta written by the model), "tool_call" (name and args of a
+    tool the model calls) or "tool_result" (name and text returned by the tool).
+    """
+    type: str
+    text: str = ""
+    name: Optional[str] = None
+    args: Optional[dict] = None
 
 class LLMService:
     def __init__(self, api_key: str, model: str = "gpt-4", tools: Optional[list] = None, system_prompt: Optional[str] = None,
@@ -25,6 +54,12 @@ class LLMService:
             model: The model identifier (e.g., "gpt-4", "gpt-4o")
             tools: List of tools for the agent to use (optional)
             system_prompt: Custom system prompt for the agent (optional)
+
+        The async methods use the agent's native async API: sessions waiting on OpenAI
+        share the event loop instead of holding a worker thread each.
+
+        Conversation memory is bounded by a SessionMemoryManager (see VOICE_LLM_SESSION_TTL_S
+        and VOICE_LLM_MAX_SESSIONS); release_session() drops a thread explicitly.
         """
         # Set API key in environment for LangChain to use
         # LangChain models read from OPENAI_API_KEY environment variable
@@ -37,25 +72,20 @@ class LLMService:
         self.model = init_chat_model(model_name, temperature=2)
         print(f"[LLM] Model initialized: {self.model}")
 
-        # RAG tool example CV
-        loader = PyPDFLoader(cv_path)
-        docs = loader.load()
-        text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=1000,  # chunk size (characters)
-            chunk_overlap=200,  # chunk overlap (characters)
-            add_start_index=True,  # track index in original document
+        # RAG tool example CV, embedded once and then reused from EMBEDDING_INDEX_DIR
+        embeddings = OpenAIEmbeddings(model=EMBEDDING_MODEL)
+        cv_index = load_document_index(
+            cv_path, embeddings, EMBEDDING_MODEL,
+            chunk_size=1000, chunk_overlap=200,
+            cache_dir=os.getenv("EMBEDDING_INDEX_DIR", ".cache/embeddings") or None,
         )
-        all_splits = text_splitter.split_documents(docs)
-
-        embeddings = OpenAIEmbeddings(model="text-embedding-3-small")
-        vector_store = InMemoryVectorStore(embedding=embeddings)
-        document_ids = vector_store.add_documents(documents=all_splits)
-        print(f"[LLM] Vector store created with {len(document_ids)} documents")
+        retriever = NumpyRetriever.from_index(cv_index, embeddings, k=2)
+        print(f"[LLM] Retriever created with {len(cv_index)} documents")
 
         @tool(response_format="content_and_artifact")
         def retrieve_CV(query: str):
             """Retrieve user's CV."""
-            retrieved_docs = vector_store.similarity_search(query, k=2)
+            retrieved_docs = retriever.invoke(query)
             print(f"[LLM] Retrieved {len(retrieved_docs)} documents")
             serialized = "\n\n".join(
                 (f"Source: {doc.metadata}\nContent: {doc.page_content}")
@@ -98,7 +128,16 @@ class LLMService:
             )
         
         # Create the agent
-        self.agent = create_agent(self.model, self.tools, system_prompt=system_prompt, checkpointer=InMemorySaver())
+        self.memory = InMemorySaver()
+        self.sessions = SessionMemoryManager.from_env(self.memory)
+        # The thread keeps the whole conversation; each model call only sends what fits LLM_CONTEXT_BUDGET_TOKENS
+        self.budget = ContextBudget.from_env(model=model.removeprefix("openai:"))
+        self.agent = create_agent(self.model, self.tools, system_prompt=system_prompt, checkpointer=self.memory,
+                                  middleware=[ContextBudgetMiddleware(self.budget, caller="voice")])
+
+    def release_session(self, thread_id: str):
+        """Forget the conversation of `thread_id` (e.g. when the voice session is reset or closed)."""
+        self.sessions.release(thread_id)
     
     def generate_response(self, question: str, thread_id: Optional[str] = None) -> str:
         """
@@ -113,16 +152,21 @@ class LLMService:
         """
         try:
             print(f"[LLM] Processing question: {question[:50]}...")
+            start = time.perf_counter()
             
             # Prepare the invoke arguments
             invoke_args = {"messages": [{"role": "user", "content": question}]}
             
             # If thread_id is provided, use it for memory/context
             if thread_id:
-                result = self.agent.invoke(
-                    invoke_args,
-                    {"configurable": {"thread_id": thread_id}}
-                )
+                self.sessions.touch(thread_id)
+                try:
+                    result = self.agent.invoke(
+                        invoke_args,
+                        {"configurable": {"thread_id": thread_id}}
+                    )
+                finally:
+                    self.sessions.done(thread_id)
             else:
                 result = self.agent.invoke(invoke_args)
             
@@ -130,9 +174,105 @@ class LLMService:
             last_message = result["messages"][-1]
             response = last_message.content if hasattr(last_message, 'content') else str(last_message)
             
+            LLM_RESPONSE_SECONDS.observe(time.perf_counter() - start, mode="invoke")
             print(f"[LLM] Response generated: {response[:50]}...")
             return response
             
         except Exception as e:
             print(f"[LLM] Error: {e}")
             raise
+
+    async def agenerate_response(self, question: str, thread_id: Optional[str] = None) -> str:
+        """Async version of generate_response(), awaiting OpenAI without blocking the event loop."""
+        try:
+            print(f"[LLM] Processing question: {question[:50]}...")
+            start = time.perf_counter()
+            invoke_args = {"messages": [{"role": "user", "content": question}]}
+
+            if thread_id:
+                self.sessions.touch(thread_id)
+                try:
+                    result = await self.agent.ainvoke(invoke_args, {"configurable": {"thread_id": thread_id}})
+                finally:
+                    self.sessions.done(thread_id)
+            else:
+                result = await self.agent.ainvoke(invoke_args)
+
+            last_message = result["messages"][-1]
+            response = last_message.content if hasattr(last_message, 'content') else str(last_message)
+
+            LLM_RESPONSE_SECONDS.observe(time.perf_counter() - start, mode="invoke")
+            print(f"[LLM] Response generated: {response[:50]}...")
+            return response
+
+        except Exception as e:
+            print(f"[LLM] Error: {e}")
+            raise
+
+    async def astream_response(self, question: str, thread_id: Optional[str] = None) -> AsyncIterator[LLMEvent]:
+        """
+        Stream the agent's answer as it is produced.
+
+        Yields a "token" event per text delta of the model, and "tool_call" / "tool_result"
+        events around each tool the agent uses (e.g. retrieve_CV). Closing the iterator early
+        (or cancelling the task consuming it) cancels the request to OpenAI.
+
+        Args:
+            question: The user's question or message
+            thread_id: Optional thread ID for conversation memory/context
+        """
+        print(f"[LLM] Streaming answer to: {question[:50]}...")
+        invoke_args = {"messages": [{"role": "user", "content": question}]}
+        config = {"configurable": {"thread_id": thread_id}} if thread_id else None
+
+        start = time.perf_counter()
+        first_token = True
+        if thread_id:
+            self.sessions.touch(thread_id)
+        try:
+            async for mode, payload in self.agent.astream(invoke_args, config, stream_mode=["messages", "updates"]):
+                if mode == "messages":
+                    message, metadata = payload
+                    # Chunks when the model streams, a whole message when it does not
+                    if isinstance(message, AIMessage) and metadata.get("langgraph_node") == "model" and message.text:
+                        if first_token:
+                            first_token = False
+                            LLM_TIME_TO_FIRST_TOKEN.observe(time.perf_counter() - start)
+                        yield LLMEvent("token", text=message.text)
+                    continue
+
+                # Complete messages of each step: the tool calls decided and their results
+                for update in payload.values():
+                    for message in (update or {}).get("messages", []):
+                        if isinstance(message, AIMessage):
+                            for tool_call in message.tool_calls:
+                                print(f"[LLM] Tool call: {tool_call['name']}")
+                                yield LLMEvent("tool_call", name=tool_call["name"], args=tool_call["args"])
+                        elif isinstance(message, ToolMessage):
+                            yield LLMEvent("tool_result", text=message.text, name=message.name)
+        finally:
+            if thread_id:
+                self.sessions.done(thread_id)
+        LLM_RESPONSE_SECONDS.observe(time.perf_counter() - start, mode="stream")
+
+    async def astream_sentences(self, question: str, thread_id: Optional[str] = None) -> AsyncIterator[str]:
+        """
+        Stream the agent's answer one complete sentence at a time.
+
+        Only the text written by the model is used: tool calls and tool results are skipped.
+        """
+        chunker = SentenceChunker()
+        events = self.astream_response(question, thread_id)
+        try:
+            async for event in events:
+                if event.type != "token":
+                    continue
+                for sentence in chunker.push(event.text):
+                    print(f"[LLM] Sentence: {sentence[:50]}...")
+                    yield sentence
+        finally:
+            # Stop the agent stream right away when the consumer stops early
+            await events.aclose()
+        for sentence in chunker.flush():
+            print(f"[LLM] Sentence: {sentence[:50]}...")
+            yield sentence
@@ -0,0 +1,97 @@
+"""
+NumPy retriever - exact cosine top-k search over a matrix of normalized embeddings.
+"""
+
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+from langchain_core.callbacks import AsyncCallbackManagerForRetrieverRun, CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.retrievers import BaseRetriever
+
+from services.embedding_index import EmbeddingIndex, normalize_rows
+
+
+def top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """
+    Indices of the k highest scores of every row of `scores`, best first.
+
+    argpartition selects them in linear time; only those k are then sorted.
+    """
+    k = min(k, scores.shape[1])
+    if k < scores.shape[1]:
+        indices = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    else:
+        indices = np.broadcast_to(np.arange(scores.shape[1]), scores.shape)
+    order = np.argsort(-np.take_along_axis(scores, indices, axis=1), axis=1, kind="stable")
+    return np.take_along_axis(indices, order, axis=1)
+
+
+class NumpyRetriever(BaseRetriever):
+    """
+    LangChain retriever scoring every document with one matrix product.
+
+    Rows of `matrix` are unit length, so a dot product with a normalized query is the cosine
+    similarity. Build it with from_index() or from_vectors() rather than directly.
+    """
+
+    embeddings: Embeddings
+    documents: List[Document]
+    matrix: np.ndarray
+    k: int = 2
+
+    @classmethod
+    def from_vectors(cls, documents: List[Document], vectors, embeddings: Embeddings, k: int = 2,
+                     normalized: bool = False) -> "NumpyRetriever":
+        """
+        Args:
+            documents: Documents, in the order of the rows of `vectors`
+            vectors: One embedding per document
+            embeddings: Model embedding the queries; must be the one that embedded the documents
+            k: Number of documents returned per query
+            normalized: Whether rows are already unit-length float32 (used as is, e.g. memory-mapped)
+        """
+        if normalized:
+            matrix = np.ascontiguousarray(vectors, dtype=np.float32)
+        else:
+            matrix = normalize_rows(vectors) if len(documents) else np.zeros((0, 0), dtype=np.float32)
+        if len(documents) != len(matrix):
+            raise ValueError(f"{len(documents)} documents for {len(matrix)} embeddings")
+        return cls(embeddings=embeddings, documents=documents, matrix=matrix, k=k)
+
+    @classmethod
+    def from_index(cls, index: EmbeddingIndex, embeddings: Embeddings, k: int = 2) -> "NumpyRetriever":
+        """Retriever over a saved embedding index, whose rows are stored normalized."""
+        return cls.from_vectors(index.documents, index.vectors, embeddings, k=k, normalized=True)
+
+    def search_by_vectors(self, queries, k: Optional[int] = None) -> List[List[Tuple[Document, float]]]:
+        """
+        Top-k documents of every query embedding, with their cosine similarity.
+
+        Args:
+            queries: Query embeddings, shape (queries, dimensions) or a single vector
+            k: Documents per query (the retriever's k by default)
+        """
+        queries = normalize_rows(queries)
+        if not self.documents:
+            return [[] for _ in range(len(queries))]
+        scores = queries @ self.matrix.T
+        indices = top_k(scores, k or self.k)
+        return [[(self.documents[i], float(row_scores[i])) for i in row]
+                for row, row_scores in zip(indices, scores)]
+
+    def search(self, queries: Sequence[str], k: Optional[int] = None) -> List[List[Document]]:
+        """Top-k documents of several queries, embedded in a single call."""
+        if not queries:
+            return []
+        results = self.search_by_vectors(self.embeddings.embed_documents(list(queries)), k)
+        return [[doc for doc, _ in result] for result in results]
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> List[Document]:
+        return [doc for doc, _ in self.search_by_vectors(self.embeddings.embed_query(query))[0]]
+
+    async def _aget_relevant_documents(self, query: str, *,
+                                       run_manager: AsyncCallbackManagerForRetrieverRun) -> List[Document]:
+        vector = await self.embeddings.aembed_query(query)
+        return [doc for doc, _ in self.search_by_vectors(vector)[0]]
@@ -0,0 +1,36 @@
+"""
+Sentence splitting for speech synthesis, on complete texts or on streamed tokens.
+"""
+
+import re
+from typing import List
+
+# End of sentence: terminal punctuation, optionally followed by a closing quote or bracket,
+# then whitespace before anything but a lowercase letter ("e.g. this" is not a break);
+# or a line break
+_SENTENCE_END = re.compile(r"(?:(?<=[.!?…])|(?<=[.!?…][\"'”’)\]]))\s+(?=[^a-z])|\n+")
+
+
+def split_sentences(text: str) -> List[str]:
+    """Split text into sentences, dropping empty pieces."""
+    return [sentence.strip() for sentence in _SENTENCE_END.split(text) if sentence and sentence.strip()]
+
+
+class SentenceChunker:
+    """Cuts a stream of text deltas (e.g. LLM tokens) into complete sentences."""
+
+    def __init__(self):
+        self._buffer = ""
+
+    def push(self, delta: str) -> List[str]:
+        """Add a delta and return the sentences it completed."""
+        self._buffer += delta
+        pieces = _SENTENCE_END.split(self._buffer)
+        # The last piece may still be growing
+        self._buffer = pieces.pop()
+        return [piece.strip() for piece in pieces if piece and piece.strip()]
+
+    def flush(self) -> List[str]:
+        """Return whatever is left once the stream has ended."""
+        rest, self._buffer = self._buffer.strip(), ""
+        return [rest] if rest else []
@@ -0,0 +1,148 @@
+"""
+Session memory manager - bounds the conversation checkpoints kept in memory by LLMService.
+"""
+
+import asyncio
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, List
+
+from langgraph.checkpoint.memory import InMemorySaver
+
+from services.metrics import metrics
+
+LLM_SESSIONS = metrics.gauge("llm_sessions_active", "Conversation threads held in LLM memory")
+LLM_SESSION_BYTES = metrics.gauge("llm_session_memory_bytes", "Estimated size of the checkpoints held in LLM memory")
+LLM_SESSIONS_EVICTED = metrics.counter("llm_sessions_evicted_total", "Conversation threads dropped from LLM memory",
+                                       labelnames=("reason",))
+
+
+def _payload_bytes(value: Any) -> int:
+    """Size of the serialized payloads (bytes) nested in a checkpointer entry."""
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return len(value)
+    if isinstance(value, str):
+        return len(value)
+    if isinstance(value, dict):
+        # Snapshot first: agents may be writing checkpoints on other threads
+        return sum(_payload_bytes(item) for item in list(value.values()))
+    if isinstance(value, (tuple, list)):
+        return sum(_payload_bytes(item) for item in value)
+    return 0
+
+
+class SessionMemoryManager:
+    def __init__(self, checkpointer: InMemorySaver, ttl_s: float = 1800, max_sessions: int = 256):
+        """
+        Track the conversation threads stored in an InMemorySaver and delete the stale ones.
+
+        A thread is dropped when it has not been used for `ttl_s` seconds, when more than
+        `max_sessions` threads are held (least recently used first), or when released explicitly
+        (e.g. the voice session was reset or disconnected).
+
+        Args:
+            checkpointer: Checkpointer of the agent whose threads are managed
+            ttl_s: Idle time after which a thread is deleted
+            max_sessions: Maximum number of threads kept by this process
+        """
+        self.checkpointer = checkpointer
+        self.ttl_s = ttl_s
+        self.max_sessions = max_sessions
+        self._last_used: "OrderedDict[str, float]" = OrderedDict()
+        self._lock = threading.Lock()
+        LLM_SESSIONS.set_function(lambda: len(self))
+        LLM_SESSION_BYTES.set_function(self.estimate_bytes)
+
+    @classmethod
+    def from_env(cls, checkpointer: InMemorySaver) -> "SessionMemoryManager":
+        """Build a manager configured by VOICE_LLM_SESSION_TTL_S and VOICE_LLM_MAX_SESSIONS."""
+        return cls(
+            checkpointer,
+            ttl_s=float(os.getenv("VOICE_LLM_SESSION_TTL_S", "1800")),
+            max_sessions=int(os.getenv("VOICE_LLM_MAX_SESSIONS", "256")),
+        )
+
+    def __len__(self) -> int:
+        return len(self._last_used)
+
+    def touch(self, thread_id: str):
+        """Record that a thread is being used, evicting expired and surplus threads."""
+        now = time.monotonic()
+        with self._lock:
+            self._last_used[thread_id] = now
+            self._last_used.move_to_end(thread_id)
+            expired = self._pop_expired(now)
+            surplus = []
+            while len(self._last_used) > self.max_sessions:
+                surplus.append(self._last_used.popitem(last=False)[0])
+        self._delete(expired, "expired")
+        self._delete(surplus, "capacity")
+
+    def done(self, thread_id: str):
+        """
+        Record the end of a call on a thread. If the thread was released or evicted while the
+        call was running, whatever the call wrote since is deleted too.
+        """
+        with self._lock:
+            tracked = thread_id in self._last_used
+            if tracked:
+                self._last_used[thread_id] = time.monotonic()
+                self._last_used.move_to_end(thread_id)
+        if not tracked:
+            self.checkpointer.delete_thread(thread_id)
+
+    def release(self, thread_id: str):
+        """Delete a thread right away (e.g. on reset or disconnect)."""
+        with self._lock:
+            self._last_used.pop(thread_id, None)
+        self._delete([thread_id], "released")
+
+    def sweep(self) -> int:
+        """Delete every expired thread and return how many were dropped."""
+        with self._lock:
+            expired = self._pop_expired(time.monotonic())
+        self._delete(expired, "expired")
+        return len(expired)
+
+    async def sweep_periodically(self, interval_s: float = 60):
+        """
+        Call sweep() every `interval_s` seconds until cancelled.
+
+        touch() only evicts when a thread is used: without this, the threads of sessions that
+        went quiet would stay in memory as long as no new conversation starts.
+        """
+        while True:
+            await asyncio.sleep(interval_s)
+            try:
+                self.sweep()
+            except Exception as e:
+                print(f"[LLM] Warning: Could not sweep conversation memory: {e}")
+
+    def estimate_bytes(self) -> int:
+        """Approximate size of the serialized checkpoints, writes and channel values held."""
+        checkpointer = self.checkpointer
+        return (
+            _payload_bytes(list(checkpointer.storage.values()))
+            + _payload_bytes(list(checkpointer.writes.values()))
+            + _payload_bytes(list(checkpointer.blobs.values()))
+        )
+
+    def _pop_expired(self, now: float) -> List[str]:
+        # Caller holds the lock; the oldest threads come first
+        expired = []
+        for thread_id, last_used in self._last_used.items():
+            if now - last_used < self.ttl_s:
+                break
+            expired.append(thread_id)
+        for thread_id in expired:
+            del self._last_used[thread_id]
+        return expired
+
+    def _delete(self, thread_ids: List[str], reason: str):
+        for thread_id in thread_ids:
+            self.checkpointer.delete_thread(thread_id)
+            LLM_SESSIONS_EVICTED.inc(reason=reason)
+            print(f"[LLM] Released conversation memory of {thread_id} ({reason})")
+
@@ -0,0 +1,70 @@
+"""
+STT batch scheduler - groups transcriptions from concurrent sessions into batched Whisper calls.
+"""
+
+import asyncio
+from typing import List, Optional, Set, Tuple
+
+import numpy as np
+
+
+class STTBatchScheduler:
+    def __init__(self, stt_service, window_ms: float = 30, max_batch_size: int = 8):
+        """
+        Micro-batcher in front of STTService.transcribe_batch.
+
+        The first request opens a window of `window_ms`; every request arriving meanwhile joins
+        the batch, which is sent to the STT worker pool when the window closes or as soon as it
+        holds `max_batch_size` requests. Each caller gets its own transcript back.
+
+        Args:
+            stt_service: STTService providing transcribe_batch() and the STT executor
+            window_ms: How long the first request of a batch waits for others
+            max_batch_size: Maximum number of audio segments per batch
+        """
+        self.stt_service = stt_service
+        self.window_s = window_ms / 1000
+        self.max_batch_size = max_batch_size
+        self._pending: List[Tuple[np.ndarray, Optional[str], asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._running: Set[asyncio.Task] = set()
+
+    async def transcribe(self, audio: np.ndarray, initial_prompt: Optional[str] = None) -> str:
+        """Queue 16 kHz float32 audio for the next batch and wait for its transcript."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((audio, initial_prompt, future))
+
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window_s, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        # Callers that gave up (e.g. disconnected) are left out
+        batch = [item for item in self._pending if not item[2].done()]
+        self._pending = []
+        if not batch:
+            return
+        task = asyncio.ensure_future(self._run(batch))
+        self._running.add(task)
+        task.add_done_callback(self._running.discard)
+
+    async def _run(self, batch: List[Tuple[np.ndarray, Optional[str], asyncio.Future]]):
+        audios = [audio for audio, _, _ in batch]
+        prompts = [prompt for _, prompt, _ in batch]
+        try:
+            texts = await self.stt_service.executor.run(self.stt_service.transcribe_batch, audios, prompts)
+        except Exception as e:
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        print(f"[STT] Batch of {len(batch)} segments transcribed")
+        for (_, _, future), text in zip(batch, texts):
+            if not future.done():
+                future.set_result(text)
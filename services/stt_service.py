@@ -1,58 +1,143 @@
 """
-Speech-to-Text Service using OpenAI Whisper API.
+Speech-to-Text Service using faster-whisper.
 """
 
-import tempfile
+import bisect
+import functools
 import os
-from faster_whisper import WhisperModel
+import time
+from typing import List, Optional
+
+import numpy as np
+from faster_whisper import BatchedInferencePipeline, WhisperModel
+from faster_whisper.audio import decode_audio
+
+from services.audio_buffer import AudioBufferReader, BytesLike, detect_audio_format
+from services.executor import StageExecutor
+from services.metrics import metrics
+from services.stt_scheduler import STTBatchScheduler
+from services.vad import SilenceTrimmer
+
+# Whisper models expect 16 kHz mono input
+SAMPLE_RATE = 16000
+# Whisper decodes at most 30 seconds at a time
+MAX_CLIP_SAMPLES = 30 * SAMPLE_RATE
+
+STT_REAL_TIME_FACTOR = metrics.histogram(
+    "stt_real_time_factor", "Whisper processing time divided by the duration of the audio received",
+    labelnames=("mode",), buckets=(0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1.0, 1.5, 2.0, 5.0),
+)
+STT_AUDIO_SECONDS = metrics.counter("stt_audio_seconds_total", "Seconds of audio received for transcription")
+STT_TRIMMED_SECONDS = metrics.counter("stt_trimmed_seconds_total", "Seconds of silence removed before Whisper")
+
+
+def decode_audio_bytes(audio_bytes: BytesLike) -> np.ndarray:
+    """
+    Decode an encoded recording (WebM, WAV, MP3, OGG, ...) held in memory, without copying it.
+
+    Returns:
+        Mono float32 samples at 16 kHz, ready for WhisperModel.transcribe
+    """
+    return decode_audio(AudioBufferReader(audio_bytes), sampling_rate=SAMPLE_RATE)
+
+
+@functools.lru_cache(maxsize=None)
+def _load_stt_service(model_size: str, device: str) -> "STTService":
+    """Rebuild the service inside a worker process, once per process."""
+    return STTService(model_size=model_size, device=device)
 
 
 class STTService:
-    def __init__(self, model_size: str, device: str):
+    def __init__(self, model_size: str, device: str, executor: Optional[StageExecutor] = None,
+                 batch_window_ms: Optional[float] = None, max_batch_size: Optional[int] = None,
+                 trim_silence: Optional[bool] = None):
+        """
+        Initialize the Whisper model.
+
+        Args:
+            model_size: faster-whisper model size or path (e.g. "large-v3")
+            device: "cpu" or "cuda"
+            executor: Worker pool used by the async methods (optional)
+            batch_window_ms: Time window in which concurrent async transcriptions are grouped into
+                one batched Whisper call; 0 disables batching (default: VOICE_STT_BATCH_WINDOW_MS or 0)
+            max_batch_size: Maximum segments per batch (default: VOICE_STT_MAX_BATCH or 8)
+            trim_silence: Trim silence before inference, see SilenceTrimmer for its settings
+                (default: VOICE_STT_TRIM_SILENCE or true)
+        """
+        self.model_size = model_size
+        self.device = device
         self.model = WhisperModel(model_size_or_path=model_size, device=device, compute_type="int8")
+        self.batched_model = BatchedInferencePipeline(model=self.model)
+        self.executor = executor or StageExecutor.from_env("stt", max_workers=1, max_queue=8)
+
+        if batch_window_ms is None:
+            batch_window_ms = float(os.getenv("VOICE_STT_BATCH_WINDOW_MS", "0"))
+        if max_batch_size is None:
+            max_batch_size = int(os.getenv("VOICE_STT_MAX_BATCH", "8"))
+        self.scheduler = STTBatchScheduler(self, window_ms=batch_window_ms, max_batch_size=max_batch_size) if batch_window_ms > 0 else None
+
+        if trim_silence is None:
+            trim_silence = os.getenv("VOICE_STT_TRIM_SILENCE", "true").lower() == "true"
+        self.trimmer = SilenceTrimmer.from_env(sample_rate=SAMPLE_RATE) if trim_silence else None
+
+    def __reduce__(self):
+        # The Whisper model cannot be pickled: process pool workers load their own copy
+        return (_load_stt_service, (self.model_size, self.device))
+
+    async def atranscribe(self, audio_bytes: BytesLike) -> str:
+        """Run transcribe() on the STT worker pool, batched with other sessions if enabled."""
+        audio_bytes = self.worker_bytes(audio_bytes)
+        if self.scheduler is None:
+            return await self.executor.run(self.transcribe, audio_bytes)
+        audio = await self.executor.run(self.decode, audio_bytes)
+        result = await self.scheduler.transcribe(audio)
+        print(f"[STT] Result: {result}")
+        return result
+
+    async def atranscribe_array(self, audio: np.ndarray, initial_prompt: Optional[str] = None) -> str:
+        """Run transcribe_array() on the STT worker pool, batched with other sessions if enabled."""
+        if self.scheduler is not None:
+            return await self.scheduler.transcribe(audio, initial_prompt=initial_prompt)
+        return await self.executor.run(self.transcribe_array, audio, initial_prompt=initial_prompt)
     
-    def transcribe(self, audio_bytes: bytes) -> str:
-        """Convert audio bytes to text using Whisper API."""
-        if not audio_bytes or len(audio_bytes) == 0:
+    def worker_bytes(self, audio_bytes: BytesLike) -> BytesLike:
+        """Audio bytes in a form the STT pool accepts: views are copied for process pools only."""
+        if self.executor.kind == "process" and not isinstance(audio_bytes, bytes):
+            return bytes(audio_bytes)
+        return audio_bytes
+
+    def transcribe(self, audio_bytes: BytesLike) -> str:
+        """Convert audio bytes to text using Whisper."""
+        result = self.transcribe_array(self.decode(audio_bytes))
+        print(f"[STT] Result: {result}")
+        return result
+
+    def decode(self, audio_bytes: BytesLike) -> np.ndarray:
+        """Check the format of encoded audio bytes and decode them to 16 kHz mono samples."""
+        if len(audio_bytes) == 0:
             raise ValueError("Audio bytes cannot be empty")
         
-        temp_file = None
         try:
             # Detect audio format from magic bytes (file signature)
             # WebM starts with: 1A 45 DF A3
             # WAV starts with: 52 49 46 46 (RIFF)
             # MP3 starts with: FF FB or FF F3 or FF F2
             try:
-                audio_format = self._detect_audio_format(audio_bytes)
+                audio_format = detect_audio_format(audio_bytes)
             except ValueError as e:
                 # If format detection fails, log detailed info and re-raise
                 print(f"[STT] Format detection failed: {e}")
                 print(f"[STT] First 50 bytes (hex): {audio_bytes[:50].hex()}")
-                print(f"[STT] First 50 bytes (repr): {repr(audio_bytes[:50])}")
+                print(f"[STT] First 50 bytes (repr): {bytes(audio_bytes[:50])!r}")
                 raise
             
-            suffix = f".{audio_format}"
-            
             print(f"[STT] Using format: {audio_format}, size: {len(audio_bytes)} bytes")
             
-            # Save audio to temporary file (Whisper requires file upload)
-            temp_file = tempfile.NamedTemporaryFile(delete=False, suffix=suffix)
-            temp_file.write(audio_bytes)
-            temp_file.flush()  # Ensure data is written
-            temp_file.close()
+            # Decode in memory: the container is probed from its content, no temp file needed
+            audio = decode_audio_bytes(audio_bytes)
             
-            print(f"[STT] Transcribing {len(audio_bytes)} bytes...")
-            
-            # Transcribe with Whisper
-            # Pass the file path directly - OpenAI SDK will handle it
-            with open(temp_file.name, "rb"):
-                segments, _ = self.model.transcribe(temp_file.name)
-                # Concatenate all recognized text segments into a single string
-                transcript = "".join([segment.text for segment in segments])
-
-            result = transcript.strip() if isinstance(transcript, str) else transcript.text.strip()
-            print(f"[STT] Result: {result}")
-            return result
+            print(f"[STT] Transcribing {len(audio_bytes)} bytes ({len(audio) / SAMPLE_RATE:.1f}s of audio)...")
+            return audio
             
         except Exception as e:
             print(f"[STT] Error during transcription: {e}")
@@ -60,69 +145,80 @@ class STTService:
             if audio_bytes:
                 print(f"[STT] First 20 bytes (hex): {audio_bytes[:20].hex()}")
             raise
-        finally:
-            # Clean up temp file
-            if temp_file and os.path.exists(temp_file.name):
-                try:
-                    os.unlink(temp_file.name)
-                except Exception as e:
-                    print(f"[STT] Warning: Could not delete temp file: {e}")
     
-    def _detect_audio_format(self, audio_bytes: bytes) -> str:
+    def transcribe_array(self, audio: np.ndarray, initial_prompt: Optional[str] = None) -> str:
         """
-        Detect audio format from file signature (magic bytes).
-        
+        Transcribe already decoded audio.
+
+        Args:
+            audio: Mono float32 samples at 16 kHz
+            initial_prompt: Text preceding this audio, used as context by Whisper (optional)
+        """
+        start = time.perf_counter()
+        audio_seconds = len(audio) / SAMPLE_RATE
+        audio = self.trim(audio)
+        if len(audio) == 0:
+            return ""
+        segments, _ = self.model.transcribe(audio, initial_prompt=initial_prompt)
+        text = "".join([segment.text for segment in segments]).strip()
+        self._record_rtf("single", start, audio_seconds)
+        return text
+
+    def transcribe_batch(self, audios: List[np.ndarray], initial_prompts: Optional[List[Optional[str]]] = None) -> List[str]:
+        """
+        Transcribe several independent recordings in one batched Whisper call.
+
+        The recordings are laid end to end and each one (cut every 30s, Whisper's window) is
+        passed as a clip to faster-whisper's batched pipeline, so they are decoded together.
+        Prompts only apply to a batch of one: the batched pipeline has a single prompt.
+
         Returns:
-            Format string: 'webm', 'wav', 'mp3', 'm4a', etc.
+            One transcript per recording, in order
         """
-        if len(audio_bytes) < 4:
-            raise ValueError(f"Audio data too short: {len(audio_bytes)} bytes")
-        
-        # Check magic bytes
-        header = audio_bytes[:12]
-        header_hex = header[:8].hex()
-        
-        # WebM: starts with 1A 45 DF A3 (EBML header)
-        if header[:4] == b'\x1a\x45\xdf\xa3':
-            print("[STT] Detected WebM format")
-            return "webm"
-        
-        # WAV: starts with "RIFF" (52 49 46 46)
-        if header[:4] == b'RIFF':
-            print("[STT] Detected WAV format")
-            return "wav"
-        
-        # MP3: starts with FF FB, FF F3, FF F2, or ID3 tag
-        if header[0] == 0xFF and (header[1] & 0xE0) == 0xE0:
-            print("[STT] Detected MP3 format")
-            return "mp3"
-        if header[:3] == b'ID3':
-            print("[STT] Detected MP3 format (ID3 tag)")
-            return "mp3"
-        
-        # M4A/MP4: starts with ftyp box (usually at offset 4)
-        if len(audio_bytes) >= 8:
-            if audio_bytes[4:8] == b'ftyp':
-                print("[STT] Detected M4A/MP4 format")
-                return "m4a"
-        
-        # OGG: starts with "OggS"
-        if header[:4] == b'OggS':
-            print("[STT] Detected OGG format")
-            return "ogg"
-        
-        # FLAC: starts with "fLaC"
-        if header[:4] == b'fLaC':
-            print("[STT] Detected FLAC format")
-            return "flac"
-        
-        # Check if this looks like corrupted or invalid data
-        # Valid audio formats should have recognizable headers
-        # If we can't detect it, the data might be corrupted
-        raise ValueError(
-            f"Invalid audio data: Could not detect format. "
-            f"Header (hex): {header_hex}, "
-            f"Header (first 12 bytes): {header}, "
-            f"Size: {len(audio_bytes)} bytes. "
-            f"This might be corrupted data or an unsupported format."
-        )
+        if len(audios) == 1:
+            prompt = initial_prompts[0] if initial_prompts else None
+            return [self.transcribe_array(audios[0], initial_prompt=prompt)]
+
+        start = time.perf_counter()
+        audio_seconds = sum(len(audio) for audio in audios) / SAMPLE_RATE
+        audios = [self.trim(audio) for audio in audios]
+        clips = []
+        owners = []
+        offset = 0
+        for i, audio in enumerate(audios):
+            for clip_start in range(0, len(audio), MAX_CLIP_SAMPLES):
+                clip_end = min(len(audio), clip_start + MAX_CLIP_SAMPLES)
+                clips.append({"start": (offset + clip_start) / SAMPLE_RATE, "end": (offset + clip_end) / SAMPLE_RATE})
+                owners.append(i)
+            offset += len(audio)
+
+        texts = [[] for _ in audios]
+        if clips:
+            clip_starts = [clip["start"] for clip in clips]
+            segments, _ = self.batched_model.transcribe(
+                np.concatenate(audios), clip_timestamps=clips, batch_size=len(clips),
+                vad_filter=False, without_timestamps=True,
+            )
+            for segment in segments:
+                # Segments carry absolute times: find the clip, hence the recording, they belong to
+                clip = max(0, bisect.bisect_right(clip_starts, segment.start + 1e-3) - 1)
+                texts[owners[clip]].append(segment.text)
+        self._record_rtf("batch", start, audio_seconds)
+        return ["".join(parts).strip() for parts in texts]
+
+    def trim(self, audio: np.ndarray) -> np.ndarray:
+        """Remove silence from decoded audio, unless trimming is disabled."""
+        if self.trimmer is None:
+            return audio
+        trimmed, stats = self.trimmer.trim(audio)
+        STT_TRIMMED_SECONDS.inc(stats.removed_seconds)
+        if stats.removed_seconds > 0:
+            print(f"[STT] Trimmed {stats.removed_seconds:.2f}s of silence "
+                  f"({stats.input_seconds:.2f}s -> {stats.output_seconds:.2f}s)")
+        return trimmed
+
+    def _record_rtf(self, mode: str, start: float, audio_seconds: float):
+        if audio_seconds <= 0:
+            return
+        STT_AUDIO_SECONDS.inc(audio_seconds)
+        STT_REAL_TIME_FACTOR.observe((time.perf_counter() - start) / audio_seconds, mode=mode)
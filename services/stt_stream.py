@@ -0,0 +1,333 @@
+"""
+Streaming Speech-to-Text - transcribes an utterance incrementally while it is being recorded.
+"""
+
+import asyncio
+import bisect
+import io
+import threading
+import time
+from typing import List, Optional, Tuple
+
+import av
+import numpy as np
+from faster_whisper.vad import VadOptions, get_speech_timestamps
+
+from services.audio_buffer import BytesLike, SessionAudioBuffer
+from services.stt_service import SAMPLE_RATE, STTService, decode_audio_bytes
+
+
+class _Pipe(io.RawIOBase):
+    """File object read by PyAV on the decoder thread: reads block until more bytes are fed or the input ends."""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self._pending = b""
+        self._ended = False
+        self._condition = threading.Condition()
+
+    def readable(self) -> bool:
+        return True
+
+    def feed(self, data: BytesLike):
+        with self._condition:
+            self._chunks.append(bytes(data))
+            self._condition.notify()
+
+    def end(self):
+        with self._condition:
+            self._ended = True
+            self._condition.notify()
+
+    def readinto(self, buffer) -> int:
+        with self._condition:
+            while not self._pending and not self._chunks and not self._ended:
+                self._condition.wait()
+            if not self._pending and self._chunks:
+                self._pending = b"".join(self._chunks)
+                self._chunks = []
+            size = min(len(buffer), len(self._pending))
+            buffer[:size] = self._pending[:size]
+            self._pending = self._pending[size:]
+            return size
+
+
+class IncrementalDecoder:
+    def __init__(self):
+        """
+        Decodes a recording while it is being received, every byte once.
+
+        PyAV demuxes and decodes on a background thread, reading the bytes given to feed() as
+        they come; the 16 kHz mono samples decoded so far can be read at any time. Same output
+        as decode_audio_bytes() on the whole recording, for containers that can be read
+        sequentially (WebM, Ogg, WAV, MP3). Others (e.g. MP4) set `error`. WebM/Opus from
+        MediaRecorder is decoded chunk by chunk; for WAV, PyAV reads ahead about 2s of audio
+        while opening it.
+        """
+        self._pipe = _Pipe()
+        self._offsets: List[int] = []
+        self._frames: List[np.ndarray] = []
+        self._lock = threading.Lock()
+        self.samples = 0
+        self.error: Optional[Exception] = None
+        self._thread = threading.Thread(target=self._run, name="stt-decoder", daemon=True)
+        self._thread.start()
+
+    def feed(self, data: BytesLike):
+        """Queue more bytes of the recording (ignored once decoding has failed)."""
+        if self.error is None and len(data):
+            self._pipe.feed(data)
+
+    def end(self):
+        """Signal the end of the recording: the thread decodes what is left and stops."""
+        self._pipe.end()
+
+    def join(self, timeout: Optional[float] = None) -> bool:
+        """Wait for the thread after end(), and tell whether every sample was decoded."""
+        self._thread.join(timeout)
+        return not self._thread.is_alive() and self.error is None
+
+    def read(self, start: int = 0) -> np.ndarray:
+        """Float32 samples decoded so far, from sample `start` on."""
+        with self._lock:
+            first = max(0, bisect.bisect_right(self._offsets, start) - 1)
+            frames = self._frames[first:]
+            skip = start - self._offsets[first] if frames else 0
+        if not frames:
+            return np.zeros(0, dtype=np.float32)
+        return np.concatenate(frames)[skip:].astype(np.float32) / 32768.0
+
+    def _run(self):
+        resampler = av.audio.resampler.AudioResampler(format="s16", layout="mono", rate=SAMPLE_RATE)
+        try:
+            # Small probe: the first samples are decoded as soon as the header has arrived
+            with av.open(self._pipe, mode="r", metadata_errors="ignore",
+                         options={"probesize": "4096", "analyzeduration": "0"}) as container:
+                for frame in self._frames_of(container):
+                    frame.pts = None
+                    for resampled in resampler.resample(frame):
+                        self._append(resampled)
+            for resampled in resampler.resample(None):
+                self._append(resampled)
+        except Exception as e:
+            self.error = e
+            print(f"[STT] Incremental decode stopped: {e}")
+
+    @staticmethod
+    def _frames_of(container):
+        frames = container.decode(audio=0)
+        while True:
+            try:
+                yield next(frames)
+            except StopIteration:
+                return
+            except av.error.InvalidDataError:
+                continue
+
+    def _append(self, frame):
+        samples = frame.to_ndarray().reshape(-1)
+        with self._lock:
+            self._offsets.append(self.samples)
+            self._frames.append(samples)
+            self.samples += len(samples)
+
+
+def _find_closed_speech(
+    pending: np.ndarray,
+    vad_options: VadOptions,
+    min_silence_samples: int,
+) -> Tuple[Optional[np.ndarray], int]:
+    """
+    Find the speech in `pending` (the samples after the cursor) that is already followed by
+    enough silence.
+
+    Stateless so it can run on any STT worker, including a process pool.
+
+    Returns:
+        The closed speech to transcribe (None if nothing was closed) and how many samples of
+        `pending` the cursor moves forward
+    """
+    timestamps = get_speech_timestamps(pending, vad_options, sampling_rate=SAMPLE_RATE)
+
+    if not timestamps:
+        # Only silence so far: skip it so it is not scanned again
+        return None, max(0, len(pending) - min_silence_samples)
+
+    # A segment is closed once enough silence follows it
+    closed = [ts for ts in timestamps if ts["end"] + min_silence_samples <= len(pending)]
+    if not closed:
+        return None, 0
+
+    start, end = closed[0]["start"], closed[-1]["end"]
+    return pending[start:end], end
+
+
+def _decode_tail(data: BytesLike, cursor: int) -> np.ndarray:
+    """Decode the finished recording in one go and return everything after `cursor`."""
+    return decode_audio_bytes(data)[cursor:]
+
+
+def _decoded_tail(decoder: IncrementalDecoder, cursor: int, timeout: float = 30) -> Optional[np.ndarray]:
+    """
+    Wait for an ended decoder and return everything after `cursor`, or None when the recording
+    has to be decoded again (the decoder failed, e.g. on a container it cannot read sequentially).
+    """
+    if not decoder.join(timeout):
+        return None
+    return decoder.read(cursor)
+
+
+def _speech_or_none(tail: np.ndarray) -> Optional[np.ndarray]:
+    # Anything shorter than 100ms cannot hold a word
+    return tail if len(tail) >= SAMPLE_RATE // 10 else None
+
+
+class STTStream:
+    def __init__(
+        self,
+        stt_service: STTService,
+        audio: Optional[SessionAudioBuffer] = None,
+        decode_interval_s: float = 1.0,
+        min_silence_ms: int = 500,
+        speech_pad_ms: int = 200,
+    ):
+        """
+        Incremental transcription for a single recording.
+
+        Audio chunks are accumulated in `audio` as they arrive and decoded in the background by
+        an IncrementalDecoder, each byte once. At most every `decode_interval_s` voice-activity
+        detection scans the samples decoded since the last closed segment, and every segment
+        followed by at least `min_silence_ms` of silence is transcribed straight away.
+        `finish()` only has to transcribe what is left.
+
+        Args:
+            stt_service: Service owning the Whisper model
+            audio: Buffer of the recording, shared with the caller (optional, a new one by default)
+            decode_interval_s: Minimum time between two VAD passes
+            min_silence_ms: Silence needed after speech before a segment is closed
+            speech_pad_ms: Padding kept around each detected speech segment
+        """
+        self.stt_service = stt_service
+        self.decode_interval_s = decode_interval_s
+        self.vad_options = VadOptions(min_silence_duration_ms=min_silence_ms, speech_pad_ms=speech_pad_ms)
+        self._min_silence_samples = int(SAMPLE_RATE * min_silence_ms / 1000)
+        self.audio = audio if audio is not None else SessionAudioBuffer.from_env()
+        self._decoder: Optional[IncrementalDecoder] = None
+        self._fed = 0  # Bytes of the buffer given to the decoder
+        self._cursor = 0  # First sample (16 kHz) not transcribed yet
+        self._parts: List[str] = []
+        self._last_decode = 0.0
+
+    def feed(self, chunk: Optional[bytes] = None) -> List[str]:
+        """
+        Add an audio chunk and transcribe any speech segment that has been closed.
+
+        Args:
+            chunk: New audio, or None if it was already appended to the shared buffer
+
+        Returns:
+            Transcripts of the segments completed by this chunk (often empty)
+        """
+        if not self._append(chunk):
+            return []
+        speech, advance = _find_closed_speech(*self._scan_args())
+        text = self.stt_service.transcribe_array(speech, initial_prompt=self._prompt()) if speech is not None else ""
+        return self._record_partial(text, advance)
+
+    async def afeed(self, chunk: Optional[bytes] = None) -> List[str]:
+        """Same as feed(), with VAD and inference running on the STT worker pool."""
+        if not self._append(chunk):
+            return []
+        speech, advance = await self.stt_service.executor.run(_find_closed_speech, *self._scan_args())
+        text = await self.stt_service.atranscribe_array(speech, initial_prompt=self._prompt()) if speech is not None else ""
+        return self._record_partial(text, advance)
+
+    def finish(self) -> str:
+        """Transcribe the remaining audio and return the transcript of the whole recording."""
+        self._check_not_empty()
+        decoder = self._end_decoder()
+        tail = _decoded_tail(decoder, self._cursor) if decoder is not None else None
+        if tail is None:
+            tail = _decode_tail(self.audio.view(), self._cursor)
+        tail = _speech_or_none(tail)
+        text = self.stt_service.transcribe_array(tail, initial_prompt=self._prompt()) if tail is not None else ""
+        return self._complete(text)
+
+    async def afinish(self) -> str:
+        """Same as finish(), running on the STT worker pool."""
+        self._check_not_empty()
+        decoder = self._end_decoder()
+        tail = await asyncio.to_thread(_decoded_tail, decoder, self._cursor) if decoder is not None else None
+        if tail is None:
+            tail = await self.stt_service.executor.run(
+                _decode_tail, self.stt_service.worker_bytes(self.audio.view()), self._cursor
+            )
+        tail = _speech_or_none(tail)
+        text = await self.stt_service.atranscribe_array(tail, initial_prompt=self._prompt()) if tail is not None else ""
+        return self._complete(text)
+
+    def reset(self):
+        """Drop the buffered recording and every partial transcript."""
+        if self._decoder is not None:
+            self._decoder.end()
+            self._decoder = None
+        self.audio.clear()
+        self._fed = 0
+        self._cursor = 0
+        self._parts = []
+        self._last_decode = 0.0
+
+    def _append(self, chunk: Optional[bytes]) -> bool:
+        """Buffer a chunk, pass the new bytes to the decoder and tell whether a VAD pass is due."""
+        if chunk is not None:
+            self.audio.append(chunk)
+        self._feed_decoder()
+        now = time.monotonic()
+        if now - self._last_decode < self.decode_interval_s:
+            return False
+        self._last_decode = now
+        return True
+
+    def _feed_decoder(self):
+        if len(self.audio) <= self._fed:
+            return
+        if self._decoder is None:
+            self._decoder = IncrementalDecoder()
+        self._decoder.feed(self.audio.view()[self._fed:])
+        self._fed = len(self.audio)
+
+    def _end_decoder(self) -> Optional[IncrementalDecoder]:
+        """Give the decoder the last bytes of the recording and tell it the recording is over."""
+        self._feed_decoder()
+        if self._decoder is not None:
+            self._decoder.end()
+        return self._decoder
+
+    def _scan_args(self) -> tuple:
+        # Only the samples decoded since the last closed segment are scanned
+        pending = self._decoder.read(self._cursor) if self._decoder is not None else np.zeros(0, dtype=np.float32)
+        return (pending, self.vad_options, self._min_silence_samples)
+
+    def _prompt(self) -> Optional[str]:
+        # Previous segments are given as prompt to keep wording consistent across cuts
+        return " ".join(self._parts) or None
+
+    def _record_partial(self, text: str, advance: int) -> List[str]:
+        self._cursor += advance
+        if not text:
+            return []
+        self._parts.append(text)
+        print(f"[STT] Partial transcript: {text}")
+        return [text]
+
+    def _check_not_empty(self):
+        if not len(self.audio):
+            raise ValueError("Audio bytes cannot be empty")
+
+    def _complete(self, text: str) -> str:
+        if text:
+            self._parts.append(text)
+        transcript = " ".join(self._parts)
+        print(f"[STT] Result: {transcript}")
+        self.reset()
+        return transcript
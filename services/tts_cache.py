@@ -0,0 +1,130 @@
+"""
+TTS phrase cache - content-addressed cache of synthesized sentences (memory LRU + optional disk).
+"""
+
+import os
+import tempfile
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import Optional
+
+import xxhash
+
+
+class TTSCache:
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024, disk_dir: Optional[str] = None):
+        """
+        Two-tier cache for synthesized audio.
+
+        Args:
+            max_bytes: Size of the in-memory LRU tier; least recently used entries are evicted beyond it
+            disk_dir: Directory of the on-disk tier (optional). Entries are never evicted from disk,
+                files are written atomically so several processes can share the directory
+        """
+        self.max_bytes = max_bytes
+        self.disk_dir = disk_dir
+        self._entries: "OrderedDict[str, bytes]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+
+    @classmethod
+    def from_env(cls) -> "TTSCache":
+        """Build a cache configured by TTS_CACHE_MAX_BYTES and TTS_CACHE_DIR."""
+        return cls(
+            max_bytes=int(os.getenv("TTS_CACHE_MAX_BYTES", str(64 * 1024 * 1024))),
+            disk_dir=os.getenv("TTS_CACHE_DIR") or None,
+        )
+
+    @staticmethod
+    def key(text: str, voice: str, lang_code: str, codec: str) -> str:
+        """Content address of a synthesized text: hash of voice, language, codec and normalized text."""
+        normalized = " ".join(unicodedata.normalize("NFKC", text).split())
+        return xxhash.xxh3_128_hexdigest("\x1f".join((voice, lang_code, codec, normalized)).encode("utf-8"))
+
+    def get(self, key: str) -> Optional[bytes]:
+        """Return the cached audio for `key`, looking in memory first and then on disk."""
+        with self._lock:
+            data = self._entries.get(key)
+            if data is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return data
+
+        data = self._read_disk(key)
+        with self._lock:
+            if data is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+            self._store(key, data)
+        return data
+
+    def put(self, key: str, data: bytes):
+        """Cache audio in memory and, if configured, on disk."""
+        with self._lock:
+            self._store(key, data)
+        self._write_disk(key, data)
+
+    def stats(self) -> dict:
+        """Hit/miss counters and current size of the memory tier."""
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_ratio": (self.hits + self.disk_hits) / lookups if lookups else 0.0,
+                "entries": len(self._entries),
+                "bytes": self._size,
+            }
+
+    def _store(self, key: str, data: bytes):
+        # Caller holds the lock
+        if len(data) > self.max_bytes:
+            return
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self._size -= len(previous)
+        self._entries[key] = data
+        self._size += len(data)
+        while self._size > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._size -= len(evicted)
+
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.disk_dir, key[:2], key)
+
+    def _read_disk(self, key: str) -> Optional[bytes]:
+        if not self.disk_dir:
+            return None
+        try:
+            with open(self._disk_path(key), "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+        except OSError as e:
+            print(f"[TTS] Warning: Could not read cache entry {key}: {e}")
+            return None
+
+    def _write_disk(self, key: str, data: bytes):
+        if not self.disk_dir:
+            return
+        path = self._disk_path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    f.write(data)
+                os.replace(temp_path, path)
+            except OSError:
+                os.unlink(temp_path)
+                raise
+        except OSError as e:
+            print(f"[TTS] Warning: Could not write cache entry {key}: {e}")
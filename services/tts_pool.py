@@ -0,0 +1,113 @@
+"""
+Kokoro pipeline pool - pre-initialised, warmed TTS pipelines shared by every session.
+"""
+
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator, Optional
+
+from kokoro import KPipeline
+
+KOKORO_REPO_ID = "hexgrad/Kokoro-82M"
+
+
+class KokoroPipelinePool:
+    def __init__(self, voices: Iterable[str], lang_codes: Iterable[str] = ("b",), max_size: int = 2,
+                 repo_id: str = KOKORO_REPO_ID):
+        """
+        Pool of Kokoro pipelines keyed by language code.
+
+        All pipelines share one KModel, so the model weights are loaded once. Each pipeline
+        keeps its own G2P and voice packs, which are not safe to share between threads:
+        a pipeline is used by a single synthesis at a time.
+
+        Args:
+            voices: Voices preloaded into every pipeline (e.g. ["af_heart"])
+            lang_codes: Languages served by the pool (Kokoro codes, e.g. "a", "b")
+            max_size: Maximum number of pipelines per language
+            repo_id: Hugging Face repository of the Kokoro model
+        """
+        self.voices = list(voices)
+        self.lang_codes = list(lang_codes)
+        self.max_size = max_size
+        self.repo_id = repo_id
+        self._model = None
+        self._idle: Dict[str, queue.LifoQueue] = {lang_code: queue.LifoQueue() for lang_code in self.lang_codes}
+        self._created: Dict[str, int] = {lang_code: 0 for lang_code in self.lang_codes}
+        self._lock = threading.Lock()
+        # Held while the shared KModel is loaded, so that concurrent cold acquires load it once
+        self._model_lock = threading.Lock()
+
+    @contextmanager
+    def acquire(self, lang_code: str, timeout: Optional[float] = None) -> Iterator[KPipeline]:
+        """
+        Borrow a pipeline for `lang_code`, creating one if the pool is not full yet,
+        otherwise waiting for one to be returned.
+        """
+        pipeline = self._checkout(lang_code, timeout)
+        try:
+            yield pipeline
+        finally:
+            self._idle[lang_code].put(pipeline)
+
+    def warmup(self):
+        """
+        Fill the pool: create `max_size` pipelines per language and run a short inference with
+        every voice on each, so that a burst of concurrent syntheses pays no construction.
+        """
+        for lang_code in self.lang_codes:
+            start = time.perf_counter()
+            pipelines = []
+            try:
+                # Held until every pipeline exists, otherwise the first one would be reused
+                while self._created[lang_code] < self.max_size or not self._idle[lang_code].empty():
+                    pipelines.append(self._checkout(lang_code, timeout=None))
+                for pipeline in pipelines:
+                    for voice in self.voices:
+                        for _ in pipeline("Hello.", voice=voice):
+                            pass
+            finally:
+                for pipeline in pipelines:
+                    self._idle[lang_code].put(pipeline)
+            print(f"[TTS] Warmed up {len(pipelines)} pipelines '{lang_code}' in {time.perf_counter() - start:.2f}s")
+
+    def _checkout(self, lang_code: str, timeout: Optional[float]) -> KPipeline:
+        if lang_code not in self._idle:
+            raise ValueError(f"Language code not served by the TTS pool: {lang_code}")
+        idle = self._idle[lang_code]
+        try:
+            return idle.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self._lock:
+            can_create = self._created[lang_code] < self.max_size
+            if can_create:
+                self._created[lang_code] += 1
+        if not can_create:
+            # Every pipeline is busy: wait for one instead of loading another model copy
+            return idle.get(timeout=timeout)
+
+        try:
+            return self._create(lang_code)
+        except Exception:
+            with self._lock:
+                self._created[lang_code] -= 1
+            raise
+
+    def _create(self, lang_code: str) -> KPipeline:
+        start = time.perf_counter()
+        pipeline = None
+        with self._model_lock:
+            if self._model is None:
+                # The first pipeline loads the KModel, the others reuse it
+                pipeline = KPipeline(lang_code=lang_code, repo_id=self.repo_id, model=True)
+                self._model = pipeline.model
+        if pipeline is None:
+            pipeline = KPipeline(lang_code=lang_code, repo_id=self.repo_id, model=self._model)
+        for voice in self.voices:
+            pipeline.load_voice(voice)
+        print(f"[TTS] Created pipeline '{lang_code}' with voices {self.voices} in {time.perf_counter() - start:.2f}s")
+        return pipeline
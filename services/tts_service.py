@@ -1,47 +1,210 @@
 """
-Text-to-Speech Service using OpenAI TTS API.
+Text-to-Speech Service using Kokoro.
 """
 
-from kokoro import KPipeline
+import asyncio
+import functools
+import time
+from io import BytesIO
+from typing import AsyncIterator, Optional, Sequence
+
 import numpy as np
 
 import soundfile as sf
 
+from services.executor import StageExecutor
+from services.metrics import metrics
+from services.sentences import split_sentences
+from services.tts_cache import TTSCache
+from services.tts_pool import KokoroPipelinePool
+
+
+# Kokoro renders 24 kHz mono audio
+SAMPLE_RATE = 24000
+
+# Output codecs: name -> (soundfile container, subtype, MIME type)
+AUDIO_CODECS = {
+    "wav": ("WAV", "PCM_16", "audio/wav"),
+    "flac": ("FLAC", "PCM_16", "audio/flac"),
+    "opus": ("OGG", "OPUS", "audio/ogg; codecs=opus"),
+}
+
+TTS_SECONDS_PER_AUDIO_SECOND = metrics.histogram(
+    "tts_seconds_per_audio_second", "Kokoro rendering time divided by the duration of the audio rendered",
+    buckets=(0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1.0, 1.5, 2.0, 5.0),
+)
+
+
+def encode_audio(audio: np.ndarray, codec: str = "wav") -> bytes:
+    """Encode 24 kHz mono samples into a complete file of the given codec (see AUDIO_CODECS)."""
+    if codec not in AUDIO_CODECS:
+        raise ValueError(f"Unsupported audio codec: {codec}")
+    container, subtype, _ = AUDIO_CODECS[codec]
+    buf = BytesIO()
+    sf.write(buf, audio, SAMPLE_RATE, format=container, subtype=subtype)
+    return buf.getvalue()
+
+
+@functools.lru_cache(maxsize=None)
+def _load_tts_service(voice: str, lang_code: str, voices: tuple, pool_size: int) -> "TTSService":
+    """Rebuild the service inside a worker process, once per process."""
+    return TTSService(voice=voice, lang_code=lang_code, voices=voices, pool_size=pool_size)
+
 
 class TTSService:
-    def __init__(self, voice: str = "af_heart"):
+    def __init__(self, voice: str = "af_heart", lang_code: str = "b", voices: Sequence[str] = (),
+                 pool_size: int = 2, warmup: bool = True, executor: Optional[StageExecutor] = None,
+                 cache: Optional[TTSCache] = None):
+        """
+        Initialize the TTS service and its pool of Kokoro pipelines.
+
+        Args:
+            voice: Default voice name (kokoro)
+            lang_code: Default Kokoro language code (e.g. 'a' for American, 'b' for British English)
+            voices: Additional voices to preload next to the default one
+            pool_size: Maximum number of pipelines per language, i.e. concurrent syntheses
+            warmup: Run a warm-up inference now instead of on the first reply
+            executor: Worker pool used by the async methods (optional)
+            cache: Phrase cache for synthesized sentences (optional, configured from the environment by default)
+        """
         self.voice = voice  # Save the desired voice name (kokoro)
+        self.lang_code = lang_code
+        self.voices = tuple(dict.fromkeys((voice, *voices)))
+        self.pool_size = pool_size
+        self.cache = cache or TTSCache.from_env()
+        self.pool = KokoroPipelinePool(voices=self.voices, lang_codes=(lang_code,), max_size=pool_size)
+        if warmup:
+            self.pool.warmup()
+        self.executor = executor or StageExecutor.from_env("tts", max_workers=pool_size, max_queue=16)
+
+    def __reduce__(self):
+        # Process pool workers rebuild their own service instead of receiving this one
+        return (_load_tts_service, (self.voice, self.lang_code, self.voices, self.pool_size))
+
+    async def asynthesize(self, text: str, voice: Optional[str] = None, lang_code: Optional[str] = None,
+                          codec: str = "wav") -> bytes:
+        """Run synthesize() on the TTS worker pool, encoding included."""
+        return await self.executor.run(self.synthesize, text, voice=voice, lang_code=lang_code, codec=codec)
+
+    async def astream_synthesize(self, text: str, voice: Optional[str] = None,
+                                 lang_code: Optional[str] = None, codec: str = "wav") -> AsyncIterator[bytes]:
+        """
+        Synthesize text one sentence at a time on the TTS worker pool.
+
+        Yields one self-contained audio file (see AUDIO_CODECS) per sentence as soon as it is ready.
+        """
+        sentences = split_sentences(text or "")
+        if not sentences:
+            raise ValueError("Text cannot be empty")
 
-    def synthesize(self, text: str) -> bytes:
-        """Convert text to speech using Kokoro TTS pipeline."""
+        async def _sentences():
+            for sentence in sentences:
+                yield sentence
+
+        async for audio in self.astream_synthesize_sentences(_sentences(), voice=voice, lang_code=lang_code, codec=codec):
+            yield audio
+
+    async def astream_synthesize_sentences(self, sentences: AsyncIterator[str], voice: Optional[str] = None,
+                                           lang_code: Optional[str] = None, codec: str = "wav",
+                                           lookahead: int = 2) -> AsyncIterator[bytes]:
+        """
+        Synthesize sentences while they are still being produced (e.g. streamed by the LLM).
+
+        Sentences are consumed in the background and up to `lookahead` of them are synthesized
+        ahead of the consumer, so the producer, the synthesis and the consumer overlap.
+        Audio is yielded in sentence order, one self-contained audio file per sentence.
+        """
+        jobs: asyncio.Queue = asyncio.Queue()
+        # A synthesis starts only once it has a slot, so a cancelled scheduler leaves none behind
+        slots = asyncio.Semaphore(lookahead)
+
+        async def schedule():
+            try:
+                async for sentence in sentences:
+                    await slots.acquire()
+                    jobs.put_nowait(asyncio.ensure_future(self.asynthesize(sentence, voice=voice, lang_code=lang_code, codec=codec)))
+            finally:
+                # Stop the producer right away (e.g. the LLM stream) instead of on garbage collection
+                if hasattr(sentences, "aclose"):
+                    await sentences.aclose()
+                if not asyncio.current_task().cancelling():
+                    jobs.put_nowait(None)
+
+        scheduler = asyncio.ensure_future(schedule())
+        try:
+            while (job := await jobs.get()) is not None:
+                slots.release()
+                yield await job
+            # Surface errors raised by the sentence producer
+            await scheduler
+        finally:
+            # Consumer stopped early or failed: drop the work scheduled ahead of it
+            scheduler.cancel()
+            await asyncio.gather(scheduler, return_exceptions=True)
+            dropped = []
+            while not jobs.empty():
+                job = jobs.get_nowait()
+                if job is not None:
+                    job.cancel()
+                    dropped.append(job)
+            # Collected so that their errors are not reported as never retrieved
+            await asyncio.gather(*dropped, return_exceptions=True)
+
+    def synthesize(self, text: str, voice: Optional[str] = None, lang_code: Optional[str] = None,
+                   codec: str = "wav") -> bytes:
+        """
+        Convert text to speech using a pooled Kokoro TTS pipeline, encoded with `codec`.
+
+        The encoded result is cached for the whole text, and the audio of every sentence is
+        cached on its own, so a text that shares sentences with earlier replies only
+        renders the new ones.
+        """
         if not text or text.strip() == "":
             raise ValueError("Text cannot be empty")
+        voice = voice or self.voice
+        lang_code = lang_code or self.lang_code
         try:
+            key = self.cache.key(text, voice, lang_code, codec)
+            cached = self.cache.get(key)
+            if cached is not None:
+                print(f"[TTS] Cache hit ({codec}): {text[:50]}...")
+                return cached
+
             print(f"[TTS] Synthesizing (kokoro): {text[:50]}...")
 
-            # Create Kokoro pipeline, use lang_code as needed (e.g., 'a' for english)
-            pipeline = KPipeline(lang_code='b')
-            generator = pipeline(text, voice=self.voice)
-            audio_chunks = []
-            for i, (gs, ps, audio) in enumerate(generator):
-                print(f"[TTS][Chunk {i}] Grapheme state: {gs[:20]}... | Phoneme state: {ps[:20]}..." if gs and ps else "[TTS][Chunk {i}] Emitting audio chunk")
-                audio_chunks.append(audio)
-            
-            # Concatenate all audio chunks into a single array
-            if not audio_chunks:
+            # Concatenate the audio of all sentences
+            audio_chunks = [self._render_sentence(sentence, voice, lang_code) for sentence in split_sentences(text)]
+            if not any(len(chunk) for chunk in audio_chunks):
                 raise RuntimeError("No audio generated from kokoro pipeline")
-            
-            # All chunks are numpy arrays; concatenate and write as wav to bytes
             audio_full = np.concatenate(audio_chunks)
-            from io import BytesIO
-            buf = BytesIO()
-            sf.write(buf, audio_full, 24000, format='WAV')
-            audio_bytes = buf.getvalue()
-            print(f"[TTS] Generated {len(audio_bytes)} bytes (kokoro WAV)")
+
+            audio_bytes = encode_audio(audio_full, codec)
+            self.cache.put(key, audio_bytes)
+            print(f"[TTS] Generated {len(audio_bytes)} bytes (kokoro {codec})")
             return audio_bytes
 
         except Exception as e:
             print(f"[TTS] Error: {e}")
             raise
-            print(f"[TTS] Generated {len(audio_bytes)} bytes")
-            return audio_bytes
\ No newline at end of file
+
+    def _render_sentence(self, sentence: str, voice: str, lang_code: str) -> np.ndarray:
+        """Render one sentence to 24 kHz float32 samples, through the cache (stored as 16-bit PCM)."""
+        key = self.cache.key(sentence, voice, lang_code, "pcm")
+        cached = self.cache.get(key)
+        if cached is not None:
+            return np.frombuffer(cached, dtype="<i2").astype(np.float32) / 32767
+
+        audio_chunks = []
+        with self.pool.acquire(lang_code) as pipeline:
+            start = time.perf_counter()
+            generator = pipeline(sentence, voice=voice)
+            for i, (gs, ps, audio) in enumerate(generator):
+                print(f"[TTS][Chunk {i}] Grapheme state: {gs[:20]}... | Phoneme state: {ps[:20]}..." if gs and ps else f"[TTS][Chunk {i}] Emitting audio chunk")
+                audio_chunks.append(np.asarray(audio, dtype=np.float32))
+            render_seconds = time.perf_counter() - start
+        audio = np.concatenate(audio_chunks) if audio_chunks else np.zeros(0, dtype=np.float32)
+        if len(audio):
+            TTS_SECONDS_PER_AUDIO_SECOND.observe(render_seconds / (len(audio) / SAMPLE_RATE))
+
+        self.cache.put(key, (np.clip(audio, -1, 1) * 32767).astype("<i2").tobytes())
+        return audio
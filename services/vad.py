@@ -0,0 +1,100 @@
+"""
+Energy-based voice activity detection - trims silence from decoded audio before Whisper.
+"""
+
+import os
+from typing import NamedTuple, Tuple
+
+import numpy as np
+
+
+class TrimStats(NamedTuple):
+    """Audio durations before and after trimming, in seconds."""
+    input_seconds: float
+    output_seconds: float
+
+    @property
+    def removed_seconds(self) -> float:
+        return self.input_seconds - self.output_seconds
+
+
+class SilenceTrimmer:
+    def __init__(self, sample_rate: int = 16000, frame_ms: float = 30, threshold_db: float = -50,
+                 dynamic_range_db: float = 35, pad_ms: float = 200, max_pause_ms: float = 300):
+        """
+        Removes leading and trailing silence and shortens long pauses.
+
+        Audio is cut into short frames and each frame's RMS level is computed at once with NumPy.
+        A frame is speech when it is louder than `threshold_db` and within `dynamic_range_db`
+        of the loudest frame, so quiet recordings and noisy ones are both handled.
+
+        Args:
+            sample_rate: Sample rate of the audio
+            frame_ms: Frame length used to measure the level
+            threshold_db: Absolute level (dBFS) below which a frame is always silence
+            dynamic_range_db: Frames this far below the loudest one are silence
+            pad_ms: Audio kept around each speech frame, so word onsets and tails are not clipped
+            max_pause_ms: Longer pauses between speech are shortened to this length
+        """
+        self.sample_rate = sample_rate
+        self.frame_size = max(1, int(sample_rate * frame_ms / 1000))
+        self.threshold_db = threshold_db
+        self.dynamic_range_db = dynamic_range_db
+        self.pad_frames = int(pad_ms / frame_ms)
+        self.max_pause_frames = int(max_pause_ms / frame_ms)
+
+    @classmethod
+    def from_env(cls, sample_rate: int = 16000) -> "SilenceTrimmer":
+        """Build a trimmer configured by VOICE_VAD_THRESHOLD_DB, VOICE_VAD_DYNAMIC_RANGE_DB,
+        VOICE_VAD_PAD_MS and VOICE_VAD_MAX_PAUSE_MS."""
+        return cls(
+            sample_rate=sample_rate,
+            threshold_db=float(os.getenv("VOICE_VAD_THRESHOLD_DB", "-50")),
+            dynamic_range_db=float(os.getenv("VOICE_VAD_DYNAMIC_RANGE_DB", "35")),
+            pad_ms=float(os.getenv("VOICE_VAD_PAD_MS", "200")),
+            max_pause_ms=float(os.getenv("VOICE_VAD_MAX_PAUSE_MS", "300")),
+        )
+
+    def speech_frames(self, audio: np.ndarray) -> np.ndarray:
+        """Boolean mask of the frames holding speech (including their padding)."""
+        n_frames = len(audio) // self.frame_size
+        frames = audio[:n_frames * self.frame_size].reshape(n_frames, self.frame_size)
+        rms = np.sqrt(np.mean(np.square(frames, dtype=np.float64), axis=1))
+        level_db = 20 * np.log10(np.maximum(rms, 1e-10))
+
+        threshold = max(self.threshold_db, level_db.max(initial=-200.0) - self.dynamic_range_db)
+        speech = level_db > threshold
+        if self.pad_frames and speech.any():
+            window = np.ones(2 * self.pad_frames + 1)
+            speech = np.convolve(speech, window, mode="same") > 0
+        return speech
+
+    def trim(self, audio: np.ndarray) -> Tuple[np.ndarray, TrimStats]:
+        """
+        Trim silence from mono audio.
+
+        Returns:
+            The trimmed audio (empty if it held no speech) and its TrimStats
+        """
+        if len(audio) < self.frame_size:
+            seconds = len(audio) / self.sample_rate
+            return audio, TrimStats(seconds, seconds)
+
+        speech = self.speech_frames(audio)
+        keep = speech.copy()
+        if speech.any():
+            # Position of each frame inside its run of speech or silence
+            starts = np.flatnonzero(np.diff(speech.astype(np.int8), prepend=np.int8(-1)))
+            run_lengths = np.diff(np.append(starts, len(speech)))
+            position = np.arange(len(speech)) - np.repeat(starts, run_lengths)
+
+            # Keep the beginning of pauses between words, drop leading and trailing silence
+            first, last = np.flatnonzero(speech)[[0, -1]]
+            inside = (np.arange(len(speech)) > first) & (np.arange(len(speech)) < last)
+            keep |= inside & (position < self.max_pause_frames)
+
+        # Samples after the last full frame follow the last frame's decision
+        sample_mask = np.repeat(keep, self.frame_size)
+        sample_mask = np.append(sample_mask, np.full(len(audio) - len(sample_mask), keep[-1]))
+        trimmed = audio[sample_mask]
+        return trimmed, TrimStats(len(audio) / self.sample_rate, len(trimmed) / self.sample_rate)
@@ -1,6 +1,10 @@
 import ast
+import asyncio
 
-from llm_agents.chatbot_graph import ChatBotGraph
+from langchain_core.messages import HumanMessage
+from langgraph.checkpoint.memory import InMemorySaver
+
+from llm_agents.chatbot_graph import EVALUATION_PENDING_MESSAGE, ChatBotGraph, EvaluationPendingError, ReplyStream
 
 import pytest
 
@@ -32,8 +36,219 @@ async def test_interview_question(mocker):
 
     assert message == interview_question
 
+@pytest.mark.asyncio
+async def test_nodes_await_the_model(mocker):
+    llm = mock_llm(mocker, interview_question="Why this role?")
+
+    await run_test(llm)
+
+    for name in ("infoGathering", "InterviewProcess"):
+        assert llm.models[name].ainvoke.await_count == 1
+        assert not llm.models[name].invoke.called
+
+def test_sync_graph_invoke_calls_the_model_synchronously(mocker):
+    llm = mock_llm(mocker, interview_question="Why this role?")
+    sut = ChatBotGraph(llm)
+
+    result = sut.graph.invoke(
+        {"messages": [HumanMessage(content="Hello")], "end_interview": False},
+        {"configurable": {"thread_id": "test-thread-1"}},
+    )
+
+    assert result["messages"][-1].content == "Why this role?"
+    assert not llm.models["InterviewProcess"].ainvoke.called
+
+@pytest.mark.asyncio
+async def test_astream_reports_nodes_and_ends_with_the_response(mocker):
+    interview_question = "What is the meaning of life?"
+    llm = mock_llm(mocker, interview_question=interview_question)
+    sut = ChatBotGraph(llm)
+
+    events = [event async for event in sut.astream("Hello, how are you?", False, "test-thread-1")]
+
+    assert [data["node"] for event, data in events if event == "node"] == ["triage_agent", "interview_agent"]
+    event, data = events[-1]
+    assert event == "response"
+    assert data == {"message": interview_question, "thread_id": "test-thread-1", "evaluator_scorecard": None,
+                    "evaluation_job_id": None}
+
+def test_reply_stream_extracts_the_reply_from_partial_json():
+    sut = ReplyStream()
+    chunks = ['{"question": "What', ' is your', ' name?", "end_interview": ', 'false}']
+
+    deltas = [sut.push("interview_agent", "run-1", chunk) for chunk in chunks]
+
+    assert deltas == ["What", " is your", " name?", ""]
+
+def test_reply_stream_follows_the_triage_decision():
+    sut = ReplyStream()
+
+    assert sut.push("triage_agent", "run-1", '{"interview_type": "Technical", "question": "Which role?') == ""
+    assert sut.push("triage_agent", "run-1", '", "need_clarification": false, "verification": "Let us') == "Let us"
+    assert sut.push("triage_agent", "run-1", ' start."}') == " start."
+
+@pytest.mark.asyncio
+async def test_deferred_evaluation_runs_in_the_background(mocker):
+    evaluation_response = {"score": 7}
+    llm = mock_llm(mocker, evaluation_response=evaluation_response)
+    sut = ChatBotGraph(llm, defer_evaluation=True)
+    evaluator = llm.models["EvaluatorScoreCard"]
+    release = asyncio.Event()
+    resp = evaluator.ainvoke.return_value
+
+    async def slow_evaluation(*args, **kwargs):
+        await release.wait()
+        return resp
+    evaluator.ainvoke.side_effect = slow_evaluation
+
+    response = await sut.invoke("Hello, how are you?", False, "test-thread-1")
+
+    assert response.message == EVALUATION_PENDING_MESSAGE
+    assert response.evaluator_scorecard is None
+    assert response.evaluation_job_id is not None
+    status = await sut.evaluation("test-thread-1")
+    assert status.status in ("pending", "running")
+    assert status.job_id == response.evaluation_job_id
+
+    release.set()
+    await sut.evaluations.wait("test-thread-1")
+
+    status = await sut.evaluation("test-thread-1")
+    assert status.status == "completed"
+    assert status.evaluator_scorecard == evaluation_response
+
+@pytest.mark.asyncio
+async def test_turns_are_refused_until_the_evaluation_is_saved(mocker):
+    llm = mock_llm(mocker, evaluation_response={"score": 7})
+    sut = ChatBotGraph(llm, defer_evaluation=True)
+    release = slow_evaluator(llm)
+    llm.models["infoGathering"].ainvoke.return_value.model_dump.return_value = {"need_clarification": False}
+
+    await sut.invoke("end please", True, "test-thread-1")
+    with pytest.raises(EvaluationPendingError):
+        await sut.invoke("hello again", False, "test-thread-1")
+    with pytest.raises(EvaluationPendingError):
+        [event async for event in sut.astream("hello again", False, "test-thread-1")]
+
+    release.set()
+    await sut.evaluations.wait("test-thread-1")
+    llm.models["InterviewProcess"].ainvoke.return_value.question = "Next question?"
+    llm.models["InterviewProcess"].ainvoke.return_value.end_interview = False
+    response = await sut.invoke("hello again", False, "test-thread-1")
+
+    assert response.message == "Next question?"
+    state = await sut.graph.aget_state({"configurable": {"thread_id": "test-thread-1"}})
+    assert [message.content for message in state.values["messages"]] == [
+        "end please", "Verified", "{'score': 7}", "hello again", "Next question?"]
+
+@pytest.mark.asyncio
+async def test_other_servers_report_the_evaluation_without_running_it(mocker):
+    checkpointer = InMemorySaver()
+    llm = mock_llm(mocker, evaluation_response={"score": 7})
+    first = ChatBotGraph(llm, checkpointer=checkpointer, defer_evaluation=True)
+    release = slow_evaluator(llm)
+    other_llm = mock_llm(mocker)
+    other = ChatBotGraph(other_llm, checkpointer=checkpointer, defer_evaluation=True)
+
+    response = await first.invoke("end please", True, "test-thread-1")
+    status = await other.evaluation("test-thread-1")
+
+    assert status.status == "pending"
+    assert status.job_id == response.evaluation_job_id
+    with pytest.raises(EvaluationPendingError):
+        await other.invoke("hello again", False, "test-thread-1")
+
+    release.set()
+    await first.evaluations.wait("test-thread-1")
+    status = await other.evaluation("test-thread-1")
+
+    assert status.status == "completed"
+    assert status.evaluator_scorecard == {"score": 7}
+    assert not other_llm.models["EvaluatorScoreCard"].ainvoke.called
+
+@pytest.mark.asyncio
+async def test_abandoned_evaluation_is_started_again(mocker):
+    checkpointer = InMemorySaver()
+    lost = ChatBotGraph(mock_llm(mocker), checkpointer=checkpointer, defer_evaluation=True)
+    mocker.patch.object(lost.evaluations, "submit").return_value.job_id = "lost-job"
+    await lost.invoke("end please", True, "test-thread-1")
+    llm = mock_llm(mocker, evaluation_response={"score": 3})
+    sut = ChatBotGraph(llm, checkpointer=checkpointer, defer_evaluation=True)
+    sut.evaluations.abandoned_after = 0
+
+    status = await sut.evaluation("test-thread-1")
+    await sut.evaluations.wait("test-thread-1")
+
+    assert status.status in ("pending", "running")
+    assert (await sut.evaluation("test-thread-1")).evaluator_scorecard == {"score": 3}
+    assert llm.models["EvaluatorScoreCard"].ainvoke.await_count == 1
+
+@pytest.mark.asyncio
+async def test_failed_evaluation_is_retried_and_unlocks_the_thread(mocker):
+    llm = mock_llm(mocker, evaluation_response={"score": 5}, interview_question="Next question?")
+    sut = ChatBotGraph(llm, defer_evaluation=True)
+    sut.evaluations.retry_after = 0
+    evaluator = llm.models["EvaluatorScoreCard"]
+    evaluator.ainvoke.side_effect = [RuntimeError("model unavailable"), evaluator.ainvoke.return_value]
+    llm.models["infoGathering"].ainvoke.return_value.model_dump.return_value = {"need_clarification": False}
+
+    response = await sut.invoke("end please", True, "test-thread-1")
+    await sut.evaluations.wait("test-thread-1")
+    assert sut.evaluations.get("test-thread-1").status == "failed"
+
+    status = await sut.evaluation("test-thread-1")
+    await sut.evaluations.wait("test-thread-1")
+
+    assert status.status in ("pending", "running")
+    assert status.job_id == response.evaluation_job_id
+    assert sut.evaluations.get("test-thread-1").attempt == 2
+    status = await sut.evaluation("test-thread-1")
+    assert status.status == "completed"
+    assert status.evaluator_scorecard == {"score": 5}
+    assert (await sut.invoke("hello again", False, "test-thread-1")).message == "Next question?"
+
+@pytest.mark.asyncio
+async def test_failed_evaluation_waits_for_its_retry_delay(mocker):
+    llm = mock_llm(mocker)
+    sut = ChatBotGraph(llm, defer_evaluation=True)
+    sut.evaluations.retry_after = 60
+    llm.models["EvaluatorScoreCard"].ainvoke.side_effect = RuntimeError("model unavailable")
+
+    await sut.invoke("end please", True, "test-thread-1")
+    await sut.evaluations.wait("test-thread-1")
+    statuses = [await sut.evaluation("test-thread-1") for _ in range(3)]
+
+    assert [status.status for status in statuses] == ["failed"] * 3
+    assert statuses[0].error == "model unavailable"
+    assert llm.models["EvaluatorScoreCard"].ainvoke.await_count == 1
+    assert sut.evaluations.retry_delay(1) == 60
+    assert sut.evaluations.retry_delay(4) == 480
+    assert sut.evaluations.retry_delay(10) == sut.evaluations.abandoned_after
+
+@pytest.mark.asyncio
+async def test_evaluation_of_an_unknown_thread_is_not_found(mocker):
+    sut = ChatBotGraph(mock_llm(mocker), defer_evaluation=True)
+
+    status = await sut.evaluation("test-thread-2")
+
+    assert status.status == "not_found"
+    assert status.evaluator_scorecard is None
+
+def slow_evaluator(llm) -> asyncio.Event:
+    """Make the evaluator wait for the returned event."""
+    evaluator = llm.models["EvaluatorScoreCard"]
+    release = asyncio.Event()
+    resp = evaluator.ainvoke.return_value
+
+    async def slow_evaluation(*args, **kwargs):
+        await release.wait()
+        return resp
+    evaluator.ainvoke.side_effect = slow_evaluation
+    return release
+
 def mock_llm(mocker, **kwargs):
     llm = mocker.Mock()
+    llm.models = {}
 
     def _with_structured_output(schema):
         model = mocker.Mock()
@@ -59,6 +274,8 @@ def mock_llm(mocker, **kwargs):
             raise ValueError(f"Unexpected schema: {name}")
 
         model.invoke.return_value = resp
+        model.ainvoke = mocker.AsyncMock(return_value=resp)
+        llm.models[name] = model
         return model
 
     llm.with_structured_output.side_effect = _with_structured_output
@@ -0,0 +1,73 @@
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage, ToolMessage
+
+from llm_agents.context_budget import MESSAGE_OVERHEAD_TOKENS, ContextBudget, approximate_tokens
+
+def count_words(text):
+    return len(text.split())
+
+def turn(i):
+    return [HumanMessage(content=f"answer number {i}"), AIMessage(content=f"question number {i}")]
+
+def test_recent_turns_are_kept_within_the_budget():
+    per_message = 3 + MESSAGE_OVERHEAD_TOKENS
+    system = SystemMessage(content="you are an interviewer")
+    sut = ContextBudget(max_tokens=4 + MESSAGE_OVERHEAD_TOKENS + per_message * 4, count_tokens=count_words)
+    history = [message for i in range(5) for message in turn(i)]
+
+    context = sut.fit(history, pinned=[system])
+
+    assert context.messages[0] is system
+    assert context.messages[1:] == history[-4:]
+    assert context.tokens <= sut.max_tokens
+    assert context.dropped_messages == 6
+    assert context.dropped_tokens == 6 * per_message
+
+def test_nothing_is_dropped_when_everything_fits():
+    sut = ContextBudget(max_tokens=10_000, count_tokens=count_words)
+    history = turn(0) + turn(1)
+
+    context = sut.fit(history)
+
+    assert context.messages == history
+    assert context.dropped_tokens == 0
+
+def test_last_message_is_kept_even_over_budget():
+    sut = ContextBudget(max_tokens=1, count_tokens=count_words)
+    history = turn(0) + [HumanMessage(content="a very long final answer")]
+
+    context = sut.fit(history, pinned=[SystemMessage(content="system prompt")])
+
+    assert context.messages[1:] == history[-1:]
+    assert context.dropped_messages == 2
+
+def test_tool_results_are_not_separated_from_their_call():
+    call = AIMessage(content="", tool_calls=[{"name": "retrieve_CV", "args": {"query": "jobs"}, "id": "1"}])
+    result = ToolMessage(content="Worked at ACME " * 20, tool_call_id="1")
+    sut = ContextBudget(max_tokens=60 + 2 * MESSAGE_OVERHEAD_TOKENS, count_tokens=count_words)
+
+    # Only the tool result fits: its call is kept with it
+    assert sut.fit([HumanMessage(content="hi"), call, result]).messages == [call, result]
+
+    # The call does not fit but a later answer does: the orphaned result is dropped too
+    answer = AIMessage(content="You worked at ACME.")
+    assert sut.fit([call, result, answer]).messages == [answer]
+
+def test_approximate_tokens_counts_four_characters_per_token():
+    assert approximate_tokens("") == 0
+    assert approximate_tokens("abcd") == 1
+    assert approximate_tokens("abcde") == 2
+
+def test_trim_steps_keep_the_first_message_sent_stable():
+    per_message = 3 + MESSAGE_OVERHEAD_TOKENS
+    sut = ContextBudget(max_tokens=per_message * 6, trim_step_tokens=per_message * 4, count_tokens=count_words)
+    history = []
+    first_sent = []
+
+    for i in range(8):
+        history += turn(i)
+        context = sut.fit(history)
+        assert context.tokens <= sut.max_tokens
+        first_sent.append(context.messages[0].content)
+
+    # Nothing dropped for 3 turns, then the first 4 messages for 2 turns, then 8
+    assert first_sent == ["answer number 0"] * 3 + ["answer number 2"] * 2 + ["answer number 4"] * 2 + ["answer number 6"]
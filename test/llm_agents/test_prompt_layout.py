@@ -0,0 +1,66 @@
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+from langchain_core.outputs import ChatGeneration, LLMResult
+from langchain_core.runnables import RunnableLambda
+
+from llm_agents.context_budget import ContextBudget
+from llm_agents.interview_agents.interview_agent import InterviewAgent
+from llm_agents.token_usage import PROMPT_CACHED_TOKENS, PROMPT_TOKENS, TokenUsageCallback
+
+def interview_state(messages):
+    return {
+        "messages": messages,
+        "job_description": "Backend engineer",
+        "company_description": "A bank",
+        "interview_type": "Technical",
+        "end_interview": False,
+    }
+
+def test_interview_prompt_is_appended_only_between_turns(mocker):
+    llm = mocker.Mock()
+    model = llm.with_structured_output.return_value
+    model.invoke.return_value = mocker.Mock(end_interview=False, question="Next question?")
+    sut = InterviewAgent(llm, budget=ContextBudget(max_tokens=100_000, count_tokens=lambda text: len(text.split())))
+    history = [HumanMessage(content="Hi, I am ready")]
+
+    sut(interview_state(history))
+    history = history + [AIMessage(content="Tell me about yourself."), HumanMessage(content="I write Python.")]
+    sut(interview_state(history))
+
+    first, second = (call.args[0] for call in model.invoke.call_args_list)
+    assert llm.with_structured_output.call_count == 1
+    assert [type(message) for message in second] == [SystemMessage, SystemMessage, HumanMessage, AIMessage, HumanMessage]
+    assert second[:len(first)] == first
+    assert "Backend engineer" in second[1].content and "Backend engineer" not in second[0].content
+
+def test_usage_callback_records_cached_tokens():
+    sut = TokenUsageCallback("test-cache")
+    message = AIMessage(content="ok", usage_metadata={
+        "input_tokens": 2000, "output_tokens": 10, "total_tokens": 2010,
+        "input_token_details": {"cache_read": 1536},
+    })
+
+    sut.on_llm_end(LLMResult(generations=[[ChatGeneration(message=message)]]))
+
+    assert PROMPT_TOKENS.value(caller="test-cache") == 2000
+    assert PROMPT_CACHED_TOKENS.value(caller="test-cache") == 1536
+
+class RecordingCallback(BaseCallbackHandler):
+    def __init__(self):
+        self.ended = 0
+
+    def on_llm_end(self, response, **kwargs):
+        self.ended += 1
+
+def test_usage_callback_keeps_the_callbacks_of_the_caller():
+    usage_metadata = {"input_tokens": 120, "output_tokens": 1, "total_tokens": 121}
+    model = GenericFakeChatModel(messages=iter([AIMessage(content="ok", usage_metadata=usage_metadata)]))
+    usage = TokenUsageCallback("test-inherited")
+    inherited = RecordingCallback()
+    node = RunnableLambda(lambda messages: model.invoke(messages, config=usage.config()))
+
+    node.invoke([HumanMessage(content="hi")], config={"callbacks": [inherited]})
+
+    assert inherited.ended == 1
+    assert PROMPT_TOKENS.value(caller="test-inherited") == 120
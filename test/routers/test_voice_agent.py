@@ -0,0 +1,133 @@
+import asyncio
+import base64
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from routers import voice_agent
+
+AUDIO_CHUNK = {"type": "audio_chunk", "data": base64.b64encode(b"RIFF" + bytes(200)).decode("ascii")}
+
+class FakeSTT:
+    async def atranscribe(self, audio_bytes):
+        return "Hello there"
+
+class FakeSTTStream:
+    """Stands in for STTStream: the whole recording is transcribed by afinish()."""
+
+    def __init__(self, stt_service, audio):
+        self.audio = audio
+
+    async def afeed(self):
+        return []
+
+    async def afinish(self):
+        if not len(self.audio):
+            raise ValueError("Audio bytes cannot be empty")
+        self.reset()
+        return "Hello there"
+
+    def reset(self):
+        self.audio.clear()
+
+class FakeLLM:
+    def __init__(self, hang=False):
+        self.hang = hang
+        self.cancelled = False
+
+    async def agenerate_response(self, question, thread_id=None):
+        if self.hang:
+            try:
+                await asyncio.Event().wait()
+            except asyncio.CancelledError:
+                self.cancelled = True
+                raise
+        return "Hi!"
+
+    async def astream_sentences(self, question, thread_id=None):
+        yield "First sentence."
+        yield "Second sentence."
+
+    def release_session(self, thread_id):
+        pass
+
+class FakeTTS:
+    def __init__(self, hang_after_first=False):
+        self.hang_after_first = hang_after_first
+        self.closed = False
+
+    async def asynthesize(self, text, codec="wav"):
+        return b"audio"
+
+    async def astream_synthesize_sentences(self, sentences, codec="wav"):
+        try:
+            async for sentence in sentences:
+                yield sentence.encode()
+                if self.hang_after_first:
+                    await asyncio.Event().wait()
+        finally:
+            self.closed = True
+
+@pytest.fixture
+def voice_client(mocker):
+    def connect(llm=None, tts=None, streaming_stt=False):
+        services = {"stt": FakeSTT(), "voice_llm": llm or FakeLLM(), "tts": tts or FakeTTS()}
+        mocker.patch.object(voice_agent.components, "is_ready", return_value=True)
+        mocker.patch.object(voice_agent.components, "get", side_effect=services.get)
+        mocker.patch.object(voice_agent, "STREAMING_STT", streaming_stt)
+        mocker.patch.object(voice_agent, "STTStream", FakeSTTStream)
+        app = FastAPI()
+        app.include_router(voice_agent.router)
+        return TestClient(app).websocket_connect("/ws")
+    return connect
+
+def test_new_speech_interrupts_the_llm(voice_client):
+    llm = FakeLLM(hang=True)
+    with voice_client(llm=llm) as ws:
+        ws.send_json(AUDIO_CHUNK)
+        ws.send_json({"type": "audio_end"})
+        assert ws.receive_json() == {"type": "transcript", "data": "Hello there"}
+
+        ws.send_json(AUDIO_CHUNK)
+
+        assert ws.receive_json()["code"] == "interrupted"
+        assert llm.cancelled
+
+def test_new_speech_interrupts_the_synthesis(voice_client):
+    tts = FakeTTS(hang_after_first=True)
+    with voice_client(tts=tts) as ws:
+        ws.send_json({"type": "config", "stream_audio": True})
+        assert ws.receive_json()["type"] == "config"
+        ws.send_json(AUDIO_CHUNK)
+        ws.send_json({"type": "audio_end"})
+        assert ws.receive_json()["type"] == "transcript"
+        chunk = ws.receive_json()
+        assert chunk["type"] == "audio_response_chunk" and chunk["seq"] == 0
+
+        ws.send_json(AUDIO_CHUNK)
+
+        assert ws.receive_json()["code"] == "interrupted"
+        assert tts.closed
+
+def test_repeated_audio_end_is_ignored(voice_client):
+    with voice_client(streaming_stt=True) as ws:
+        ws.send_json(AUDIO_CHUNK)
+        ws.send_json({"type": "audio_end"})
+        ws.send_json({"type": "audio_end"})
+
+        assert ws.receive_json() == {"type": "transcript", "data": "Hello there"}
+        assert ws.receive_json()["type"] == "audio_response"
+        ws.send_json({"type": "audio_end"})
+        ws.send_json({"type": "reset"})
+        assert ws.receive_json() == {"type": "status", "message": "Conversation reset"}
+
+def test_session_failing_to_start_is_not_counted(voice_client, mocker):
+    mocker.patch.object(voice_agent.SessionAudioBuffer, "from_env", side_effect=ValueError("bad VOICE_AUDIO_MAX_BYTES"))
+    before = voice_agent.WS_SESSIONS_ACTIVE.value()
+
+    with pytest.raises(ValueError):
+        with voice_client() as ws:
+            ws.receive_json()
+
+    assert voice_agent.WS_SESSIONS_ACTIVE.value() == before
@@ -0,0 +1,49 @@
+import io
+
+import numpy as np
+import soundfile as sf
+
+from services.audio_buffer import AudioBufferFullError, SessionAudioBuffer
+from services.stt_service import decode_audio_bytes
+
+import pytest
+
+def wav_bytes(seconds=0.5, sample_rate=16000):
+    buffer = io.BytesIO()
+    samples = 0.1 * np.sin(np.arange(int(seconds * sample_rate)) / 10)
+    sf.write(buffer, samples, sample_rate, format="WAV", subtype="PCM_16")
+    return buffer.getvalue()
+
+def test_chunks_grow_the_buffer_and_read_back_without_join():
+    data = wav_bytes()
+    sut = SessionAudioBuffer(max_bytes=1024 * 1024, initial_capacity=1024)
+
+    for start in range(0, len(data), 700):
+        sut.append(data[start:start + 700])
+
+    assert sut.format == "wav"
+    assert len(sut) == len(data)
+    assert sut.getvalue() == data
+    assert len(decode_audio_bytes(sut.view())) == 8000
+
+def test_views_survive_later_appends_and_clear():
+    sut = SessionAudioBuffer(max_bytes=1024, initial_capacity=4)
+    sut.append(b"RIFF")
+    view = sut.view()
+
+    sut.append(b"more data")
+    sut.clear()
+
+    assert bytes(view) == b"RIFF"
+    assert len(sut) == 0
+    assert sut.format is None
+
+def test_cap_rejects_chunk_and_keeps_recording():
+    sut = SessionAudioBuffer(max_bytes=10, initial_capacity=4)
+    sut.append(b"OggS1234")
+
+    with pytest.raises(AudioBufferFullError):
+        sut.append(b"abc")
+
+    assert sut.getvalue() == b"OggS1234"
+    assert sut.format == "ogg"
@@ -0,0 +1,96 @@
+import asyncio
+
+from fastapi import HTTPException
+
+from services.components import ComponentNotReadyError, ComponentRegistry
+
+import pytest
+
+@pytest.mark.asyncio
+async def test_components_load_in_background_after_their_dependencies():
+    sut = ComponentRegistry()
+    loaded = []
+    sut.register("model", lambda: loaded.append("model") or "model", depends_on=["key"])
+    sut.register("key", lambda: loaded.append("key") or "secret")
+
+    with pytest.raises(ComponentNotReadyError):
+        sut.get("model")
+
+    sut.start()
+    await sut.wait()
+
+    assert loaded == ["key", "model"]
+    assert sut.get("model") == "model"
+    assert sut.is_ready()
+    assert sut.status()["key"]["state"] == "ready"
+
+@pytest.mark.asyncio
+async def test_failed_component_keeps_dependent_routes_unavailable():
+    sut = ComponentRegistry()
+
+    def fail():
+        raise RuntimeError("no credentials")
+
+    sut.register("key", fail)
+    sut.register("graph", lambda: "graph", depends_on=["key"])
+    sut.register("other", lambda: "other")
+
+    sut.start()
+    await sut.wait()
+
+    assert sut.status()["key"] == {"state": "failed", "error": "no credentials"}
+    assert sut.status()["graph"]["state"] == "failed"
+    assert sut.is_ready("other")
+    assert not sut.is_ready()
+    with pytest.raises(HTTPException) as error:
+        sut.require("graph")()
+    assert error.value.status_code == 503
+    await sut.stop()
+
+@pytest.mark.asyncio
+async def test_failed_components_are_loaded_again():
+    sut = ComponentRegistry(retry_after=0)
+    attempts = []
+
+    def flaky():
+        attempts.append(len(attempts))
+        if len(attempts) < 3:
+            raise RuntimeError("Key Vault unavailable")
+        return "secret"
+
+    sut.register("key", flaky)
+    sut.register("graph", lambda: "graph", depends_on=["key"])
+
+    tasks = sut.start()
+    await asyncio.wait_for(asyncio.gather(*tasks), timeout=5)
+
+    assert len(attempts) == 3
+    assert sut.get("graph") == "graph"
+    assert sut.is_ready()
+    assert "error" not in sut.status()["key"]
+
+def test_retries_back_off_up_to_a_limit():
+    sut = ComponentRegistry(retry_after=5, max_retry_after=60)
+
+    assert [sut.retry_delay(attempts) for attempts in (1, 2, 3, 4, 5)] == [5, 10, 20, 40, 60]
+
+@pytest.mark.asyncio
+async def test_optional_components_do_not_hold_back_readiness():
+    sut = ComponentRegistry()
+
+    def fail():
+        raise RuntimeError("no storage")
+
+    sut.register("stt", lambda: "stt")
+    sut.register("vector_store", fail, required=False)
+
+    sut.start()
+    await sut.wait()
+
+    assert sut.is_ready()
+    assert not sut.is_ready("vector_store")
+    assert sut.status()["vector_store"] == {"state": "failed", "required": False, "error": "no storage"}
+    with pytest.raises(HTTPException) as error:
+        sut.require("vector_store")()
+    assert error.value.status_code == 503
+    await sut.stop()
@@ -0,0 +1,66 @@
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from services.embedding_index import load_document_index
+
+class CountingEmbeddings(DeterministicFakeEmbedding):
+    calls: int = 0
+
+    def embed_documents(self, texts):
+        self.calls += 1
+        return super().embed_documents(texts)
+
+def load_text(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return [Document(page_content=f.read(), metadata={"source": str(path)})]
+
+def write_document(path, sentences=60):
+    path.write_text(" ".join(f"Sentence {i} about a past project." for i in range(sentences)), encoding="utf-8")
+
+def test_saved_index_is_reused_while_nothing_changes(tmp_path):
+    document = tmp_path / "cv.txt"
+    write_document(document)
+    embeddings = CountingEmbeddings(size=8)
+    cache_dir = str(tmp_path / "cache")
+
+    first = load_document_index(str(document), embeddings, "fake", chunk_size=200, chunk_overlap=20,
+                                cache_dir=cache_dir, loader=load_text)
+    second = load_document_index(str(document), embeddings, "fake", chunk_size=200, chunk_overlap=20,
+                                 cache_dir=cache_dir, loader=load_text)
+
+    assert embeddings.calls == 1
+    assert len(first) > 1 and len(second) == len(first)
+    assert isinstance(second.vectors, np.memmap)
+    assert second.vectors.dtype == np.float32
+    np.testing.assert_allclose(second.vectors, first.vectors)
+    assert [doc.page_content for doc in second.documents] == [doc.page_content for doc in first.documents]
+    assert second.documents[1].metadata["start_index"] == first.documents[1].metadata["start_index"]
+
+def test_file_chunking_or_model_changes_embed_again(tmp_path):
+    document = tmp_path / "cv.txt"
+    write_document(document)
+    embeddings = CountingEmbeddings(size=8)
+    cache_dir = str(tmp_path / "cache")
+
+    def load(**kwargs):
+        options = {"model": "fake", "chunk_size": 200, "chunk_overlap": 20, **kwargs}
+        return load_document_index(str(document), embeddings, cache_dir=cache_dir, loader=load_text, **options)
+
+    load()
+    load(chunk_size=300)
+    load(model="other")
+    write_document(document, sentences=61)
+    load()
+    load()
+
+    assert embeddings.calls == 4
+
+def test_rows_are_saved_normalized(tmp_path):
+    document = tmp_path / "cv.txt"
+    write_document(document)
+
+    index = load_document_index(str(document), CountingEmbeddings(size=8), "fake", chunk_size=200,
+                                chunk_overlap=20, cache_dir=str(tmp_path / "cache"), loader=load_text)
+
+    np.testing.assert_allclose(np.linalg.norm(index.vectors, axis=1), 1.0, rtol=1e-5)
@@ -0,0 +1,38 @@
+import asyncio
+import threading
+
+from services.executor import StageBusyError, StageExecutor
+
+import pytest
+
+@pytest.mark.asyncio
+async def test_run_returns_result_off_the_event_loop():
+    sut = StageExecutor("test", max_workers=1, max_queue=0)
+
+    thread_name = await sut.run(lambda: threading.current_thread().name)
+
+    assert thread_name.startswith("test-worker")
+    assert sut.in_flight == 0
+    sut.shutdown()
+
+@pytest.mark.asyncio
+async def test_full_queue_rejects_new_jobs():
+    sut = StageExecutor("test", max_workers=1, max_queue=1)
+    release = threading.Event()
+
+    running = asyncio.ensure_future(sut.run(release.wait))
+    waiting = asyncio.ensure_future(sut.run(release.wait))
+    await asyncio.sleep(0.05)
+
+    assert sut.queue_depth == 1
+    with pytest.raises(StageBusyError):
+        await sut.run(release.wait)
+
+    release.set()
+    await asyncio.gather(running, waiting)
+    assert sut.in_flight == 0
+    sut.shutdown()
+
+def test_unknown_kind_is_rejected():
+    with pytest.raises(ValueError):
+        StageExecutor("test", kind="fiber")
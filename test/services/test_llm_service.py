@@ -0,0 +1,109 @@
+import pytest
+from langchain.agents import create_agent
+from langchain.tools import tool
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage
+from langgraph.checkpoint.memory import InMemorySaver
+
+from llm_agents.context_budget import ContextBudget, ContextBudgetMiddleware
+from services.llm_service import LLMService
+from services.session_memory import SessionMemoryManager
+
+class FakeChatModel(GenericFakeChatModel):
+    prompts: list = []
+
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+    def _generate(self, messages, *args, **kwargs):
+        self.prompts.append(messages)
+        return super()._generate(messages, *args, **kwargs)
+
+    def _stream(self, messages, *args, **kwargs):
+        self.prompts.append(messages)
+        return super()._stream(messages, *args, **kwargs)
+
+@tool
+def retrieve_CV(query: str) -> str:
+    """Retrieve information from the CV."""
+    return "Worked at ACME."
+
+TOOL_TURN = [
+    AIMessage(content="Let me check.", tool_calls=[{"name": "retrieve_CV", "args": {"query": "jobs"}, "id": "1"}]),
+    AIMessage(content="You worked at ACME. What did you do there?"),
+]
+
+def build_service(messages, streaming=True, budget=None):
+    # Skip __init__: it loads the CV and needs an OpenAI key
+    model = FakeChatModel(messages=iter(messages), disable_streaming=not streaming, prompts=[])
+    service = object.__new__(LLMService)
+    service.model = model
+    service.memory = InMemorySaver()
+    service.sessions = SessionMemoryManager(service.memory)
+    middleware = [ContextBudgetMiddleware(budget)] if budget else []
+    service.agent = create_agent(model, [retrieve_CV], system_prompt="You are an interviewer.",
+                                 checkpointer=service.memory, middleware=middleware)
+    return service
+
+@pytest.mark.asyncio
+async def test_astream_response_yields_token_deltas():
+    sut = build_service([AIMessage(content="Hello there. How are you?")])
+
+    events = [event async for event in sut.astream_response("hi", thread_id="t1")]
+
+    assert len(events) > 1
+    assert all(event.type == "token" for event in events)
+    assert "".join(event.text for event in events) == "Hello there. How are you?"
+    assert "t1" in sut.memory.storage
+
+@pytest.mark.asyncio
+async def test_astream_response_yields_tool_events():
+    # The fake model only keeps tool calls when it does not stream
+    sut = build_service(TOOL_TURN, streaming=False)
+
+    events = [event async for event in sut.astream_response("hi", thread_id="t1")]
+
+    assert [event.type for event in events] == ["token", "tool_call", "tool_result", "token"]
+    assert events[1].name == "retrieve_CV" and events[1].args == {"query": "jobs"}
+    assert events[2].text == "Worked at ACME."
+
+@pytest.mark.asyncio
+async def test_astream_sentences_skips_tool_output():
+    sut = build_service(TOOL_TURN, streaming=False)
+
+    sentences = [sentence async for sentence in sut.astream_sentences("hi", thread_id="t1")]
+
+    assert sentences == ["Let me check.You worked at ACME.", "What did you do there?"]
+
+@pytest.mark.asyncio
+async def test_closing_astream_sentences_stops_the_agent():
+    sut = build_service([AIMessage(content="First sentence. Second sentence. Third sentence.")])
+
+    stream = sut.astream_sentences("hi", thread_id="t1")
+    first = await stream.__anext__()
+    await stream.aclose()
+
+    assert first == "First sentence."
+    assert len(sut.sessions) == 1
+
+@pytest.mark.asyncio
+async def test_agenerate_response_returns_the_final_answer():
+    sut = build_service(TOOL_TURN, streaming=False)
+
+    assert await sut.agenerate_response("hi", thread_id="t1") == "You worked at ACME. What did you do there?"
+
+@pytest.mark.asyncio
+async def test_context_budget_trims_the_prompt_but_not_the_thread():
+    answers = [AIMessage(content=f"Question {i} about your experience?") for i in range(4)]
+    sut = build_service(answers, streaming=False,
+                        budget=ContextBudget(max_tokens=30, count_tokens=lambda text: len(text.split())))
+
+    for i in range(4):
+        await sut.agenerate_response(f"Answer {i} from the candidate.", thread_id="t1")
+
+    prompt = sut.model.prompts[-1]
+    assert prompt[0].content == "You are an interviewer."
+    assert prompt[-1].content == "Answer 3 from the candidate."
+    assert len(prompt) < 8
+    state = await sut.agent.aget_state({"configurable": {"thread_id": "t1"}})
+    assert len(state.values["messages"]) == 8
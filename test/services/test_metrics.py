@@ -0,0 +1,46 @@
+from services.metrics import MetricsRegistry
+
+import pytest
+
+def test_histogram_renders_cumulative_buckets_per_label_set():
+    sut = MetricsRegistry()
+    latency = sut.histogram("request_seconds", "Request latency", labelnames=("route",), buckets=(0.1, 1.0))
+
+    latency.observe(0.05, route="/a")
+    latency.observe(0.5, route="/a")
+    latency.observe(3, route="/a")
+
+    lines = sut.render().splitlines()
+    assert "# TYPE request_seconds histogram" in lines
+    assert 'request_seconds_bucket{route="/a",le="0.1"} 1' in lines
+    assert 'request_seconds_bucket{route="/a",le="1"} 2' in lines
+    assert 'request_seconds_bucket{route="/a",le="+Inf"} 3' in lines
+    assert 'request_seconds_sum{route="/a"} 3.55' in lines
+    assert 'request_seconds_count{route="/a"} 3' in lines
+
+def test_counters_and_gauges():
+    sut = MetricsRegistry()
+    turns = sut.counter("turns_total", "Turns", labelnames=("outcome",))
+    sessions = sut.gauge("sessions", "Open sessions")
+    queue = sut.gauge("queue_depth", "Queue depth", labelnames=("stage",))
+
+    turns.inc(outcome="completed")
+    turns.inc(2, outcome="completed")
+    sessions.inc()
+    sessions.inc()
+    sessions.dec()
+    queue.set_function(lambda: 4, stage="stt")
+
+    text = sut.render()
+    assert 'turns_total{outcome="completed"} 3' in text
+    assert "sessions 1" in text
+    assert 'queue_depth{stage="stt"} 4' in text
+
+def test_registering_twice_returns_the_same_metric():
+    sut = MetricsRegistry()
+
+    assert sut.counter("jobs_total", "Jobs") is sut.counter("jobs_total", "Jobs")
+    with pytest.raises(ValueError):
+        sut.gauge("jobs_total", "Jobs")
+    with pytest.raises(ValueError):
+        sut.counter("jobs_total", "Jobs").inc(stage="stt")
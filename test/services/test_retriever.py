@@ -0,0 +1,83 @@
+import numpy as np
+import pytest
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+
+from services.retriever import NumpyRetriever, top_k
+
+class KeywordEmbeddings(Embeddings):
+    """One dimension per keyword, so similarities are predictable."""
+    keywords = ["python", "azure", "teaching", "music"]
+
+    def __init__(self):
+        self.calls = 0
+
+    def embed_documents(self, texts):
+        self.calls += 1
+        return [self.embed_query(text) for text in texts]
+
+    def embed_query(self, text):
+        return [float(text.lower().count(keyword)) for keyword in self.keywords]
+
+DOCUMENTS = [
+    Document(page_content="Python developer, Python and Azure"),
+    Document(page_content="Music teacher, teaching music"),
+    Document(page_content="Azure cloud engineer"),
+    Document(page_content="Teaching Python"),
+]
+
+def build_retriever(**kwargs):
+    embeddings = KeywordEmbeddings()
+    vectors = embeddings.embed_documents([doc.page_content for doc in DOCUMENTS])
+    return NumpyRetriever.from_vectors(DOCUMENTS, vectors, embeddings, **kwargs), embeddings
+
+def test_top_k_returns_best_scores_first():
+    scores = np.array([[0.1, 0.9, 0.5, 0.7], [0.4, 0.3, 0.2, 0.1]])
+
+    assert top_k(scores, 2).tolist() == [[1, 3], [0, 1]]
+    assert top_k(scores, 10).tolist() == [[1, 3, 2, 0], [0, 1, 2, 3]]
+
+def test_rows_are_normalized_and_contiguous():
+    sut, _ = build_retriever()
+
+    assert sut.matrix.dtype == np.float32 and sut.matrix.flags.c_contiguous
+    np.testing.assert_allclose(np.linalg.norm(sut.matrix, axis=1), 1.0, rtol=1e-6)
+
+def test_invoke_returns_the_k_most_similar_documents():
+    sut, _ = build_retriever(k=2)
+
+    results = sut.invoke("azure")
+
+    assert [doc.page_content for doc in results] == ["Azure cloud engineer", "Python developer, Python and Azure"]
+
+@pytest.mark.asyncio
+async def test_ainvoke_matches_invoke():
+    sut, _ = build_retriever(k=3)
+
+    assert await sut.ainvoke("teaching music") == sut.invoke("teaching music")
+
+def test_search_embeds_all_queries_in_one_call():
+    sut, embeddings = build_retriever(k=1)
+    embeddings.calls = 0
+
+    results = sut.search(["music", "python", "azure"])
+
+    assert embeddings.calls == 1
+    assert [result[0].page_content for result in results] == [
+        "Music teacher, teaching music",
+        "Python developer, Python and Azure",
+        "Azure cloud engineer",
+    ]
+
+def test_search_by_vectors_reports_cosine_similarity():
+    sut, _ = build_retriever()
+
+    [(doc, score)] = sut.search_by_vectors([0.0, 1.0, 0.0, 0.0], k=1)[0]
+
+    assert doc.page_content == "Azure cloud engineer"
+    assert score == pytest.approx(1.0)
+
+def test_empty_retriever_returns_nothing():
+    sut = NumpyRetriever.from_vectors([], [], KeywordEmbeddings())
+
+    assert sut.invoke("python") == []
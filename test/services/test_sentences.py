@@ -0,0 +1,15 @@
+from services.sentences import SentenceChunker, split_sentences
+
+def test_split_sentences():
+    text = 'Hello there. How are you? "Fine!" she said.\nSee e.g. this one'
+
+    assert split_sentences(text) == ["Hello there.", "How are you?", '"Fine!" she said.', "See e.g. this one"]
+
+def test_chunker_emits_sentences_as_tokens_complete_them():
+    sut = SentenceChunker()
+
+    emitted = [sut.push(token) for token in ["Hel", "lo there", ". How", " are you?", " I am", " fine.\n", "Bye"]]
+
+    assert emitted == [[], [], ["Hello there."], [], ["How are you?"], ["I am fine."], []]
+    assert sut.flush() == ["Bye"]
+    assert sut.flush() == []
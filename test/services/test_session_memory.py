@@ -0,0 +1,81 @@
+import asyncio
+import operator
+from typing import Annotated
+
+import pytest
+
+from langgraph.checkpoint.memory import InMemorySaver
+from langgraph.graph import START, StateGraph
+from typing_extensions import TypedDict
+
+from services.session_memory import SessionMemoryManager
+
+class State(TypedDict):
+    messages: Annotated[list, operator.add]
+
+def build_graph(checkpointer):
+    builder = StateGraph(State)
+    builder.add_node("reply", lambda state: {"messages": ["reply " * 50]})
+    builder.add_edge(START, "reply")
+    return builder.compile(checkpointer=checkpointer)
+
+def run(graph, sessions, thread_id):
+    sessions.touch(thread_id)
+    graph.invoke({"messages": ["hello"]}, {"configurable": {"thread_id": thread_id}})
+    sessions.done(thread_id)
+
+def test_least_recently_used_threads_are_dropped_beyond_the_cap():
+    memory = InMemorySaver()
+    sut = SessionMemoryManager(memory, max_sessions=2)
+    graph = build_graph(memory)
+
+    run(graph, sut, "a")
+    run(graph, sut, "b")
+    run(graph, sut, "a")
+    run(graph, sut, "c")
+
+    assert len(sut) == 2
+    assert set(memory.storage) == {"a", "c"}
+
+def test_expired_and_released_threads_free_their_checkpoints():
+    memory = InMemorySaver()
+    sut = SessionMemoryManager(memory, ttl_s=3600)
+    graph = build_graph(memory)
+
+    run(graph, sut, "a")
+    assert sut.estimate_bytes() > 0
+    sut.ttl_s = 0
+    assert sut.sweep() == 1
+
+    sut.ttl_s = 3600
+    run(graph, sut, "b")
+    sut.release("b")
+
+    assert len(sut) == 0
+    assert not memory.storage
+    assert sut.estimate_bytes() == 0
+
+def test_checkpoints_written_after_release_are_deleted():
+    memory = InMemorySaver()
+    sut = SessionMemoryManager(memory)
+    graph = build_graph(memory)
+
+    sut.touch("a")
+    sut.release("a")  # e.g. the client disconnected during the call
+    graph.invoke({"messages": ["hello"]}, {"configurable": {"thread_id": "a"}})
+    sut.done("a")
+
+    assert not memory.storage
+
+@pytest.mark.asyncio
+async def test_idle_threads_are_swept_without_new_traffic():
+    memory = InMemorySaver()
+    sut = SessionMemoryManager(memory, ttl_s=0.05)
+    run(build_graph(memory), sut, "a")
+
+    sweeper = asyncio.create_task(sut.sweep_periodically(interval_s=0.02))
+    await asyncio.sleep(0.2)
+    sweeper.cancel()
+
+    assert len(sut) == 0
+    assert not memory.storage
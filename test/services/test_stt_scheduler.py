@@ -0,0 +1,76 @@
+import asyncio
+
+import numpy as np
+
+from services.stt_scheduler import STTBatchScheduler
+
+import pytest
+
+class FakeExecutor:
+    async def run(self, func, *args):
+        return func(*args)
+
+class FakeSTTService:
+    """transcribe_batch() answers "text <n>" for a recording filled with n, and records the batches."""
+
+    def __init__(self):
+        self.executor = FakeExecutor()
+        self.batches = []
+
+    def transcribe_batch(self, audios, initial_prompts):
+        self.batches.append(([int(audio[0]) for audio in audios], initial_prompts))
+        return [f"text {int(audio[0])}" for audio in audios]
+
+def recording(n):
+    return np.full(160, n, dtype=np.float32)
+
+@pytest.mark.asyncio
+async def test_full_batch_is_sent_without_waiting_for_the_window():
+    stt = FakeSTTService()
+    sut = STTBatchScheduler(stt, window_ms=60_000, max_batch_size=3)
+
+    texts = await asyncio.wait_for(
+        asyncio.gather(*(sut.transcribe(recording(n), initial_prompt=f"prompt {n}") for n in range(3))), timeout=1)
+
+    assert texts == ["text 0", "text 1", "text 2"]
+    assert stt.batches == [([0, 1, 2], ["prompt 0", "prompt 1", "prompt 2"])]
+
+@pytest.mark.asyncio
+async def test_partial_batch_is_sent_when_the_window_closes():
+    stt = FakeSTTService()
+    sut = STTBatchScheduler(stt, window_ms=20, max_batch_size=8)
+
+    first = asyncio.create_task(sut.transcribe(recording(1)))
+    await asyncio.sleep(0.005)
+    second = asyncio.create_task(sut.transcribe(recording(2)))
+
+    assert await asyncio.wait_for(asyncio.gather(first, second), timeout=1) == ["text 1", "text 2"]
+    assert stt.batches == [([1, 2], [None, None])]
+
+@pytest.mark.asyncio
+async def test_cancelled_callers_are_left_out_of_the_batch():
+    stt = FakeSTTService()
+    sut = STTBatchScheduler(stt, window_ms=20, max_batch_size=8)
+
+    tasks = [asyncio.create_task(sut.transcribe(recording(n))) for n in range(3)]
+    await asyncio.sleep(0)
+    tasks[1].cancel()
+
+    results = await asyncio.wait_for(asyncio.gather(*tasks, return_exceptions=True), timeout=1)
+
+    assert results[0] == "text 0" and results[2] == "text 2"
+    assert isinstance(results[1], asyncio.CancelledError)
+    assert stt.batches == [([0, 2], [None, None])]
+
+@pytest.mark.asyncio
+async def test_batch_failure_reaches_every_caller():
+    stt = FakeSTTService()
+
+    def crash(audios, initial_prompts):
+        raise RuntimeError("model crashed")
+    stt.transcribe_batch = crash
+    sut = STTBatchScheduler(stt, window_ms=10, max_batch_size=8)
+
+    results = await asyncio.gather(sut.transcribe(recording(0)), sut.transcribe(recording(1)), return_exceptions=True)
+
+    assert [str(result) for result in results] == ["model crashed", "model crashed"]
@@ -0,0 +1,77 @@
+import numpy as np
+
+from services import stt_service
+from services.stt_service import MAX_CLIP_SAMPLES, SAMPLE_RATE, STTService
+
+class FakeBatchedPipeline:
+    """
+    Stands in for BatchedInferencePipeline: two segments per clip, reading "clip <n>a" and
+    "clip <n>b", with absolute times like the real pipeline (clip offset included).
+    """
+
+    def __init__(self):
+        self.calls = []
+
+    def transcribe(self, audio, clip_timestamps, batch_size, **kwargs):
+        self.calls.append((audio, clip_timestamps))
+        segments = []
+        for i, clip in enumerate(clip_timestamps):
+            middle = (clip["start"] + clip["end"]) / 2
+            segments.append(FakeSegment(clip["start"], middle, f" clip {i}a"))
+            segments.append(FakeSegment(middle, clip["end"], f" clip {i}b"))
+        return iter(segments), None
+
+class FakeSegment:
+    def __init__(self, start, end, text):
+        self.start = start
+        self.end = end
+        self.text = text
+
+def build_service():
+    # Skip __init__: it loads the Whisper model
+    service = object.__new__(STTService)
+    service.batched_model = FakeBatchedPipeline()
+    service.trimmer = None
+    return service
+
+def test_transcribe_batch_records_a_real_time_factor_of_the_call(mocker):
+    observe = mocker.patch.object(stt_service.STT_REAL_TIME_FACTOR, "observe")
+    sut = build_service()
+
+    sut.transcribe_batch([np.zeros(SAMPLE_RATE, dtype=np.float32), np.zeros(2 * SAMPLE_RATE, dtype=np.float32)])
+
+    observe.assert_called_once()
+    rtf = observe.call_args.args[0]
+    assert 0 <= rtf < 1
+    assert observe.call_args.kwargs == {"mode": "batch"}
+
+def silence(seconds):
+    return np.zeros(int(seconds * SAMPLE_RATE), dtype=np.float32)
+
+def test_transcribe_batch_gives_each_recording_its_own_text():
+    sut = build_service()
+
+    texts = sut.transcribe_batch([silence(1), silence(2), silence(0.5)])
+
+    assert texts == ["clip 0a clip 0b", "clip 1a clip 1b", "clip 2a clip 2b"]
+    audio, clips = sut.batched_model.calls[0]
+    assert len(audio) == 3.5 * SAMPLE_RATE
+    assert clips == [{"start": 0.0, "end": 1.0}, {"start": 1.0, "end": 3.0}, {"start": 3.0, "end": 3.5}]
+
+def test_transcribe_batch_splits_long_recordings_into_30s_clips():
+    sut = build_service()
+    long_seconds = MAX_CLIP_SAMPLES / SAMPLE_RATE + 5
+
+    texts = sut.transcribe_batch([silence(1), silence(long_seconds), silence(2)])
+
+    assert texts == ["clip 0a clip 0b", "clip 1a clip 1b clip 2a clip 2b", "clip 3a clip 3b"]
+    _, clips = sut.batched_model.calls[0]
+    assert clips == [{"start": 0.0, "end": 1.0}, {"start": 1.0, "end": 31.0},
+                     {"start": 31.0, "end": 36.0}, {"start": 36.0, "end": 38.0}]
+
+def test_transcribe_batch_returns_nothing_for_empty_recordings():
+    sut = build_service()
+
+    texts = sut.transcribe_batch([silence(0), silence(1)])
+
+    assert texts == ["", "clip 0a clip 0b"]
@@ -0,0 +1,118 @@
+import asyncio
+import io
+
+import numpy as np
+import soundfile as sf
+
+from services import stt_stream
+from services.audio_buffer import SessionAudioBuffer
+from services.stt_service import SAMPLE_RATE
+from services.stt_stream import STTStream
+
+import pytest
+
+class FakeExecutor:
+    async def run(self, func, *args, **kwargs):
+        return func(*args, **kwargs)
+
+class FakeSTTService:
+    """Transcribes audio as "speech <seconds of non-silent audio>s" and records the prompts it was given."""
+
+    def __init__(self):
+        self.executor = FakeExecutor()
+        self.prompts = []
+
+    def worker_bytes(self, audio_bytes):
+        return audio_bytes
+
+    def transcribe_array(self, audio, initial_prompt=None):
+        self.prompts.append(initial_prompt)
+        return f"speech {np.count_nonzero(audio) / SAMPLE_RATE:.1f}s"
+
+    async def atranscribe_array(self, audio, initial_prompt=None):
+        return self.transcribe_array(audio, initial_prompt)
+
+def energy_vad(audio, vad_options, sampling_rate):
+    """Stands in for Silero: speech is wherever the signal is not zero."""
+    voiced = np.concatenate([[False], np.abs(audio) > 0.01, [False]])
+    edges = np.flatnonzero(voiced[1:] != voiced[:-1])
+    return [{"start": int(start), "end": int(end)} for start, end in zip(edges[::2], edges[1::2])]
+
+def recording(*parts):
+    """WAV of (seconds, is_speech) parts."""
+    audio = np.concatenate([np.full(int(seconds * SAMPLE_RATE), 0.3 if speech else 0.0, dtype=np.float32)
+                            for seconds, speech in parts])
+    buf = io.BytesIO()
+    sf.write(buf, audio, SAMPLE_RATE, format="WAV", subtype="PCM_16")
+    return buf.getvalue()
+
+def chunks(data, size=8000):
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+async def feed_until_partial(sut, timeout=5.0):
+    # Decoding runs on a background thread: poll until the closed segment has been decoded
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while loop.time() < deadline:
+        texts = await sut.afeed()
+        if texts:
+            return texts
+        await asyncio.sleep(0.01)
+    return []
+
+@pytest.fixture(autouse=True)
+def fake_vad(mocker):
+    mocker.patch.object(stt_stream, "get_speech_timestamps", side_effect=energy_vad)
+
+@pytest.mark.asyncio
+async def test_closed_segments_are_transcribed_while_recording():
+    stt = FakeSTTService()
+    sut = STTStream(stt, SessionAudioBuffer(), decode_interval_s=0)
+    data = recording((1, False), (1, True), (2, False), (1, True), (0.2, False))
+    first_part = len(data) // 2  # Ends in the 2s pause
+
+    for chunk in chunks(data[:first_part]):
+        await sut.afeed(chunk)
+    partial = await feed_until_partial(sut)
+    for chunk in chunks(data[first_part:]):
+        await sut.afeed(chunk)
+    transcript = await sut.afinish()
+
+    assert partial == ["speech 1.0s"]
+    # The rest starts where the first segment ended and is given the partial transcript as prompt
+    assert transcript == "speech 1.0s speech 1.0s"
+    assert stt.prompts == [None, "speech 1.0s"]
+
+@pytest.mark.asyncio
+async def test_finish_resets_the_stream_for_the_next_recording():
+    stt = FakeSTTService()
+    sut = STTStream(stt, SessionAudioBuffer(), decode_interval_s=0)
+    for chunk in chunks(recording((1, True), (1, False))):
+        await sut.afeed(chunk)
+    await sut.afinish()
+
+    assert len(sut.audio) == 0
+    for chunk in chunks(recording((2, True))):
+        await sut.afeed(chunk)
+
+    assert await sut.afinish() == "speech 2.0s"
+    assert stt.prompts[-1] is None
+
+@pytest.mark.asyncio
+async def test_recording_is_decoded_once(mocker):
+    decode = mocker.patch.object(stt_stream, "decode_audio_bytes", side_effect=AssertionError("decoded again"))
+    sut = STTStream(FakeSTTService(), SessionAudioBuffer(), decode_interval_s=0)
+
+    for chunk in chunks(recording((1, False), (1, True), (1, False), (1, True))):
+        await sut.afeed(chunk)
+    await feed_until_partial(sut)
+
+    assert await sut.afinish() == "speech 1.0s speech 1.0s"
+    assert not decode.called
+
+@pytest.mark.asyncio
+async def test_finish_without_audio_fails():
+    sut = STTStream(FakeSTTService(), SessionAudioBuffer())
+
+    with pytest.raises(ValueError):
+        await sut.afinish()
@@ -0,0 +1,31 @@
+from services.tts_cache import TTSCache
+
+def test_key_normalizes_whitespace_but_not_voice_or_codec():
+    key = TTSCache.key("Could you  elaborate on that?\n", "af_heart", "b", "wav")
+
+    assert key == TTSCache.key(" Could you elaborate on that?", "af_heart", "b", "wav")
+    assert key != TTSCache.key("Could you elaborate on that?", "af_heart", "b", "opus")
+    assert key != TTSCache.key("Could you elaborate on that?", "bf_emma", "b", "wav")
+
+def test_memory_tier_evicts_least_recently_used():
+    sut = TTSCache(max_bytes=10)
+    sut.put("a", b"1234")
+    sut.put("b", b"1234")
+    sut.get("a")
+    sut.put("c", b"1234")
+
+    assert sut.get("b") is None
+    assert sut.get("a") == b"1234"
+    assert sut.get("c") == b"1234"
+    assert sut.stats()["bytes"] == 8
+
+def test_disk_tier_survives_a_new_instance(tmp_path):
+    TTSCache(disk_dir=str(tmp_path)).put("key", b"audio")
+
+    sut = TTSCache(disk_dir=str(tmp_path))
+
+    assert sut.get("key") == b"audio"
+    assert sut.get("key") == b"audio"
+    assert sut.get("missing") is None
+    stats = sut.stats()
+    assert (stats["hits"], stats["disk_hits"], stats["misses"]) == (1, 1, 1)
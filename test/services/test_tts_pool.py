@@ -0,0 +1,95 @@
+import queue
+import threading
+import time
+from contextlib import ExitStack
+
+from services import tts_pool
+from services.tts_pool import KokoroPipelinePool
+
+import pytest
+
+class FakePipeline:
+    """Stands in for KPipeline: loading the model (model=True) is slow and counted."""
+    model_loads = 0
+    created = 0
+
+    def __init__(self, lang_code, repo_id, model):
+        if model is True:
+            time.sleep(0.05)
+            type(self).model_loads += 1
+            model = object()
+        type(self).created += 1
+        self.lang_code = lang_code
+        self.model = model
+        self.voices = []
+        self.calls = 0
+
+    def load_voice(self, voice):
+        self.voices.append(voice)
+
+    def __call__(self, text, voice):
+        self.calls += 1
+        yield text
+
+@pytest.fixture(autouse=True)
+def fake_pipeline(mocker):
+    mocker.patch.object(tts_pool, "KPipeline", type("Pipeline", (FakePipeline,), {}))
+    return tts_pool.KPipeline
+
+def test_released_pipeline_is_reused():
+    sut = KokoroPipelinePool(voices=["af_heart"])
+
+    with sut.acquire("b") as first:
+        pass
+    with sut.acquire("b") as second:
+        pass
+
+    assert second is first
+    assert first.voices == ["af_heart"]
+
+def test_pool_waits_for_a_pipeline_beyond_its_size(fake_pipeline):
+    sut = KokoroPipelinePool(voices=["af_heart"], max_size=2)
+
+    with sut.acquire("b") as first, sut.acquire("b") as second:
+        assert first is not second
+        with pytest.raises(queue.Empty):
+            with sut.acquire("b", timeout=0.01):
+                pass
+    with sut.acquire("b") as third:
+        assert third in (first, second)
+
+    assert fake_pipeline.created == 2
+    with pytest.raises(ValueError):
+        with sut.acquire("a"):
+            pass
+
+def test_warmup_fills_the_pool(fake_pipeline):
+    sut = KokoroPipelinePool(voices=["af_heart", "bf_emma"], lang_codes=("a", "b"), max_size=3)
+
+    sut.warmup()
+
+    assert fake_pipeline.created == 6
+    assert fake_pipeline.model_loads == 1
+    for lang_code in ("a", "b"):
+        with ExitStack() as stack:
+            pipelines = [stack.enter_context(sut.acquire(lang_code)) for _ in range(3)]
+        assert all(pipeline.calls == 2 for pipeline in pipelines)
+    assert fake_pipeline.created == 6
+
+def test_concurrent_cold_acquires_load_the_model_once(fake_pipeline):
+    sut = KokoroPipelinePool(voices=["af_heart"], max_size=4)
+    barrier = threading.Barrier(4)
+
+    def synthesize():
+        barrier.wait()
+        with sut.acquire("b"):
+            time.sleep(0.01)
+
+    threads = [threading.Thread(target=synthesize) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert fake_pipeline.model_loads == 1
+    assert fake_pipeline.created == 4
@@ -0,0 +1,81 @@
+import asyncio
+
+from services.tts_cache import TTSCache
+from services.tts_service import TTSService
+
+import pytest
+
+class FakeSynthesis:
+    """Stands in for TTSService.asynthesize, recording the syntheses it runs."""
+
+    def __init__(self, fail=(), hang=()):
+        self.fail = set(fail)
+        self.hang = set(hang)
+        self.tasks = []
+        self.release = asyncio.Event()
+
+    async def __call__(self, sentence, voice=None, lang_code=None, codec="wav"):
+        self.tasks.append(asyncio.current_task())
+        if sentence in self.fail:
+            raise RuntimeError(f"cannot synthesize {sentence}")
+        if sentence in self.hang:
+            await asyncio.Event().wait()
+        await self.release.wait()
+        return sentence.encode()
+
+async def sentences(count):
+    for i in range(count):
+        yield f"Sentence {i}."
+
+def tts_service(synthesis):
+    sut = TTSService(warmup=False, cache=TTSCache(max_bytes=0))
+    sut.asynthesize = synthesis
+    return sut
+
+@pytest.mark.asyncio
+async def test_sentences_are_synthesized_ahead_and_yielded_in_order():
+    synthesis = FakeSynthesis()
+    synthesis.release.set()
+    sut = tts_service(synthesis)
+
+    audio = [chunk async for chunk in sut.astream_synthesize_sentences(sentences(5), lookahead=2)]
+
+    assert audio == [f"Sentence {i}.".encode() for i in range(5)]
+
+@pytest.mark.asyncio
+async def test_cancelled_consumer_leaves_no_synthesis_running():
+    synthesis = FakeSynthesis()
+    sut = tts_service(synthesis)
+
+    async def consume():
+        async for _ in sut.astream_synthesize_sentences(sentences(10), lookahead=2):
+            pass
+
+    consumer = asyncio.create_task(consume())
+    for _ in range(20):
+        await asyncio.sleep(0)
+    # The scheduler now waits for a slot: the lookahead and the awaited sentence have started
+    assert len(synthesis.tasks) == 3
+    consumer.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await consumer
+
+    assert all(task.cancelled() for task in synthesis.tasks)
+
+@pytest.mark.asyncio
+async def test_dropped_syntheses_are_collected():
+    synthesis = FakeSynthesis(fail={"Sentence 1."}, hang={"Sentence 2."})
+    sut = tts_service(synthesis)
+    stream = sut.astream_synthesize_sentences(sentences(3), lookahead=3)
+
+    first = asyncio.ensure_future(stream.__anext__())
+    for _ in range(20):
+        await asyncio.sleep(0)
+    synthesis.release.set()
+    assert await first == b"Sentence 0."
+    await stream.aclose()
+
+    assert all(task.done() for task in synthesis.tasks)
+    # The failed synthesis was dropped with its error retrieved, not left for the loop to report
+    failed = [task for task in synthesis.tasks if not task.cancelled() and task.exception() is not None]
+    assert [str(task.exception()) for task in failed] == ["cannot synthesize Sentence 1."]
@@ -0,0 +1,41 @@
+import numpy as np
+
+from services.vad import SilenceTrimmer
+
+SAMPLE_RATE = 16000
+
+def tone(seconds, amplitude=0.3):
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    return (amplitude * np.sin(2 * np.pi * 220 * t)).astype(np.float32)
+
+def silence(seconds, noise=0.0005):
+    rng = np.random.default_rng(0)
+    return (noise * rng.standard_normal(int(seconds * SAMPLE_RATE))).astype(np.float32)
+
+def test_trims_edges_and_shortens_long_pauses():
+    sut = SilenceTrimmer(pad_ms=90, max_pause_ms=300)
+    audio = np.concatenate([silence(2), tone(1), silence(3), tone(1), silence(2)])
+
+    trimmed, stats = sut.trim(audio)
+
+    assert stats.input_seconds == 9
+    # Two seconds of speech, padding on both sides of each word and one shortened pause
+    assert 2.3 < stats.output_seconds < 2.8
+    assert abs(stats.removed_seconds - (stats.input_seconds - len(trimmed) / SAMPLE_RATE)) < 1e-9
+
+def test_continuous_speech_is_left_untouched():
+    sut = SilenceTrimmer()
+    audio = tone(2)
+
+    trimmed, stats = sut.trim(audio)
+
+    assert len(trimmed) == len(audio)
+    assert stats.removed_seconds == 0
+
+def test_silence_only_is_trimmed_to_nothing():
+    sut = SilenceTrimmer()
+
+    trimmed, stats = sut.trim(silence(1))
+
+    assert len(trimmed) == 0
+    assert stats.output_seconds == 0
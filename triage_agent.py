@@ -2,7 +2,7 @@ from agents import Agent
 from agents.extensions.handoff_prompt import prompt_with_handoff_instructions
 
 from llm_agents.search_agent import search_agent
-from llm_agents.knowledge_agent import knowledge_agent
+from llm_agents.knowledge_agent import get_knowledge_agent
 from llm_agents.account_agent import account_agent
 
 triage_agent = Agent(
@@ -14,5 +14,5 @@ Based on the user's intent, route to:
 - SearchAgent for anything requiring real-time web search
 - AccountAgent for account-related queries
 """),
-    handoffs=[account_agent, knowledge_agent, search_agent],
+    handoffs=[account_agent, get_knowledge_agent(), search_agent],
 )
@@ -1,18 +1,51 @@
 from openai import OpenAI
 import os
 import logging
+import threading
+from functools import lru_cache
 
 from akv import AzureKeyVault
 from storage_account import AzureStorageAccount
 
-akv = AzureKeyVault()
-openai_key = akv.get_secret("openai-apikey")
-client = OpenAI(api_key=openai_key)
+KNOWLEDGE_BASE_NAME = "Knowledge Base"
 
-storage = AzureStorageAccount()
+_knowledge_base = None
+_knowledge_base_lock = threading.Lock()
+
+@lru_cache(maxsize=1)
+def get_client() -> OpenAI:
+    """OpenAI client, created on first use (reads the key from AKV)."""
+    akv = AzureKeyVault()
+    openai_key = akv.get_secret("openai-apikey")
+    return OpenAI(api_key=openai_key)
+
+@lru_cache(maxsize=1)
+def get_storage() -> AzureStorageAccount:
+    """Storage account holding the knowledge files, created on first use."""
+    return AzureStorageAccount()
+
+def get_knowledge_base() -> dict:
+    """
+    Details of the knowledge base vector store, looked up (or created) on first use.
+
+    Raises:
+        RuntimeError: If the vector store could not be retrieved; the next call tries again
+    """
+    global _knowledge_base
+    with _knowledge_base_lock:
+        if _knowledge_base is None:
+            details = get_vector_store(KNOWLEDGE_BASE_NAME)
+            if not details:
+                raise RuntimeError(f"Vector store '{KNOWLEDGE_BASE_NAME}' is not available")
+            _knowledge_base = details
+        return _knowledge_base
 
 def upload_files():
     try:
+        client = get_client()
+        vector_store = get_knowledge_base()
+        storage = get_storage()
+
         download_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".download")
         os.makedirs(download_dir, exist_ok=True)
 
@@ -47,7 +80,7 @@ def upload_files():
 
 def create_vector_store(store_name: str) -> dict:
     try:
-        vector_store = client.vector_stores.create(name=store_name)
+        vector_store = get_client().vector_stores.create(name=store_name)
         details = {
             "id": vector_store.id,
             "name": vector_store.name,
@@ -63,7 +96,7 @@ def create_vector_store(store_name: str) -> dict:
 def get_vector_store(store_name: str) -> dict:
     try:
         # Query existing vector stores
-        vector_stores = client.vector_stores.list()
+        vector_stores = get_client().vector_stores.list()
         for store in vector_stores:
             if store.name == store_name:
                 details = {
@@ -80,5 +113,3 @@ def get_vector_store(store_name: str) -> dict:
     except Exception as e:
         logging.error(f"Error retrieving or creating vector store: {e}")
         return {}
-
-vector_store = get_vector_store("Knowledge Base")